@@ -0,0 +1,129 @@
+"""
+:meta private: Not public API.
+
+Coordination of work that is shared between tests during a test run. 
+
+Note that state shared between tests must live in a normally imported module such as this one (rather than in 
+a test class module, since PySys loads a separate copy of the test module for each test). 
+"""
+
+import threading
+import time
+import concurrent.futures
+import multiprocessing
+
+class SharedTaskFailedException(Exception):
+	"""
+	Raised when a shared task that another test was executing has failed. 
+	"""
+	def __init__(self, message, owner):
+		super(SharedTaskFailedException, self).__init__(message)
+		self.owner = owner
+
+class SharedTaskTimedOutException(SharedTaskFailedException):
+	"""
+	Raised when a shared task that another test is executing did not complete within the timeout. 
+	"""
+	pass
+
+class SharedTaskCoordinator(object):
+	"""
+	A runner-scoped, thread-safe coordinator that ensures each task (identified by a key) is only executed once 
+	during a test run. The first caller executes the task, and any concurrent callers for the same key wait for it 
+	to complete. 
+	"""
+	__instancesLock = threading.Lock()
+
+	def __init__(self):
+		self.__lock = threading.Lock()
+		self.__tasks = {}
+		
+		self.executions = 0
+		self.reuses = 0
+		self.savedSecs = 0.0
+		"""The total time taken to execute the tasks that were reused rather than executed again. """
+	
+	@staticmethod
+	def getInstance(runner, name, summaryLogger=None):
+		"""
+		Get the coordinator with the specified name for this runner, creating it if needed. 
+		
+		:param callable[SharedTaskCoordinator] summaryLogger: A function that will be called during runner cleanup 
+			to log a summary. 
+		"""
+		with SharedTaskCoordinator.__instancesLock:
+			attr = '_pysysjava_%sCoordinator'%name
+			coordinator = getattr(runner, attr, None)
+			if coordinator is None:
+				coordinator = SharedTaskCoordinator()
+				setattr(runner, attr, coordinator)
+				if summaryLogger: runner.addCleanupFunction(lambda: summaryLogger(coordinator))
+			return coordinator
+
+	def runOnce(self, key, function, owner, timeout=None):
+		"""
+		Execute the function unless it has already been executed for this key, in which case wait for it to complete. 
+		
+		:param key: A hashable key identifying the task. 
+		:param callable[] function: The function that performs the task. 
+		:param str owner: Identifies the caller (e.g. a test id) for use in messages. 
+		:param float timeout: The maximum number of seconds to wait for a task that is being executed by a 
+			different owner, or None to wait for as long as it takes. 
+		:return: The owner that executed the task. 
+		:raises SharedTaskFailedException: If the task failed when executed by a different owner, or the thread 
+			executing it terminated without completing it. If it fails while executed by this owner the original 
+			exception is raised. 
+		:raises SharedTaskTimedOutException: If the task executed by a different owner did not complete within the 
+			timeout. 
+		"""
+		with self.__lock:
+			task = self.__tasks.get(key)
+			isNew = task is None
+			if isNew: 
+				task = self.__tasks[key] = {'owner':owner, 'done':threading.Event(), 'error':None, 
+					'thread':threading.current_thread()}
+		
+		if isNew:
+			startTime = time.monotonic()
+			try:
+				function()
+			except BaseException as ex:
+				task['error'] = str(ex) or type(ex).__name__
+				raise
+			finally:
+				task['durationSecs'] = time.monotonic()-startTime
+				with self.__lock: self.executions += 1
+				task['done'].set()
+			return owner
+		
+		# poll so we notice if the owner's thread goes away without completing the task, rather than waiting forever
+		endTime = None if timeout is None else time.monotonic()+timeout
+		while not task['done'].wait(1.0 if endTime is None else max(0, min(1.0, endTime-time.monotonic()))):
+			if not task['thread'].is_alive() and not task['done'].is_set():
+				raise SharedTaskFailedException('Thread terminated before completing the task', task['owner'])
+			if endTime is not None and time.monotonic() >= endTime:
+				raise SharedTaskTimedOutException('Task did not complete within %d secs'%timeout, task['owner'])
+		if task['error'] is not None: raise SharedTaskFailedException(task['error'], task['owner'])
+		with self.__lock: 
+			self.reuses += 1
+			self.savedSecs += task['durationSecs']
+		return task['owner']
+
+__processPoolLock = threading.Lock()
+
+def getSharedProcessPool(runner, name, processes):
+	"""
+	Get a process pool with the specified name that is shared by all tests in this runner, creating it if needed. 
+	The pool is shut down during runner cleanup. 
+	
+	:param int processes: The number of processes in the pool, if it needs to be created. 
+	"""
+	with __processPoolLock:
+		attr = '_pysysjava_%sProcessPool'%name
+		pool = getattr(runner, attr, None)
+		if pool is None:
+			# use spawn since forking a process that has other threads (as PySys does) is unsafe
+			pool = concurrent.futures.ProcessPoolExecutor(processes, mp_context=multiprocessing.get_context('spawn'))
+			setattr(runner, attr, pool)
+			runner.addCleanupFunction(pool.shutdown)
+		return pool
@@ -0,0 +1,184 @@
+"""
+A cache of Application Class-Data Sharing (AppCDS) archives, which allows `pysysjava.javaplugin.JavaPlugin.startJava`
+to reduce the startup time of Java processes that are started repeatedly with the same classpath.
+
+The cache is enabled by setting the ``appCDSCacheDir`` property of `pysysjava.javaplugin.JavaPlugin`.
+"""
+
+import os
+import re
+import json
+import hashlib
+import logging
+import threading
+
+from pysys.utils.fileutils import mkdir, toLongPathSafe
+
+log = logging.getLogger('pysys.pysysjava.appcds')
+
+class AppCDSArchiveCache(object):
+	"""
+	A directory of dynamic AppCDS archives, each identified by a key that is a hash of the Java executable, the
+	main class or jar, the JVM arguments, and the classpath (including the contents of each classpath jar, so that
+	changing a jar results in a new archive).
+
+	The first time a foreground process is started for a given key it is given the ``-XX:ArchiveClassesAtExit`` JVM
+	option which creates the archive when the process exits, and subsequent processes are given
+	``-XX:SharedArchiveFile``. Dynamic archives require Java 13 or later, and can only contain classes loaded from
+	jars, so archives are not used for classpaths that include a (non-empty) directory.
+
+	This class is thread-safe. Usually it is not necessary to use this class directly; instead use `getCache` to
+	get the shared instance for a given directory.
+
+	:param str cacheDir: The absolute path of the directory to store archives in.
+	"""
+
+	FORMAT_VERSION = 2
+	"""Incremented whenever the key format changes. """
+
+	__instances = {}
+	__javaVersions = {}
+	__instancesLock = threading.Lock()
+
+	def __init__(self, cacheDir):
+		self.cacheDir = os.path.normpath(cacheDir)
+		self.__lock = threading.Lock()
+		self.__pending = set() # keys whose archive is being created by a process in this run
+		self.__failed = set() # keys whose archive was not created when expected, which are not retried in this run
+		self.__fileHashes = {} # (path, size, mtime) -> hash of the file contents
+		self.__loggedDirectories = set()
+
+	@staticmethod
+	def getCache(cacheDir):
+		"""
+		Get the shared cache instance for the specified directory, creating it if this is the first use.
+		"""
+		cacheDir = os.path.normpath(cacheDir)
+		with AppCDSArchiveCache.__instancesLock:
+			cache = AppCDSArchiveCache.__instances.get(cacheDir)
+			if cache is None:
+				cache = AppCDSArchiveCache.__instances[cacheDir] = AppCDSArchiveCache(cacheDir)
+			return cache
+
+	@staticmethod
+	def isSupported(javaHome):
+		"""
+		Returns True if the specified JDK supports dynamic AppCDS archives (i.e. is Java 13 or later), based on the
+		``release`` file in the Java home directory.
+		"""
+		with AppCDSArchiveCache.__instancesLock:
+			if javaHome in AppCDSArchiveCache.__javaVersions: return AppCDSArchiveCache.__javaVersions[javaHome]
+			major = 0
+			try:
+				with open(toLongPathSafe(os.path.join(javaHome, 'release')), 'r', encoding='utf-8', errors='replace') as f:
+					m = re.search(r'^JAVA_VERSION="(1[.])?([0-9]+)', f.read(), flags=re.MULTILINE)
+				if m: major = int(m.group(2))
+			except OSError:
+				pass
+			supported = AppCDSArchiveCache.__javaVersions[javaHome] = major >= 13
+			if not supported: log.info('AppCDS archives will not be used since they require Java 13+ but this JDK is %s: %s',
+				'Java %d'%major if major else 'an unknown version', javaHome)
+			return supported
+
+	def getKey(self, javaExecutable, classpath, classOrJar, jvmArgs=[], workingDir=None):
+		"""
+		Calculate the cache key for starting a Java process.
+
+		:param str javaExecutable: The path to the java executable.
+		:param list[str] classpath: The resolved classpath entries.
+		:param str classOrJar: The main class, or the path to the jar.
+		:param list[str] jvmArgs: The JVM arguments, since options such as the garbage collector, heap size and modules
+			must match when the archive is used. System properties (``-D``) are ignored since they do not affect it.
+		:param str workingDir: The working directory of the process, which relative classpath entries are resolved
+			against.
+		:return str: A hex string, or None if an archive cannot be used since there is a directory on the classpath.
+		"""
+		h = hashlib.sha256()
+		def add(*items):
+			for i in items: h.update(str(i).encode('utf-8', errors='surrogateescape')+b'\0')
+		add('format', self.FORMAT_VERSION, os.path.normpath(javaExecutable), classOrJar)
+		jvmArgs = [a for a in jvmArgs if not a.startswith('-D')]
+		add('jvmArgs', len(jvmArgs), *jvmArgs)
+		for c in classpath+([classOrJar] if classOrJar.endswith('.jar') else []):
+			path = os.path.normpath(os.path.join(workingDir, c) if workingDir else c)
+			if os.path.isdir(toLongPathSafe(path)):
+				if not os.listdir(toLongPathSafe(path)): 
+					add(path, 'emptydir')
+					continue
+				with self.__lock:
+					logged = path in self.__loggedDirectories
+					self.__loggedDirectories.add(path)
+				if not logged: log.info('AppCDS archives will not be used for Java processes with this directory on the classpath, since only classes loaded from jars can be archived: %s', path)
+				return None
+			add(path, self.__hashFile(path))
+		return h.hexdigest()
+
+	def __hashFile(self, path):
+		try:
+			st = os.stat(toLongPathSafe(path))
+		except OSError:
+			return 'missing'
+		# the hash is reused while the file is unchanged, since the same jars are typically used by many processes
+		fileKey = (path, st.st_size, st.st_mtime_ns)
+		with self.__lock:
+			result = self.__fileHashes.get(fileKey)
+		if result is None:
+			fileHash = hashlib.sha256()
+			with open(toLongPathSafe(path), 'rb') as f:
+				for data in iter(lambda: f.read(1024*1024), b''): fileHash.update(data)
+			result = fileHash.hexdigest()
+			with self.__lock:
+				self.__fileHashes[fileKey] = result
+		return result
+
+	def getJVMArgs(self, key, create=True):
+		"""
+		Get the JVM arguments to use or create the archive for the specified key.
+
+		:param bool create: Set to False if the archive should not be created by this process, for example because it
+			is a background process which may not exit until the end of the run.
+		:return (list[str],bool): The JVM arguments, and True if these arguments will create a new archive (in which
+			case `archiveCreated` must be called when the process has completed or failed), or False if they use an
+			existing archive. If the archive is currently being created by another process (or cannot be created),
+			empty arguments are returned.
+		"""
+		path = self.getArchivePath(key)
+		with self.__lock:
+			if key in self.__pending or key in self.__failed: return [], False
+			if os.path.exists(toLongPathSafe(path)): return ['-XX:SharedArchiveFile=%s'%path], False
+			if not create: return [], False
+			self.__pending.add(key)
+		mkdir(self.cacheDir)
+		return ['-XX:ArchiveClassesAtExit=%s'%path], True
+
+	def getArchivePath(self, key):
+		return os.path.join(self.cacheDir, key[:16]+'.jsa')
+
+	def archiveCreated(self, key, durationSecs):
+		"""
+		Called when a process that was given the arguments to create an archive has completed, or failed.
+
+		:param float durationSecs: The duration of the process that created the archive (without using an archive),
+			which is used as a baseline for estimating the savings from subsequent processes, or None if the process
+			did not complete.
+		:return bool: True if the archive was created. If not, there will be no further attempts to create it during
+			this run.
+		"""
+		created = os.path.exists(toLongPathSafe(self.getArchivePath(key)))
+		with self.__lock:
+			self.__pending.discard(key)
+			if not created: self.__failed.add(key)
+		if created and durationSecs is not None:
+			with open(toLongPathSafe(self.getArchivePath(key)[:-4]+'.json'), 'w', encoding='utf-8') as f:
+				json.dump({'baselineDurationSecs':durationSecs}, f)
+		return created
+
+	def getBaselineDurationSecs(self, key):
+		"""
+		Returns the duration of the process that created the archive, or None if not known.
+		"""
+		try:
+			with open(toLongPathSafe(self.getArchivePath(key)[:-4]+'.json'), 'r', encoding='utf-8') as f:
+				return json.load(f)['baselineDurationSecs']
+		except Exception:
+			return None
@@ -0,0 +1,202 @@
+"""
+A writer that records a timeline of the Java work done by each PySys worker thread, as a Chrome trace-event JSON file
+that can be opened in a standard trace viewer such as ``chrome://tracing`` or `Perfetto <https://ui.perfetto.dev>`_.
+
+See `ChromeTraceWriter` for details.
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+import contextlib
+
+from pysys.writer.api import BaseResultsWriter
+from pysys.utils.fileutils import mkdir, toLongPathSafe
+
+from pysysjava.launchtimings import JavaLaunchTimings
+
+log = logging.getLogger('pysys.pysysjava.chrometrace')
+
+def getTraceWriters(runner):
+	"""
+	Returns the enabled `ChromeTraceWriter` instances for this runner, or an empty list if there are none.
+	"""
+	return [w for w in getattr(runner, 'writers', None) or [] if isinstance(w, ChromeTraceWriter)]
+
+def traceSpan(owner, name, category, **args):
+	"""
+	Returns a context manager that records a span for the code it contains in every enabled `ChromeTraceWriter`, or
+	does nothing if there are none.
+
+	:param owner: The test (or runner) doing the work.
+	:param str name: The name of the span.
+	:param str category: The category of the span, such as ``junit``.
+	:param args: Extra information to be shown for this span in the trace viewer.
+	"""
+	writers = getTraceWriters(getattr(owner, 'runner', owner))
+	if not writers: return contextlib.nullcontext()
+	return _traceSpan(writers, owner, name, category, args)
+
+@contextlib.contextmanager
+def _traceSpan(writers, owner, name, category, args):
+	startTime, start = time.time(), time.monotonic()
+	try:
+		yield
+	finally:
+		durationSecs = time.monotonic()-start
+		testId = owner.descriptor.id if hasattr(owner, 'descriptor') else None
+		for w in writers:
+			w.addSpan(name, category, threading.current_thread().name, startTime, durationSecs, testId=testId, args=args)
+
+class ChromeTraceWriter(BaseResultsWriter):
+	"""
+	Writer that records when each test, ``javac`` compilation, ``java`` process (such as the JUnit launcher) and
+	JaCoCo coverage report ran, and writes them to a Chrome trace-event JSON file at the end of the run, with one track
+	for each worker thread. This makes it easy to see how well the worker threads are being used, including any idle
+	gaps and the serial "tail" at the end of the run when only a few long tests (or the coverage report) are still
+	executing.
+
+	To enable it, add this to your project configuration::
+
+		<writer classname="pysysjava.chrometrace.ChromeTraceWriter">
+			<property name="traceFile" value="__pysys_java_trace.${outDirName}.json"/>
+		</writer>
+
+	The trace contains:
+
+	- A span for each test, named with the test id.
+	- A span for each `pysysjava.javaplugin.JavaPlugin.compile` and `pysysjava.javaplugin.JavaPlugin.startJava`
+	  call, containing nested spans for each stage of the launch (see `pysysjava.launchtimings`, which is automatically
+	  enabled by this writer). Background processes are shown as asynchronous spans, since they keep running while the
+	  thread that started them moves on.
+	- A span for `pysysjava.junittest.JUnitTest.validateJUnitReports` and for the report generation in
+	  `pysysjava.coverage.JavaCoverageWriter.cleanup`, and for any other code wrapped with `traceSpan`.
+
+	All times are relative to the start of the run. The file is written after all writers have been cleaned up (so
+	that it includes the work done by other writers), and is published as an artifact with category ``JavaTrace``.
+	"""
+
+	traceFile = ''
+	"""
+	The path of the trace file. If a relative path is specified, it is relative to the testRootDir. By default the
+	file is written to ``java-trace.json`` in the runner output directory.
+	"""
+
+	def __init__(self, logfile=None, **kwargs):
+		super(ChromeTraceWriter, self).__init__(logfile=logfile, **kwargs)
+		# initialized here rather than in setup since runner plugins can start Java processes before writers are setup
+		self.__lock = threading.Lock()
+		self.__spans = [] # list of dicts for each span, in the order they completed
+		self.__testThreads = {} # testId -> the thread that executed it, as recorded by its spans
+
+	def isEnabled(self, record=False, **kwargs):
+		return True # regardless of record flag
+
+	def setup(self, **kwargs):
+		if self.traceFile:
+			self.traceFile = os.path.join(self.runner.project.testRootDir, self.traceFile)
+		else:
+			self.traceFile = os.path.join(self.runner.output, 'java-trace.json')
+		self.__threads = int(kwargs.get('threads', 1))
+		JavaLaunchTimings.getInstance(self.runner).addListener(self.__addLaunch)
+		# a runner cleanup function rather than cleanup() so that work done by other writers' cleanup is included
+		self.runner.addCleanupFunction(self.writeTrace)
+
+	def addSpan(self, name, category, thread, startTime, durationSecs, testId=None, args=None, background=False):
+		"""
+		Add a completed span to the trace.
+
+		:param str thread: The name of the thread that did the work.
+		:param float startTime: The start time in seconds since the epoch.
+		:param str testId: The id of the test that did the work, or None for work done by the runner.
+		:param bool background: Set to True for work (such as a background process) that carries on while the thread
+			does other things; these are shown as asynchronous spans rather than on the thread's track.
+		"""
+		with self.__lock:
+			self.__spans.append({'name': name, 'cat': category, 'thread': thread, 'startTime': startTime,
+				'durationSecs': durationSecs, 'testId': testId, 'args': dict(args or {}), 'background': background})
+			if testId is not None: self.__testThreads.setdefault(testId, thread)
+
+	def __addLaunch(self, timing):
+		testId = None if timing.ownerId == 'runner' else timing.ownerId
+		args = {'testId': timing.ownerId, 'exitStatus': timing.exitStatus, 'peakRSSMB': timing.peakRSSMB}
+		args.update(('JVM %s secs'%k, v) for k, v in timing.jvmStartupSecs.items())
+		runSpan = next((s for s in timing.spans if s[0] == 'run'), None)
+		if timing.background and runSpan is not None:
+			# only the work up to the end of spawning the process was done on the thread
+			self.addSpan(timing.displayName, timing.kind, timing.thread, timing.startTime, runSpan[1], testId=testId, args=args)
+			self.addSpan(timing.displayName, timing.kind, timing.thread, timing.startTime+runSpan[1], runSpan[2],
+				testId=testId, args=args, background=True)
+		else:
+			self.addSpan(timing.displayName, timing.kind, timing.thread, timing.startTime, timing.durationSecs, testId=testId, args=args)
+		for name, startSecs, durationSecs in timing.spans:
+			if timing.background and name in ['run', 'firstOutput']: continue
+			self.addSpan(name, 'launch', timing.thread, timing.startTime+startSecs, durationSecs, testId=testId)
+
+	def processResult(self, testObj, cycle=0, testStart=None, testTime=None, **kwargs):
+		if testStart is None or testTime is None: return
+		with self.__lock:
+			self.__spans.append({'name': testObj.descriptor.id, 'cat': 'test', 'thread': None, 'startTime': testStart,
+				'durationSecs': testTime, 'testId': testObj.descriptor.id,
+				'args': {'outcome': str(testObj.getOutcome()), 'cycle': cycle+1}, 'background': False})
+
+	def getTraceEvents(self):
+		"""
+		Returns the list of Chrome trace events for all spans recorded so far.
+
+		:return list[dict]: The events, suitable for the ``traceEvents`` list of a trace file.
+		"""
+		with self.__lock:
+			spans = sorted((dict(s) for s in self.__spans), key=lambda s: s['startTime'])
+			testThreads = dict(self.__testThreads)
+		lanes = ['PySysWorker-%02d'%(i+1) for i in range(self.__threads)] if self.__threads > 1 else ['MainThread']
+
+		# the thread that ran each test isn't passed to writers, so use the one from its spans, or else put it on the
+		# first worker whose track isn't already busy at that time
+		laneEnds = {}
+		for s in spans:
+			if s['cat'] == 'test' and s['testId'] in testThreads:
+				s['thread'] = testThreads[s['testId']]
+				laneEnds[s['thread']] = max(laneEnds.get(s['thread'], 0), s['startTime']+s['durationSecs'])
+		for s in spans:
+			if s['thread'] is None:
+				s['thread'] = next((l for l in lanes if laneEnds.get(l, 0) <= s['startTime']), lanes[0])
+				laneEnds[s['thread']] = max(laneEnds.get(s['thread'], 0), s['startTime']+s['durationSecs'])
+
+		threads = lanes+sorted(set(s['thread'] for s in spans)-set(lanes))
+		tids = {t: i+1 for i, t in enumerate(threads)}
+		events = [{'name': 'process_name', 'ph': 'M', 'pid': 1, 'tid': 0, 'args': {'name': 'PySys'}}]
+		for t in threads:
+			events.append({'name': 'thread_name', 'ph': 'M', 'pid': 1, 'tid': tids[t], 'args': {'name': t}})
+			events.append({'name': 'thread_sort_index', 'ph': 'M', 'pid': 1, 'tid': tids[t], 'args': {'sort_index': tids[t]}})
+
+		startTime = self.runner.startTime
+		def toMicros(secs): return int(round(secs*1000000))
+		for i, s in enumerate(spans):
+			event = {'name': s['name'], 'cat': s['cat'], 'pid': 1, 'tid': tids[s['thread']],
+				'ts': toMicros(s['startTime']-startTime), 'args': s['args']}
+			if s['testId'] is not None: event['args'] = dict(s['args'], testId=s['testId'])
+			if s['background']:
+				events.append(dict(event, ph='b', id=i))
+				events.append(dict(event, ph='e', id=i, ts=event['ts']+toMicros(s['durationSecs']), args={}))
+			else:
+				events.append(dict(event, ph='X', dur=toMicros(s['durationSecs'])))
+		return events
+
+	def writeTrace(self):
+		"""
+		Write the trace file. This is called automatically at the end of the run.
+		"""
+		JavaLaunchTimings.getInstance(self.runner).waitForPending()
+		events = self.getTraceEvents()
+		if len(events) <= 1: return
+		mkdir(os.path.dirname(self.traceFile))
+		tmp = self.traceFile+'.tmp'
+		with open(toLongPathSafe(tmp), 'w', encoding='utf-8') as f:
+			json.dump({'traceEvents': events, 'displayTimeUnit': 'ms',
+				'otherData': {'startTime': self.runner.startTime, 'threads': self.__threads}}, f)
+		os.replace(toLongPathSafe(tmp), toLongPathSafe(self.traceFile))
+		log.info('Java trace written to: %s', self.traceFile)
+		self.runner.publishArtifact(self.traceFile, 'JavaTrace')
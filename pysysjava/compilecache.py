@@ -0,0 +1,244 @@
+"""
+An on-disk cache of compiled Java classes, which allows `pysysjava.javaplugin.JavaPlugin.compile` to skip running
+``javac`` when the same source files have already been compiled with the same classpath and compiler arguments,
+whether by another test in the same run or by a previous run.
+
+The cache is enabled by setting the ``compileCacheDir`` property of `pysysjava.javaplugin.JavaPlugin`.
+"""
+
+import os
+import json
+import hashlib
+import logging
+import shutil
+import stat
+import threading
+import time
+import uuid
+import collections
+
+from pysys.utils.fileutils import mkdir, deletedir, toLongPathSafe
+
+log = logging.getLogger('pysys.pysysjava.compilecache')
+
+class JavaCompileCache(object):
+	"""
+	A content-addressed, size-bounded cache of compiled Java class directories.
+
+	Each entry is identified by a key that is a hash of the contents of the source files, the compiler executable, the
+	compiler arguments, and the resolved classpath (including the size and modification time of each classpath file).
+	When the total size of the cache exceeds the configured maximum, the least recently used entries are evicted.
+
+	This class is thread-safe, and it is safe for multiple PySys processes to share the same cache directory.
+	Usually it is not necessary to use this class directly; instead use `getCache` to get the shared instance for
+	a given directory.
+
+	:param str cacheDir: The absolute path of the directory to store cached classes in.
+	:param float maxSizeMB: The maximum total size of the cache.
+	:param bool useHardLinks: If True, cached class files will be hard linked into the output directory where possible
+		rather than copied. This is faster and uses less disk space, but the linked files share the same storage (and 
+		permissions) as the cache entry. Cached files are read-only, so a test that tries to rewrite a linked class 
+		file in-place (for example, for instrumentation) gets an error rather than silently corrupting the cache. 
+	"""
+
+	FORMAT_VERSION = 1
+	"""Incremented whenever the cache layout or key format changes, to avoid using incompatible entries. """
+
+	__instances = {}
+	__instancesLock = threading.Lock()
+
+	def __init__(self, cacheDir, maxSizeMB, useHardLinks=False):
+		self.cacheDir = os.path.normpath(cacheDir)
+		self.maxSizeBytes = int(maxSizeMB*1024*1024)
+		self.useHardLinks = useHardLinks
+		self.__lock = threading.Lock() # only held briefly, to protect the pinned entries
+		self.__evictLock = threading.Lock()
+		self.__pinned = collections.Counter() # entry dir -> number of threads copying from it
+
+	@staticmethod
+	def getCache(cacheDir, maxSizeMB, useHardLinks=False):
+		"""
+		Get the shared cache instance for the specified directory, creating it if this is the first use.
+
+		The most recently specified ``maxSizeMB`` and ``useHardLinks`` values are used.
+		"""
+		cacheDir = os.path.normpath(cacheDir)
+		with JavaCompileCache.__instancesLock:
+			cache = JavaCompileCache.__instances.get(cacheDir)
+			if cache is None:
+				cache = JavaCompileCache.__instances[cacheDir] = JavaCompileCache(cacheDir, maxSizeMB, useHardLinks)
+			cache.maxSizeBytes, cache.useHardLinks = int(maxSizeMB*1024*1024), useHardLinks
+			return cache
+
+	def getKey(self, compilerExecutable, inputfiles, classpath, arguments, workingDir=None):
+		"""
+		Calculate the cache key for a compilation.
+
+		:param str compilerExecutable: The path to javac.
+		:param list[(str,str)] inputfiles: A list of ``(name, path)`` tuples for each source file, where the name is
+			the path relative to the input directory (which is used rather than the full path, so that copies of the
+			same sources in different locations can share a cache entry).
+		:param list[str] classpath: The resolved classpath entries.
+		:param list[str] arguments: The compiler arguments, excluding the ``-d`` output directory, classpath and
+			source files.
+		:param str workingDir: The working directory of the compiler, which relative classpath entries are resolved
+			against.
+		:return str: A hex string.
+		"""
+		h = hashlib.sha256()
+		def add(*items):
+			for i in items: h.update(str(i).encode('utf-8', errors='surrogateescape')+b'\0')
+
+		add('format', self.FORMAT_VERSION)
+		add('javac', os.path.normpath(compilerExecutable), self.__statKey(compilerExecutable))
+		add('args', len(arguments), *arguments)
+		add('classpath', len(classpath))
+		for c in classpath:
+			add(c)
+			c = os.path.join(workingDir, c) if workingDir else c
+			add(self.__statKey(c))
+			if os.path.isdir(toLongPathSafe(c)):
+				for base, dirs, files in os.walk(toLongPathSafe(c)):
+					dirs.sort()
+					for f in sorted(files):
+						add(os.path.relpath(os.path.join(base, f), toLongPathSafe(c)), self.__statKey(os.path.join(base, f)))
+
+		add('sources', len(inputfiles))
+		for name, path in sorted(inputfiles):
+			with open(toLongPathSafe(path), 'rb') as f:
+				add(name.replace(os.sep, '/'), hashlib.sha256(f.read()).hexdigest())
+		return h.hexdigest()
+
+	@staticmethod
+	def __statKey(path):
+		try:
+			st = os.stat(toLongPathSafe(path))
+		except OSError:
+			return 'missing'
+		if os.path.isdir(toLongPathSafe(path)): return 'dir'
+		return '%d:%d'%(st.st_size, st.st_mtime_ns)
+
+	def __entryDir(self, key):
+		return os.path.join(self.cacheDir, key[:2], key)
+
+	def materialize(self, key, output, stderr):
+		"""
+		Copy (or hard link) the cached classes for the specified key into the output directory, if present.
+
+		:param str key: The cache key from `getKey`.
+		:param str output: The directory to write the classes to.
+		:param str stderr: The path to write the ``javac`` stderr that was recorded when the entry was created (which
+			may contain warnings).
+		:return bool: True if the classes were found in the cache, or False if there is no entry for this key
+			(a cache miss).
+		"""
+		entry = self.__entryDir(key)
+		with self.__lock: # pin the entry to prevent eviction by another thread while it is being copied
+			self.__pinned[entry] += 1
+		try:
+			self.__materialize(entry, output, stderr)
+		except FileNotFoundError: # e.g. no entry or evicted by another process
+			return False
+		except Exception as ex:
+			log.warning('Failed to read Java compilation cache entry %s: %s', entry, ex)
+			return False
+		finally:
+			with self.__lock:
+				self.__pinned[entry] -= 1
+				if not self.__pinned[entry]: del self.__pinned[entry]
+		return True
+
+	def __materialize(self, entry, output, stderr):
+		shutil.copyfile(toLongPathSafe(entry+os.sep+'javac.err'), toLongPathSafe(stderr))
+
+		# update the modification time, which is used for least-recently-used eviction
+		os.utime(toLongPathSafe(entry))
+
+		classesDir = toLongPathSafe(entry+os.sep+'classes')
+		for base, dirs, files in os.walk(classesDir):
+			destbase = toLongPathSafe(os.path.join(output, os.path.relpath(base, classesDir)))
+			mkdir(destbase)
+			for f in files:
+				dest = os.path.join(destbase, f)
+				if os.path.lexists(dest): os.remove(dest)
+				self.__linkOrCopy(os.path.join(base, f), dest)
+
+	def __linkOrCopy(self, src, dest):
+		if self.useHardLinks:
+			try:
+				os.link(src, dest)
+				return
+			except OSError: # e.g. different file system or not supported on this platform
+				pass
+		shutil.copyfile(src, dest) # not copying the read-only permissions of the cache
+
+	def store(self, key, output, stderr):
+		"""
+		Add the compiled classes from the specified output directory to the cache, and then evict old entries if the
+		maximum size has been exceeded.
+
+		:param str key: The cache key from `getKey`.
+		:param str output: The directory containing the compiled classes.
+		:param str stderr: The path of the stderr file from ``javac``, which will be copied by future calls to `materialize`.
+		"""
+		entry = self.__entryDir(key)
+		if os.path.exists(toLongPathSafe(entry)): return
+
+		# Populate a temporary directory first, then rename it, so that other threads/processes never see a partial entry
+		tmp = mkdir(os.path.join(self.cacheDir, 'tmp', uuid.uuid4().hex))
+		try:
+			shutil.copytree(toLongPathSafe(output), toLongPathSafe(tmp+os.sep+'classes'))
+			shutil.copyfile(toLongPathSafe(stderr), toLongPathSafe(tmp+os.sep+'javac.err'))
+			for base, dirs, files in os.walk(toLongPathSafe(tmp+os.sep+'classes')):
+				for f in files: 
+					os.chmod(os.path.join(base, f), stat.S_IMODE(os.stat(os.path.join(base, f)).st_mode) & ~(stat.S_IWUSR|stat.S_IWGRP|stat.S_IWOTH))
+			size = sum(os.path.getsize(os.path.join(base, f)) for base, dirs, files in os.walk(toLongPathSafe(tmp)) for f in files)
+			with open(toLongPathSafe(tmp+os.sep+'entry.json'), 'w', encoding='utf-8') as f:
+				json.dump({'sizeBytes':size, 'created':time.time()}, f)
+			mkdir(os.path.dirname(entry))
+			try:
+				os.rename(toLongPathSafe(tmp), toLongPathSafe(entry))
+			except OSError: # another thread or process got there first
+				pass
+		finally:
+			if os.path.exists(toLongPathSafe(tmp)): deletedir(tmp, ignore_errors=True)
+
+		self.evict()
+
+	def evict(self):
+		"""
+		Remove the least recently used entries until the total size of the cache is below the configured maximum.
+		"""
+		with self.__evictLock:
+			entries = []
+			for prefix in os.listdir(toLongPathSafe(self.cacheDir)):
+				if len(prefix) != 2: continue # e.g. tmp dir
+				for key in os.listdir(toLongPathSafe(os.path.join(self.cacheDir, prefix))):
+					entry = os.path.join(self.cacheDir, prefix, key)
+					try:
+						with open(toLongPathSafe(entry+os.sep+'entry.json'), 'r', encoding='utf-8') as f:
+							size = json.load(f)['sizeBytes']
+						entries.append((os.path.getmtime(toLongPathSafe(entry)), size, entry))
+					except Exception: # e.g. concurrently deleted by another process
+						continue
+			totalSize = sum(size for (mtime, size, entry) in entries)
+			if totalSize <= self.maxSizeBytes: return
+
+			entries.sort()
+			evicted = 0
+			for (mtime, size, entry) in entries:
+				if totalSize <= self.maxSizeBytes: break
+				# move it out of the way while no thread is copying from it, then delete it without holding the lock
+				deleted = os.path.join(self.cacheDir, 'tmp', 'evicted-'+uuid.uuid4().hex)
+				with self.__lock:
+					if self.__pinned[entry]: continue
+					try:
+						mkdir(os.path.dirname(deleted))
+						os.rename(toLongPathSafe(entry), toLongPathSafe(deleted))
+					except OSError: # e.g. concurrently deleted by another process
+						continue
+				deletedir(deleted, ignore_errors=True)
+				totalSize -= size
+				evicted += 1
+			log.debug('Evicted %d least recently used entries from the Java compilation cache; size is now %0.1f MB',
+				evicted, totalSize/1024.0/1024)
@@ -0,0 +1,126 @@
+"""
+A long-lived JVM that compiles Java source files on behalf of `pysysjava.javaplugin.JavaPlugin.compile`, which
+avoids paying the JVM startup and JIT warmup cost of a new ``javac`` process for every compilation.
+"""
+
+import os
+import logging
+import socket
+import threading
+
+import pysys
+from pysys.constants import *
+from pysys.exceptions import ProcessTimeout
+from pysys.utils.fileutils import mkdir
+
+log = logging.getLogger('pysys.pysysjava.compileserver')
+
+class JavaCompileServer(object):
+	"""
+	This is a PySys runner plugin that starts a single Java compile server JVM at the beginning of the test run,
+	which is then used by `pysysjava.javaplugin.JavaPlugin.compile` from all tests instead of starting a separate
+	``javac`` process for each compilation.
+
+	To enable it, add this to your project configuration (the alias must be ``javaCompileServer``)::
+
+		<runner-plugin classname="pysysjava.compileserver.JavaCompileServer" alias="javaCompileServer"/>
+
+	The server uses the ``javax.tools.JavaCompiler`` API from the JDK identified by the ``javaHome`` project property,
+	and receives compilation jobs from tests over a local (loopback) TCP socket. The compiler diagnostics are written
+	to the same ``javac`` stderr file as when ``javac`` is executed directly, so error reporting is unchanged.
+
+	If the compile server fails to start, or stops responding during the test run, a warning is logged and compilation
+	falls back to executing ``javac`` directly. Compilations whose arguments include ``-J`` JVM options are always
+	executed using ``javac`` since those options cannot be applied to an existing JVM. Note that any relative paths
+	in the compiler arguments are resolved against the server's working directory (rather than the test output
+	directory) so it is best to use absolute paths.
+
+	The compile server can be disabled for a particular run using ``pysys run -XjavaCompileServer=false``.
+	"""
+
+	jvmArgs = '-Xmx512m -XX:+UseSerialGC -XX:TieredStopAtLevel=1 -XX:-UsePerfData'
+	"""
+	A space-delimited string of JVM arguments for the compile server process.
+
+	Since a single JVM performs the compilation for all tests in the run (including concurrent compilations when
+	running with multiple threads), you may need to increase the maximum heap size for large projects.
+	"""
+
+	def setup(self, runner):
+		self.runner = runner
+		self.process = None
+		"""The `pysys.process.Process` for the compile server JVM, or None if it is not running. """
+		self.port = None
+		self.__lock = threading.Lock()
+
+		if not runner.getXArg('javaCompileServer', True):
+			log.info('Java compile server is disabled for this run')
+			return
+
+		from pysysjava.javaplugin import JavaPlugin
+		java = JavaPlugin()
+		java.setup(runner)
+
+		serverDir = mkdir(os.path.join(runner.output, 'pysysjava-compile-server'))
+		try:
+			java.compile(os.path.join(os.path.dirname(__file__), 'java', 'pysysjava', 'internal', 'CompileServer.java'),
+				output=serverDir+'/classes', arguments=[], stdouterr=serverDir+'/javac-compile-server', abortOnError=True)
+
+			port = runner.getNextAvailableTCPPort()
+			process = java.startJava('pysysjava.internal.CompileServer', [str(port)], classpath=[serverDir+'/classes'],
+				jvmArgs=java._splitShellArgs(self.jvmArgs), disableCoverage=True, stdouterr=serverDir+'/compile-server',
+				background=True, abortOnError=True)
+			runner.waitForSocket(port, host='127.0.0.1', process=process, abortOnError=True)
+		except Exception as ex:
+			log.warning('Failed to start Java compile server, so javac will be executed directly instead: %s', ex)
+			return
+		self.process, self.port = process, port
+
+	def isAvailable(self):
+		"""
+		Returns True if the compile server is running and can accept compilation jobs.
+		"""
+		return self.process is not None and self.process.running()
+
+	def compile(self, arguments, stdout, stderr, timeout):
+		"""
+		Submit a compilation job to the compile server and wait for it to complete.
+
+		:param list[str] arguments: The ``javac`` arguments. Any paths should be absolute.
+		:param str stdout: The absolute path to write the compiler's stdout to.
+		:param str stderr: The absolute path to write the compiler's stderr (i.e. the diagnostics) to.
+		:param float timeout: The maximum time to wait for the compilation.
+		:return: The compiler exit status, or None if the server is not available (in which case the caller should
+			execute ``javac`` directly instead).
+		:rtype: int
+		:raises pysys.exceptions.ProcessTimeout: If the compilation does not complete within the timeout.
+		"""
+		if not self.isAvailable(): return None
+
+		escape = lambda a: a.replace('\\', '\\\\').replace('\n', '\\n').replace('\r', '\\r')
+		request = '\n'.join([stdout, stderr, str(len(arguments))]+[escape(a) for a in arguments])+'\n'
+		response = b''
+		try:
+			with socket.create_connection(('127.0.0.1', self.port), timeout=timeout) as s:
+				s.sendall(request.encode('utf-8'))
+				while True:
+					data = s.recv(1024)
+					if not data: break
+					response += data
+		except socket.timeout:
+			raise ProcessTimeout('Java compile server did not complete compilation within %d secs'%timeout)
+		except OSError as ex:
+			self.__disable('%s'%ex)
+			return None
+
+		if not response.strip(): # e.g. the JVM terminated during the job, or hit an unexpected error
+			self.__disable('no response received')
+			return None
+		return int(response.decode('ascii').strip())
+
+	def __disable(self, reason):
+		with self.__lock:
+			if self.process is None: return
+			log.warning('Java compile server is no longer available (%s), so javac will be executed directly instead; see %s',
+				reason, self.process.stderr)
+			self.process = None
@@ -7,13 +7,16 @@ __all__ = [
 	"JavaCoverageWriter",
 ]
 
-import logging, sys, io, os, shlex, glob, time
+import logging, sys, io, os, re, shlex, glob, time, socket, threading, collections
 
 from pysys.constants import *
 from pysys.writer.api import *
 from pysys.writer.testoutput import CollectTestOutputWriter
 from pysys.utils.fileutils import mkdir, deletedir, toLongPathSafe, fromLongPathSafe, pathexists
 import pysysjava
+from pysysjava import jacocoexec
+from pysysjava.coverageimpact import CoverageTestIndex
+from pysysjava.chrometrace import traceSpan
 
 log = logging.getLogger('pysys.pysysjava.coverage')
 
@@ -41,11 +44,11 @@ class JavaCoverageWriter(CollectTestOutputWriter):
 	data (for example, `pysysjava.javaplugin.JavaPlugin.startJava` calls this method). You must configure the 
 	writer with the alias ``javaCoverageWriter`` so that the plugin knows to use it when starting Java processes. 
 
-	Note that this writer uses ``output=file`` JaCoCo agent option which 
+	By default this writer uses ``output=file`` JaCoCo agent option which 
 	dumps coverage information to a file when the Java process exits. This means background processes that are still 
 	running when the PySys test finishes (and get killed by PySys) will not generate any coverage - so try to ensure 
-	clean termination where possible. (An alternative approach would be to implement a Java TCP server using the JaCoCo 
-	API which each Java process connects to, but this writer doesn't go that far).
+	clean termination where possible, or set `agentOutput` to ``tcpclient`` which avoids this problem by collecting 
+	coverage over TCP. 
 
 	If coverage is generated, the directory containing all coverage files is published as an artifact named 
 	"coverageDestDir". Optionally an archive of this directory can be generated by setting the 
@@ -91,6 +94,42 @@ class JavaCoverageWriter(CollectTestOutputWriter):
 	This is required for the HTML report to show the line-by-line source file coverage. 
 	"""
 
+	agentOutput = 'file'
+	"""
+	Controls how the JaCoCo agent in each Java process outputs its coverage data. 
+	
+	The default is ``file``, which writes a ``.javacoverage`` file to the test output directory when the process exits, 
+	which is then collected into the ``destDir`` after the test completes. 
+	
+	If set to ``tcpclient``, the writer starts a single coverage server (listening on the loopback interface) for the 
+	whole test run, and each Java process connects to it using the agent's ``output=tcpclient`` option. The coverage 
+	data from each process is written to its own ``jacoco-tcpserver-SESSIONID.javacoverage`` file in the ``destDir`` 
+	when the process disconnects. Before each test's background processes are stopped during test cleanup, the 
+	server requests the latest coverage data from them, so coverage is not lost for processes that are killed at the 
+	end of the test. 
+	"""
+
+	incrementalMergeBatchSize = 100
+	"""
+	When using ``agentOutput=file``, the collected coverage files are merged in a background thread during the test 
+	run whenever this many new files have been collected (or `incrementalMergeIntervalSecs` has passed), keeping a 
+	rolling merged ``jacoco-merged-java-coverage.exec`` file. This avoids a long merge of every coverage file at the 
+	end of the run. Set to 0 to disable incremental merging. 
+	"""
+
+	incrementalMergeIntervalSecs = 60.0
+	"""
+	The maximum time that collected coverage files wait before being merged in the background, if there are fewer 
+	than `incrementalMergeBatchSize` of them. 
+	"""
+
+	testIndexFile = 'java-coverage-test-index.json'
+	"""
+	The name of a JSON file written to the ``destDir`` that records which Java classes were covered by each test, which 
+	can be used to run only the tests affected by a change using `pysysjava.coverageimpact.CoverageTestImpactSelector`. 
+	See `pysysjava.coverageimpact.CoverageTestIndex` for details of the format. Set to an empty string to disable. 
+	"""
+
 	reportArgs = ''
 	"""
 	A space-separated string of additional command line arguments to pass to the JaCoCo report command line. 
@@ -108,9 +147,73 @@ class JavaCoverageWriter(CollectTestOutputWriter):
 		if not self.destDir: raise Exception('The destDir JavaCoverageWriter property must be set')
 		if (not self.jacocoDir) or (not os.path.isdir(self.jacocoDir)): raise Exception('The jacocoDir JavaCoverageWriter property must be set and must exist: "%s"'%self.jacocoDir)
 		self.__agentJar = safeGlob(self.jacocoDir+'/*jacoco*agent*.jar', expected='==1', name='JaCoCo agent jar (from the jacocoDir)').replace('\\','/')
+		if self.agentOutput not in ['file', 'tcpclient']: raise Exception('Unsupported JavaCoverageWriter agentOutput value: "%s"'%self.agentOutput)
 		
 		return True
 
+	def setup(self, **kwargs):
+		super(JavaCoverageWriter, self).setup(**kwargs)
+		self.__testIndex = CoverageTestIndex() if self.__agentJar is not None and self.testIndexFile else None
+		self.__sessionTestIds = {} # session id -> test id, for the coverage server
+		
+		self.__server = None
+		if self.__agentJar is not None and self.agentOutput == 'tcpclient':
+			self.__server = _CoverageServer(fromLongPathSafe(self.destDir),
+				onSessionData=self.__sessionDataReceived if self.__testIndex is not None else None)
+			log.debug('Started Java coverage server on port %d', self.__server.port)
+
+		self.__merger = None
+		if self.__agentJar is not None and self.agentOutput == 'file' and int(self.incrementalMergeBatchSize) > 0:
+			self.__collectLock = threading.Lock()
+			self.__merger = _IncrementalCoverageMerger(self._mergeCoverageFiles, 
+				int(self.incrementalMergeBatchSize), float(self.incrementalMergeIntervalSecs))
+
+	def collectPath(self, testObj, path, **kwargs):
+		if self.__testIndex is not None and path.endswith('.javacoverage'):
+			try:
+				self.__testIndex.addExecutionData(testObj.descriptor.id, jacocoexec.ExecutionDataStore().load(path))
+			except Exception as ex:
+				log.warning('Failed to add Java coverage file to the test index: %s', ex)
+
+		if self.__merger is None: return super(JavaCoverageWriter, self).collectPath(testObj, path, **kwargs)
+		
+		# identify the collected file by comparing the directory contents, so that the merger only sees complete files
+		with self.__collectLock:
+			destDir = fromLongPathSafe(self.destDir)
+			before = set(os.listdir(destDir)) if os.path.isdir(destDir) else set()
+			super(JavaCoverageWriter, self).collectPath(testObj, path, **kwargs)
+			self.__merger.add([os.path.join(destDir, f) for f in os.listdir(destDir) if f not in before and f.endswith('.javacoverage')])
+
+	def __sessionDataReceived(self, sessionId, data):
+		testId = self.__sessionTestIds.get(sessionId)
+		if testId is None: return # e.g. a process started by the runner rather than a test
+		try:
+			self.__testIndex.addExecutionData(testId, jacocoexec.ExecutionDataStore().loadBytes(data, name=sessionId))
+		except Exception as ex:
+			log.warning('Failed to add Java coverage data to the test index: %s', ex)
+
+	def _mergeCoverageFiles(self, coveragefiles):
+		"""
+		Merge the specified coverage files into ``jacoco-merged-java-coverage.exec`` (including any data already in that 
+		file), and delete them. 
+		
+		The merge is performed in-process using `pysysjava.jacocoexec` rather than by starting the JaCoCo CLI. 
+		
+		:param list[str] coveragefiles: The absolute paths of the files to merge. 
+		"""
+		merged = os.path.normpath(fromLongPathSafe(self.destDir))+os.sep+'jacoco-merged-java-coverage.exec'
+		inputs = ([merged] if pathexists(merged) else [])+coveragefiles
+		
+		starttime = time.monotonic()
+		try:
+			store = jacocoexec.mergeExecutionDataFiles(inputs, merged+'.tmp')
+		except Exception as ex:
+			raise Exception('Failed to merge Java code coverage data: %s'%ex)
+		os.replace(toLongPathSafe(merged+'.tmp'), toLongPathSafe(merged))
+		for f in coveragefiles: os.remove(toLongPathSafe(f))
+		log.debug('Merged %d Java coverage files (%d sessions, %d classes) in %0.1f secs', len(inputs), 
+			len(store.sessions), len(store.classes), time.monotonic()-starttime)
+
 	def getCoverageJVMArgs(self, owner, stdouterr=None): 
 		"""
 		Get the JVM arguments needed to add Java coverage to a new Java process, or empty if this coverage writer is 
@@ -140,70 +243,309 @@ class JavaCoverageWriter(CollectTestOutputWriter):
 		uniquer, n = '', 1
 		while destfile % uniquer in namesUsed: n, uniquer = n+1, '.%s'%n
 		
+		if getattr(owner, 'descriptor', None) is not None: self.__sessionTestIds[sessionid] = owner.descriptor.id
+		if self.__server is not None: self.__server.expectSession(sessionid)
+		
 		agentArgs = self.agentArgs
 		if agentArgs: agentArgs = ','+agentArgs
-		if 'output=' not in agentArgs:
+		if self.__server is not None:
+			agentArgs = f',output=tcpclient,address=127.0.0.1,port={self.__server.port}{agentArgs}'
+			
+			# make sure we get the coverage data before the owner's cleanup stops its processes
+			if not getattr(owner, '__JavaCoverageWriter.dumpRequested', False) and hasattr(owner, 'addCleanupFunction'):
+				setattr(owner, '__JavaCoverageWriter.dumpRequested', True)
+				owner.addCleanupFunction(lambda: self.__server.requestDumps(str(owner)))
+		elif 'output=' not in agentArgs:
 			agentArgs = f',output=file,destfile={destfile % uniquer}{agentArgs}'
 
 		return [f'-javaagent:{self.__agentJar}=sessionid={sessionid}{agentArgs}']
 
 	def cleanup(self, **kwargs):
-		java = pysysjava.javaplugin.JavaPlugin()
-		java.setup(self.runner)
-		
-		coverageDestDir = self.destDir
-		assert os.path.isabs(coverageDestDir) # The base class is responsible for absolutizing this config property
-		coverageDestDir = os.path.normpath(fromLongPathSafe(coverageDestDir))
-		if not pathexists(coverageDestDir):
-			log.info('No Java coverage files were generated.')
-			return
-			
-		log.info('Preparing Java coverage report in: %s', coverageDestDir)
-		cliJar = safeGlob(self.jacocoDir+'/*jacoco*cli*.jar', expected='==1', name='JaCoCo CLI jar (from the jacocoDir)')
-
-		coveragefiles = [f for f in os.listdir(coverageDestDir) if f.endswith('.javacoverage')]
-		java.startJava(cliJar, ['merge']+coveragefiles+['--destfile', 'jacoco-merged-java-coverage.exec'], abortOnError=True, 
-			workingDir=coverageDestDir, stdouterr=coverageDestDir+'/java-coverage-merge', 
-			disableCoverage=True, onError=lambda process: 
-				'Failed to merge Java code coverage data: %s'%self.runner.getExprFromFile(process.stderr, '.+', returnAll=True)[-1] 
-					or self.runner.logFileContents(process.stderr, maxLines=0))
-		for f in coveragefiles: os.remove(toLongPathSafe(coverageDestDir+os.sep+f))
-
-		classpath = java.toClasspathList(self.classpath)
-		if not classpath:
-			log.info('No Java report will be generated as no classpath was specified')
-		else:
-			log.debug('Application classpath for the coverage report is: \n%s', '\n'.join("     cp #%-2d    : %s%s"%(
-				i+1, pathelement, '' if os.path.exists(pathelement) else ' (does not exist!)') for i, pathelement in enumerate(classpath)))
-
-			sourceDirs = java.toClasspathList(self.sourceDirs) # not really a classpath, but or consistency, parse it the same way
-
-			args = []
-			for x in classpath: args.extend(['--classfiles', x])
-			for x in sourceDirs: args.extend(['--sourcefiles', x])
+		with traceSpan(self.runner, 'JavaCoverageWriter.cleanup', 'coverage'):
+			java = pysysjava.javaplugin.JavaPlugin()
+			java.setup(self.runner)
+		
+			if self.__server is not None:
+				self.__server.shutdown()
+				log.info('Java coverage server received coverage data from %d Java processes', self.__server.sessions)
+			if self.__merger is not None:
+				self.__merger.stop()
+				if self.__merger.mergedFiles: log.info('Merged %d Java coverage files in the background during the test run', 
+					self.__merger.mergedFiles)
+
+			coverageDestDir = self.destDir
+			assert os.path.isabs(coverageDestDir) # The base class is responsible for absolutizing this config property
+			coverageDestDir = os.path.normpath(fromLongPathSafe(coverageDestDir))
+			if not pathexists(coverageDestDir):
+				log.info('No Java coverage files were generated.')
+				return
 			
-			if sourceDirs:
-				(log.warn if any(not os.path.exists(p) for p in sourceDirs) else log.debug)('Java source directories for the coverage report are: \n%s', '\n'.join("    dir #%-2d    : %s%s"%(
-					i+1, pathelement, '' if os.path.exists(pathelement) else ' (does not exist!)') for i, pathelement in enumerate(sourceDirs)))
+			log.info('Preparing Java coverage report in: %s', coverageDestDir)
+			cliJar = safeGlob(self.jacocoDir+'/*jacoco*cli*.jar', expected='==1', name='JaCoCo CLI jar (from the jacocoDir)')
+
+			coveragefiles = [coverageDestDir+os.sep+f for f in os.listdir(coverageDestDir) if f.endswith('.javacoverage')]
+			if coveragefiles: self._mergeCoverageFiles(coveragefiles)
+
+			if self.__testIndex is not None and self.__testIndex.getTestIds():
+				self.__testIndex.save(os.path.join(coverageDestDir, self.testIndexFile))
+				log.info('Java coverage test index for %d tests written to: %s', len(self.__testIndex.getTestIds()), self.testIndexFile)
+
+			classpath = java.toClasspathList(self.classpath)
+			if not classpath:
+				log.info('No Java report will be generated as no classpath was specified')
 			else:
-				log.info('No source directories were provided so the coverage HTML report will not include line-by-line highlighted source files')
-
-			java.startJava(cliJar, ['report', 'jacoco-merged-java-coverage.exec', '--xml', 'java-coverage.xml', '--html', '.']
-				+java._splitShellArgs(self.reportArgs)+args, 
-				abortOnError=True, 
-				workingDir=coverageDestDir, stdouterr=coverageDestDir+'/java-coverage-report', 
-				disableCoverage=True, onError=lambda process: 
-					'Failed to create Java code coverage report: %s'%self.runner.getExprFromFile(process.stderr, '.+', returnAll=True)[-1]
-						or self.runner.logFileContents(process.stderr, maxLines=0))
-
-		# to avoid confusion, remove any zero byte out/err files from the above
-		for p in os.listdir(coverageDestDir):
-			p = os.path.join(coverageDestDir, p)
-			if p.endswith(('.out', '.err')) and os.path.getsize(p)==0:
-				os.remove(p)
+				log.debug('Application classpath for the coverage report is: \n%s', '\n'.join("     cp #%-2d    : %s%s"%(
+					i+1, pathelement, '' if os.path.exists(pathelement) else ' (does not exist!)') for i, pathelement in enumerate(classpath)))
+
+				sourceDirs = java.toClasspathList(self.sourceDirs) # not really a classpath, but or consistency, parse it the same way
+
+				args = []
+				for x in classpath: args.extend(['--classfiles', x])
+				for x in sourceDirs: args.extend(['--sourcefiles', x])
+			
+				if sourceDirs:
+					(log.warn if any(not os.path.exists(p) for p in sourceDirs) else log.debug)('Java source directories for the coverage report are: \n%s', '\n'.join("    dir #%-2d    : %s%s"%(
+						i+1, pathelement, '' if os.path.exists(pathelement) else ' (does not exist!)') for i, pathelement in enumerate(sourceDirs)))
+				else:
+					log.info('No source directories were provided so the coverage HTML report will not include line-by-line highlighted source files')
+
+				java.startJava(cliJar, ['report', 'jacoco-merged-java-coverage.exec', '--xml', 'java-coverage.xml', '--html', '.']
+					+java._splitShellArgs(self.reportArgs)+args, 
+					abortOnError=True, 
+					workingDir=coverageDestDir, stdouterr=coverageDestDir+'/java-coverage-report', 
+					disableCoverage=True, onError=lambda process: 
+						'Failed to create Java code coverage report: %s'%self.runner.getExprFromFile(process.stderr, '.+', returnAll=True)[-1]
+							or self.runner.logFileContents(process.stderr, maxLines=0))
+
+			# to avoid confusion, remove any zero byte out/err files from the above
+			for p in os.listdir(coverageDestDir):
+				p = os.path.join(coverageDestDir, p)
+				if p.endswith(('.out', '.err')) and os.path.getsize(p)==0:
+					os.remove(p)
+		
+			try:
+				self.archiveAndPublish()
+			except PermissionError: # pragma: no cover - can occur transiently on Windows due to file system locking
+				time.sleep(5.0)
+				self.archiveAndPublish()
+
+class _CoverageServer(object):
+	"""
+	A TCP server that JaCoCo agents started with ``output=tcpclient`` connect to, which writes the coverage data 
+	from each connection to a separate execution data file in the specified directory. 
+	
+	For each connection the server keeps the latest coverage data received from the agent (which is cumulative), and 
+	writes it to a file when the connection is closed, either after the agent sends its final data on JVM shutdown 
+	or because the process was killed. If ``onSessionData`` is specified, it is also called with the session id and 
+	the final coverage data (as a complete execution data stream) for each connection. 
+	"""
+	
+	dumpTimeoutSecs = 30.0
+	
+	def __init__(self, destDir, onSessionData=None):
+		self.destDir = destDir
+		self.onSessionData = onSessionData
+		self.sessions = 0
+		self.__lock = threading.Lock()
+		self.__condition = threading.Condition(self.__lock)
+		self.__connections = set()
+		self.__unidentified = set() # connections whose session id is not known yet
+		self.__expected = collections.Counter() # session id -> number of processes started with it
+		self.__identified = collections.Counter() # session id -> number of connections that have identified themselves
+		self.__threads = []
+		self.__fileNamesUsed = set()
+		
+		self.__socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+		self.__socket.bind(('127.0.0.1', 0))
+		self.__socket.listen(50)
+		self.port = self.__socket.getsockname()[1]
+		threading.Thread(target=self.__acceptConnections, name='JavaCoverageServer', daemon=True).start()
+
+	def __acceptConnections(self):
+		while True:
+			try:
+				sock, _ = self.__socket.accept()
+			except OSError: # socket closed by shutdown()
+				return
+			connection = _CoverageServerConnection(self, sock)
+			with self.__lock:
+				self.__connections.add(connection)
+				self.__unidentified.add(connection)
+				self.__threads.append(threading.Thread(target=connection.run, name='JavaCoverageServer-connection', daemon=True))
+				self.__threads[-1].start()
+
+	def expectSession(self, sessionId):
+		"""
+		Record that a process is being started with the specified session id, so that `requestDumps` can wait for it 
+		to connect. 
+		"""
+		with self.__lock:
+			self.__expected[sessionId] += 1
+
+	def connectionIdentified(self, connection):
+		# Called once the session id of a connection is known (from its first dump), or when it's closed without one
+		with self.__condition:
+			if connection not in self.__unidentified: return
+			self.__unidentified.discard(connection)
+			if connection.sessionId is not None: self.__identified[connection.sessionId] += 1
+			self.__condition.notify_all()
+
+	def requestDumps(self, owner=None):
+		"""
+		Request the latest coverage data from connected agents, waiting until it has been received. 
 		
+		:param str owner: If specified, only agents whose session id is owner (or starts with owner followed by a 
+			dot) are asked. 
+		"""
+		def isOwners(sessionId): return owner is None or sessionId is not None and (sessionId == owner or sessionId.startswith(owner+'.'))
+		with self.__condition:
+			# Only wait for connections that haven't sent their session id yet if some of the owner's processes are 
+			# still unaccounted for, so one owner is not delayed by unresponsive agents belonging to another
+			self.__condition.wait_for(lambda: not self.__unidentified or all(self.__identified[sessionId] >= count 
+				for sessionId, count in self.__expected.items() if isOwners(sessionId)), timeout=self.dumpTimeoutSecs)
+			connections = [c for c in self.__connections if isOwners(c.sessionId)]
+		for c in connections: 
+			c.requestDump(self.dumpTimeoutSecs)
+
+	def connectionClosed(self, connection, data):
+		with self.__lock:
+			self.__connections.discard(connection)
+			if not data: return
+			# use a unique name for each connection, since several processes could be started with the same session id
+			name = 'jacoco-tcpserver-'+re.sub(r'[^\w.~-]+', '_', connection.sessionId or 'unknown')+'%s.javacoverage'
+			uniquer, n = '', 1
+			while name % uniquer in self.__fileNamesUsed: n, uniquer = n+1, '.%s'%n
+			path = os.path.join(self.destDir, name % uniquer)
+			self.__fileNamesUsed.add(name % uniquer)
+			self.sessions += 1
+		
+		# write to a temporary file first so that a partially written file is never merged
+		mkdir(self.destDir)
+		with open(toLongPathSafe(path+'.tmp'), 'wb') as f:
+			f.write(jacocoexec.getHeader())
+			f.write(data)
+		os.replace(toLongPathSafe(path+'.tmp'), toLongPathSafe(path))
+		if self.onSessionData is not None: self.onSessionData(connection.sessionId, jacocoexec.getHeader()+data)
+
+	def shutdown(self):
+		"""
+		Stop accepting connections, and write the latest coverage data from any agents that are still connected. 
+		"""
+		self.requestDumps()
+		self.__socket.close()
+		with self.__lock:
+			connections, threads = list(self.__connections), list(self.__threads)
+		for c in connections: c.close()
+		for t in threads: t.join() # wait until all the data is written
+
+class _CoverageServerConnection(object):
+	def __init__(self, server, sock):
+		self.server = server
+		self.sock = sock
+		self.sessionId = None
+		self.__data = b'' # latest cumulative coverage data, excluding the header and CMD_OK blocks
+		self.__dumpsReceived = 0
+		self.__closed = False
+		self.__condition = threading.Condition()
+	
+	def run(self):
+		try:
+			with self.sock.makefile('rb') as stream:
+				# the agent requires a header before it will process commands; then immediately request a dump so that 
+				# we know the session id
+				self.sock.sendall(jacocoexec.getHeader()+jacocoexec.getDumpCommand(dump=True, reset=False))
+				blocks = []
+				while True:
+					block = jacocoexec.readBlock(stream)
+					if block is None: break
+					blockType, raw, value = block
+					if blockType == jacocoexec.BLOCK_SESSIONINFO:
+						if self.sessionId is None: self.sessionId = value
+						blocks.append(raw)
+					elif blockType == jacocoexec.BLOCK_EXECUTIONDATA:
+						blocks.append(raw)
+					elif blockType == jacocoexec.BLOCK_CMD_OK:
+						with self.__condition:
+							self.__data, blocks = b''.join(blocks), []
+							self.__dumpsReceived += 1
+							self.__condition.notify_all()
+						if self.__dumpsReceived == 1: self.server.connectionIdentified(self)
+		except (OSError, EOFError) as ex:
+			log.debug('Java coverage server connection from session %s terminated: %s', self.sessionId, ex)
+		finally:
+			with self.__condition:
+				self.__closed = True
+				self.__condition.notify_all()
+			self.close()
+			self.server.connectionIdentified(self)
+			self.server.connectionClosed(self, self.__data)
+
+	def requestDump(self, timeout):
+		with self.__condition:
+			if self.__closed: return
+			dumps = self.__dumpsReceived
+			try:
+				self.sock.sendall(jacocoexec.getDumpCommand(dump=True, reset=False))
+			except OSError: # e.g. process has already terminated
+				return
+			if not self.__condition.wait_for(lambda: self.__closed or self.__dumpsReceived > dumps, timeout=timeout):
+				log.warning('Java coverage agent for session %s did not respond to request for coverage data within %d secs', 
+					self.sessionId, timeout)
+
+	def close(self):
 		try:
-			self.archiveAndPublish()
-		except PermissionError: # pragma: no cover - can occur transiently on Windows due to file system locking
-			time.sleep(5.0)
-			self.archiveAndPublish()
+			self.sock.shutdown(socket.SHUT_RDWR) # also unblocks the reading thread
+			self.sock.close()
+		except OSError: # pragma: no cover
+			pass
+
+class _IncrementalCoverageMerger(object):
+	"""
+	Merges batches of collected coverage files in a background thread. 
+	"""
+	def __init__(self, mergeFunction, batchSize, intervalSecs):
+		self.mergeFunction = mergeFunction
+		self.batchSize = batchSize
+		self.intervalSecs = intervalSecs
+		self.mergedFiles = 0
+		self.__pending = []
+		self.__stopping = False
+		self.__condition = threading.Condition()
+		self.__thread = threading.Thread(target=self.__run, name='JavaCoverageMerger', daemon=True)
+		self.__thread.start()
+
+	def add(self, paths):
+		with self.__condition:
+			if not self.__pending: self.__firstPendingTime = time.monotonic()
+			self.__pending.extend(paths)
+			self.__condition.notify()
+
+	def stop(self):
+		"""
+		Stop the background thread, waiting for any merge in progress to complete. Files that have not been merged are 
+		left for the caller to deal with. 
+		"""
+		with self.__condition:
+			self.__stopping = True
+			self.__condition.notify()
+		self.__thread.join()
+
+	def __run(self):
+		while True:
+			with self.__condition:
+				while not self.__stopping and len(self.__pending) < self.batchSize:
+					if not self.__pending:
+						self.__condition.wait()
+						continue
+					remaining = self.__firstPendingTime+self.intervalSecs-time.monotonic()
+					if remaining <= 0: break
+					self.__condition.wait(remaining)
+				if self.__stopping: return
+				batch, self.__pending = self.__pending, []
+			
+			try:
+				self.mergeFunction(batch)
+			except Exception as ex:
+				log.warning('Background merging of Java coverage files failed so will be performed at the end of the run instead: %s', ex)
+				return
+			self.mergedFiles += len(batch)
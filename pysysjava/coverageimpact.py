@@ -0,0 +1,217 @@
+"""
+Coverage-driven test impact analysis, which uses an index of the Java classes covered by each test (generated by
+`pysysjava.coverage.JavaCoverageWriter`) to run only the tests affected by a set of changed source or class files.
+"""
+
+import os
+import json
+import base64
+import logging
+import threading
+
+from pysys.utils.fileutils import mkdir, toLongPathSafe
+
+log = logging.getLogger('pysys.pysysjava.coverageimpact')
+
+class CoverageTestIndex(object):
+	"""
+	An index from each test id to the set of Java classes that were executed (i.e. had at least one probe executed)
+	by that test.
+
+	The index is saved as a JSON file containing a sorted list of all class names (in the VM format, e.g.
+	``myorg/MyClass$Inner``), and for each test id a base64-encoded bitmap (least significant bit first) of the
+	positions in that list of the classes covered by the test. This keeps the index compact even for large numbers of
+	tests and classes.
+
+	This class is thread-safe.
+	"""
+
+	FORMAT_VERSION = 1
+	"""Incremented whenever the file format changes. """
+
+	def __init__(self):
+		self.__lock = threading.Lock()
+		self.__tests = {} # test id -> set of class names
+
+	def addCoverage(self, testId, classNames):
+		"""
+		Record that the specified test covered the specified classes, in addition to any already recorded for it.
+
+		:param str testId: The test id (including the mode suffix, if any).
+		:param list[str] classNames: The VM names of the covered classes.
+		"""
+		with self.__lock:
+			self.__tests.setdefault(testId, set()).update(classNames)
+
+	def addExecutionData(self, testId, store):
+		"""
+		Record the classes with executed probes in the specified coverage data as covered by the specified test.
+
+		:param str testId: The test id.
+		:param pysysjava.jacocoexec.ExecutionDataStore store: The coverage data.
+		"""
+		self.addCoverage(testId, [c.name for c in store.classes.values() if c.getExecutedProbeCount() > 0])
+
+	def getTestIds(self):
+		"""
+		Returns a sorted list of the ids of all tests in this index.
+		"""
+		with self.__lock:
+			return sorted(self.__tests)
+
+	def getCoveredClasses(self, testId):
+		"""
+		Returns the set of class names covered by the specified test, or None if the test is not in this index.
+		"""
+		with self.__lock:
+			classes = self.__tests.get(testId)
+			return None if classes is None else set(classes)
+
+	def getClassNames(self):
+		"""
+		Returns a sorted list of all class names covered by any test in this index.
+		"""
+		with self.__lock:
+			return sorted(set().union(*self.__tests.values()))
+
+	def getClassesForChangedFiles(self, changedFiles):
+		"""
+		Identify the classes in this index that correspond to the specified changed files.
+
+		A ``.class`` file matches the class whose VM name is a suffix of the path (without the extension), so both
+		``target/classes/myorg/MyClass.class`` and ``myorg/MyClass.class`` match ``myorg/MyClass``. A ``.java`` file
+		matches the top-level class in the same way, plus any nested classes it contains. Other files are ignored.
+
+		:param list[str] changedFiles: The paths of the changed files, which may be absolute or relative.
+		:return (set[str],list[str]): The matching class names, and the ``.java`` and ``.class`` files that did not
+			match any class in this index (for example because they are new files).
+		"""
+		bySimpleName = {} # outer class simple name -> list of class names
+		for c in self.getClassNames():
+			bySimpleName.setdefault(c.split('$')[0].split('/')[-1], []).append(c)
+
+		matched, unmatched = set(), []
+		for path in changedFiles:
+			normalized = path.strip().replace('\\', '/')
+			base, ext = os.path.splitext(normalized)
+			if ext not in ['.java', '.class']: continue
+			base = '/'+base.lstrip('/')
+			simpleName = base.split('/')[-1]
+			candidates = [c for c in bySimpleName.get(simpleName.split('$')[0], [])
+				if base.endswith('/'+(c.split('$')[0] if ext == '.java' else c))]
+			if candidates:
+				matched.update(candidates)
+			else:
+				unmatched.append(path.strip())
+		return matched, unmatched
+
+	def getTestsCoveringClasses(self, classNames):
+		"""
+		Returns the set of test ids whose coverage includes any of the specified classes.
+		"""
+		classNames = set(classNames)
+		with self.__lock:
+			return {t for t, classes in self.__tests.items() if not classes.isdisjoint(classNames)}
+
+	def save(self, path):
+		"""
+		Save this index to the specified JSON file, replacing it if it already exists.
+		"""
+		with self.__lock:
+			classes = sorted(set().union(*self.__tests.values()))
+			positions = {c: i for i, c in enumerate(classes)}
+			tests = {}
+			for t, covered in sorted(self.__tests.items()):
+				bitmap = 0
+				for c in covered: bitmap |= 1 << positions[c]
+				tests[t] = base64.b64encode(bitmap.to_bytes((len(classes)+7)//8, 'little')).decode('ascii')
+
+		mkdir(os.path.dirname(os.path.abspath(path)))
+		with open(toLongPathSafe(path), 'w', encoding='utf-8') as f:
+			json.dump({'formatVersion': self.FORMAT_VERSION, 'classes': classes, 'tests': tests}, f, indent='\t')
+
+	@staticmethod
+	def load(path):
+		"""
+		Load an index from the specified JSON file.
+
+		:raises Exception: If the file cannot be read or has an unsupported format.
+		"""
+		with open(toLongPathSafe(path), 'r', encoding='utf-8') as f:
+			data = json.load(f)
+		if data.get('formatVersion') != CoverageTestIndex.FORMAT_VERSION:
+			raise Exception('Unsupported Java coverage test index format version %s in %s'%(data.get('formatVersion'), path))
+		classes = data['classes']
+		index = CoverageTestIndex()
+		for t, bitmap in data['tests'].items():
+			bitmap = int.from_bytes(base64.b64decode(bitmap), 'little')
+			index.addCoverage(t, [c for i, c in enumerate(classes) if bitmap >> i & 1])
+		return index
+
+class CoverageTestImpactSelector(object):
+	"""
+	This is a PySys runner plugin that uses a Java coverage test index from a previous run to execute only the tests
+	that are affected by a list of changed ``.java`` or ``.class`` files, which can greatly reduce the time taken by
+	pull request builds.
+
+	The index is generated by `pysysjava.coverage.JavaCoverageWriter` (see its ``testIndexFile`` property) during a
+	run with coverage enabled, typically a full run on the main branch whose index is then saved somewhere that later
+	builds can access. To enable this plugin, add it to your project configuration::
+
+		<runner-plugin classname="pysysjava.coverageimpact.CoverageTestImpactSelector" alias="javaTestImpactSelector">
+			<property name="indexFile" value="${testRootDir}/../baseline/java-coverage-test-index.json"/>
+		</runner-plugin>
+
+	and then provide the changed files using ``pysys run -XjavaChangedFiles=PATH1,PATH2,...`` or
+	``-XjavaChangedFiles=@FILE`` where FILE contains one path per line (for example the output of
+	``git diff --name-only main``). If ``-XjavaChangedFiles`` is not specified, all tests are executed as usual.
+
+	When enabled, the selected tests are those whose coverage includes a class corresponding to one of the changed
+	files, plus any tests that are not in the index (such as new tests, or tests that did not execute any Java code).
+	Changed files that are not ``.java`` or ``.class`` files are ignored, as are changed ``.java`` and ``.class``
+	files that do not correspond to any covered class (such as new classes, which can only affect tests through
+	other changed code). Note that the index only records which classes each test executed, so changes that affect
+	behaviour in other ways (such as resources or configuration files) are not detected.
+	"""
+
+	indexFile = ''
+	"""
+	The path of the Java coverage test index file to use for test selection. This can be overridden for a particular
+	run using ``-XjavaCoverageIndexFile=PATH``.
+	"""
+
+	def setup(self, runner):
+		self.runner = runner
+		self.selectedTests = None
+		"""The set of ids of the tests that were selected, or None if test impact selection was not performed. """
+
+		changedFiles = runner.getXArg('javaChangedFiles', '')
+		if not changedFiles: return
+		if changedFiles.startswith('@'):
+			with open(toLongPathSafe(os.path.join(runner.project.testRootDir, changedFiles[1:])), 'r', encoding='utf-8') as f:
+				changedFiles = [l for l in f.read().split('\n') if l.strip()]
+		else:
+			changedFiles = [f for f in changedFiles.split(',') if f.strip()]
+
+		indexFile = runner.getXArg('javaCoverageIndexFile', self.indexFile)
+		if not indexFile:
+			raise Exception('The indexFile property of CoverageTestImpactSelector must be set when using -XjavaChangedFiles')
+		indexFile = os.path.join(runner.project.testRootDir, indexFile)
+		if not os.path.exists(toLongPathSafe(indexFile)):
+			log.warning('All tests will be executed since the Java coverage test index file does not exist: %s', indexFile)
+			return
+		index = CoverageTestIndex.load(indexFile)
+
+		classes, unmatched = index.getClassesForChangedFiles(changedFiles)
+		if unmatched:
+			log.info('Some changed files do not correspond to classes in the Java coverage test index: \n%s',
+				'\n'.join('   %s'%f for f in unmatched))
+		affected = index.getTestsCoveringClasses(classes)
+		indexed = set(index.getTestIds())
+
+		total = len(runner.descriptors)
+		runner.descriptors[:] = [d for d in runner.descriptors if d.id in affected or d.id not in indexed]
+		self.selectedTests = {d.id for d in runner.descriptors}
+		log.info('Java test impact selection is executing %d of %d tests, based on %d changed files (%d changed classes); '
+			'%d of the selected tests are not in the coverage index', len(runner.descriptors), total, len(changedFiles),
+			len(classes), len(self.selectedTests-indexed))
@@ -0,0 +1,150 @@
+"""
+Capture and analysis of the garbage collection (GC) logs of the Java processes started by
+`pysysjava.javaplugin.JavaPlugin.startJava`, so that functional tests can also act as cheap performance regression
+guards for GC pause times and memory usage.
+
+This is enabled by setting the ``gcLogging`` property of the ``JavaPlugin`` or by running with
+``pysys run -XjavaGCLog=true``. Each Java 9+ process is then started with unified GC logging
+(``-Xlog:gc*:file=<stdouterr>.gc.log``) and during test cleanup the logs are summarized using `parseGCLog` and
+written to ``java-gc-summary.json`` in the test output directory. The ``gcMaxPauseP99Ms`` plugin property can be used
+to fail tests whose 99th percentile GC pause time is too high, and `pysysjava.javaplugin.JavaPlugin.getGCLogSummary`
+can be used to assert on other statistics in a test's ``validate`` method.
+
+The parser is written in pure Python and reads the log a line at a time, so it copes with logs of any size. It
+understands the output of the Serial, Parallel, G1, Shenandoah and Z collectors.
+"""
+
+__all__ = [
+	"GCLogParser",
+	"parseGCLog",
+	"getGCLoggingJVMArgs",
+]
+
+import os
+import re
+import math
+
+from pysys.utils.fileutils import toLongPathSafe
+
+from pysysjava.launchtimings import _getJavaMajorVersion
+
+GC_LOG_DECORATORS = 'uptime,level,tags'
+"""The unified logging decorators used for GC logs, which the parser relies on. """
+
+# e.g. [1.234s][info][gc] GC(0) Pause Young (Normal) (G1 Evacuation Pause) 24M->3M(256M) 3.456ms
+_LINE_REGEX = re.compile(r'^\[([0-9.]+)s\]\[[a-z]+ *\]\[([a-z0-9,]+) *\] GC\(([0-9]+)\) (.*)$')
+_PAUSE_REGEX = re.compile(r'^(?:[YO]: )?Pause .* ([0-9.]+)ms$')
+_HEAP_REGEX = re.compile(r' ([0-9]+)([KMG])(?:\([0-9]+%\))?->([0-9]+)([KMG])(?:\([0-9]+%\))?(?:\([0-9]+[KMG]\))?(?: |$)')
+_UNITS_MB = {'K': 1.0/1024, 'M': 1.0, 'G': 1024.0}
+
+def getGCLoggingJVMArgs(javaHome, logFile):
+	"""
+	Returns the JVM arguments needed to write a GC log in the format understood by `GCLogParser`, or an empty list if
+	this Java version does not support unified logging (i.e. is older than Java 9).
+
+	:param str logFile: The log file, which must be in the working directory of the process (to avoid problems with
+		``:`` in Windows paths).
+	"""
+	if _getJavaMajorVersion(javaHome) < 9: return []
+	return ['-Xlog:gc*:file=%s:%s'%(os.path.basename(logFile), GC_LOG_DECORATORS)]
+
+def _percentile(sortedValues, percent):
+	# nearest-rank method
+	if not sortedValues: return None
+	return sortedValues[max(0, int(math.ceil(percent/100.0*len(sortedValues)))-1)]
+
+class GCLogParser(object):
+	"""
+	Streaming parser for Java unified GC logs (as written by ``-Xlog:gc*``, using the `GC_LOG_DECORATORS`).
+
+	Call `addLine` for each line of the log, then `getSummary` to get the statistics.
+	"""
+
+	PERCENTILES = [50, 90, 99]
+	"""The percentiles of pause time included in the summary. """
+
+	def __init__(self):
+		self.__pausesMs = []
+		self.__pauseGCIds = set() # GC ids that have a pause logged with the "gc" tag
+		self.__phasePauses = [] # (gcId, ms) for pauses logged with the "gc,phases" tag, used by ZGC
+		self.__heap = [] # (uptimeSecs, beforeMB, afterMB) for each collection
+		self.__lastUptime = 0.0
+
+	def addLine(self, line):
+		"""
+		Parse the next line of the log.
+		"""
+		m = _LINE_REGEX.match(line.rstrip())
+		if m is None: return
+		uptime, tags, gcId, message = float(m.group(1)), m.group(2), int(m.group(3)), m.group(4)
+		self.__lastUptime = max(self.__lastUptime, uptime)
+		if tags not in ['gc', 'gc,phases']: return
+
+		pause = _PAUSE_REGEX.match(message)
+		if pause is not None:
+			if tags == 'gc':
+				self.__pausesMs.append(float(pause.group(1)))
+				self.__pauseGCIds.add(gcId)
+			else:
+				self.__phasePauses.append((gcId, float(pause.group(1))))
+		if tags == 'gc':
+			heap = _HEAP_REGEX.search(message)
+			if heap is not None:
+				self.__heap.append((uptime, int(heap.group(1))*_UNITS_MB[heap.group(2)], int(heap.group(3))*_UNITS_MB[heap.group(4)]))
+
+	def getSummary(self):
+		"""
+		Returns the statistics for the lines parsed so far.
+
+		:return dict: A dictionary with keys ``pauseCount``, ``totalPauseSecs``, ``maxPauseMs``,
+			``pausePercentilesMs`` (a dict with keys such as ``p99``), ``heapAfterGC`` (a list of
+			``[uptimeSecs, heapAfterGCMB]`` for each collection), ``heapAfterGCSlopeMBPerSec`` (the least-squares trend
+			of the heap after GC, which is consistently positive if there is a leak), ``allocatedMB`` and
+			``allocationRateMBPerSec`` (based on the heap growth between collections), and ``uptimeSecs`` (the JVM uptime
+			of the last GC log line). Values that cannot be calculated from the log are None.
+		"""
+		pausesMs = self.__pausesMs+[ms for gcId, ms in self.__phasePauses if gcId not in self.__pauseGCIds]
+		sortedPauses = sorted(pausesMs)
+
+		allocatedMB = None
+		if self.__heap:
+			allocatedMB, previousAfter = 0.0, 0.0
+			for uptime, before, after in self.__heap:
+				allocatedMB += max(0.0, before-previousAfter)
+				previousAfter = after
+		lastGCUptime = self.__heap[-1][0] if self.__heap else 0.0
+
+		slope = None
+		if len(self.__heap) >= 2:
+			n = len(self.__heap)
+			meanX = sum(h[0] for h in self.__heap)/n
+			meanY = sum(h[2] for h in self.__heap)/n
+			varX = sum((h[0]-meanX)**2 for h in self.__heap)
+			if varX > 0: slope = sum((h[0]-meanX)*(h[2]-meanY) for h in self.__heap)/varX
+
+		return {
+			'pauseCount': len(pausesMs),
+			'totalPauseSecs': sum(pausesMs)/1000.0,
+			'maxPauseMs': sortedPauses[-1] if sortedPauses else None,
+			'pausePercentilesMs': {'p%d'%p: _percentile(sortedPauses, p) for p in self.PERCENTILES},
+			'heapAfterGC': [[uptime, after] for uptime, before, after in self.__heap],
+			'heapAfterGCSlopeMBPerSec': slope,
+			'allocatedMB': allocatedMB,
+			'allocationRateMBPerSec': allocatedMB/lastGCUptime if allocatedMB is not None and lastGCUptime > 0 else None,
+			'uptimeSecs': self.__lastUptime,
+		}
+
+def parseGCLog(path):
+	"""
+	Parse a unified GC log file using `GCLogParser`.
+
+	:param str path: The log file.
+	:return dict: The summary from `GCLogParser.getSummary`, or None if the file does not exist.
+	"""
+	parser = GCLogParser()
+	try:
+		with open(toLongPathSafe(path), 'r', encoding='utf-8', errors='replace') as f:
+			for line in f: parser.addLine(line)
+	except FileNotFoundError:
+		return None
+	return parser.getSummary()
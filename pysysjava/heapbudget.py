@@ -0,0 +1,232 @@
+"""
+Admission control for the Java processes started by `pysysjava.javaplugin.JavaPlugin.startJava`, which ensures the
+total heap of the JVMs running concurrently (across all PySys worker threads) stays within a memory budget for the
+machine.
+
+See `JavaHeapBudget` for details.
+"""
+
+import os
+import re
+import time
+import logging
+import threading
+import collections
+
+log = logging.getLogger('pysys.pysysjava.heapbudget')
+
+_HEAP_ARG_REGEX = re.compile(r'^-(Xmx|Xms|XX:MaxHeapSize=|XX:InitialHeapSize=)([0-9]+)([kKmMgGtT]?)$')
+_SIZE_UNITS_MB = {'': 1.0/1024/1024, 'k': 1.0/1024, 'm': 1, 'g': 1024, 't': 1024*1024}
+
+def parseJVMHeapArgs(jvmArgs):
+	"""
+	Get the maximum and initial heap size from a list of JVM arguments such as ``-Xmx512m`` and ``-Xms1g`` (or the
+	equivalent ``-XX:MaxHeapSize=`` and ``-XX:InitialHeapSize=`` options). As with the JVM, if an option is specified
+	more than once the last value is used.
+
+	>>> parseJVMHeapArgs(['-Xms64m', '-Xmx2g', '-Dfoo=bar'])
+	(2048.0, 64.0)
+
+	:param list[str] jvmArgs: The JVM arguments.
+	:return (float,float): The maximum and initial heap size in MB, either of which may be None if not specified.
+	"""
+	maxMB = initialMB = None
+	for a in jvmArgs:
+		m = _HEAP_ARG_REGEX.match(a)
+		if m is None: continue
+		mb = int(m.group(2))*_SIZE_UNITS_MB[m.group(3).lower()]
+		if m.group(1) in ['Xmx', 'XX:MaxHeapSize=']:
+			maxMB = mb
+		else:
+			initialMB = mb
+	return maxMB, initialMB
+
+def getPhysicalMemoryMB():
+	"""
+	Returns the total physical memory of this machine in MB, or None if it cannot be determined on this platform.
+	"""
+	try:
+		return os.sysconf('SC_PAGE_SIZE')*os.sysconf('SC_PHYS_PAGES')/1024.0/1024.0
+	except (AttributeError, ValueError, OSError):
+		return None
+
+class JavaHeapBudget(object):
+	"""
+	This is a PySys runner plugin that limits the total memory reserved by Java processes running at the same time, so
+	that a test run can use a large number of ``--threads`` without the risk of the machine running out of memory
+	when several memory-hungry tests happen to execute together.
+
+	To enable it, add this to your project configuration (the alias must be ``javaHeapBudget``)::
+
+		<runner-plugin classname="pysysjava.heapbudget.JavaHeapBudget" alias="javaHeapBudget">
+			<property name="memoryBudgetMB" value="12000"/>
+		</runner-plugin>
+
+	Each time `pysysjava.javaplugin.JavaPlugin.startJava` is called, the memory required by the new process is
+	calculated from the maximum heap size in its JVM arguments (or the ``JAVA_TOOL_OPTIONS`` environment variable)
+	plus ``nonHeapOverheadMB``. If starting the process would take the total for all running Java processes over the
+	budget, the calling test waits until enough other processes have finished, with processes started in the order
+	they were requested. A process that needs more than the whole budget is started once no other Java processes are
+	running.
+
+	The memory for a foreground process is released when it completes. For a background process it is released when
+	the process is found to have exited (which is checked while other processes are waiting) or when the test that
+	started it is cleaned up. To avoid deadlocks (for example if every worker thread is running a test whose background
+	servers are holding memory), a process that has waited for ``maxWaitSecs`` is started anyway, with a warning.
+
+	Note that only processes started with ``startJava`` are included; ``javac`` processes from
+	`pysysjava.javaplugin.JavaPlugin.compile` are not.
+
+	The budget can be overridden for a particular run using ``pysys run -XjavaMemoryBudgetMB=N``, and admission
+	control can be disabled with ``-XjavaMemoryBudgetMB=0``.
+	"""
+
+	memoryBudgetMB = 0.0
+	"""
+	The maximum total memory in MB to be reserved by Java processes at any one time. The default value of 0 means 75%
+	of the physical memory of the machine.
+	"""
+
+	defaultHeapMB = 0.0
+	"""
+	The maximum heap size in MB to assume for processes whose JVM arguments do not specify ``-Xmx``. The default value
+	of 0 means 25% of physical memory, which is the JVM's default.
+	"""
+
+	nonHeapOverheadMB = 64.0
+	"""
+	The memory in MB to reserve for each process in addition to its maximum heap size, to allow for the JVM's
+	non-heap memory such as metaspace, the code cache and thread stacks.
+	"""
+
+	maxWaitSecs = 600.0
+	"""
+	The maximum time a process will wait for memory to become available before it is started regardless of the budget.
+	"""
+
+	def setup(self, runner):
+		self.runner = runner
+		physicalMB = getPhysicalMemoryMB()
+		self.memoryBudgetMB = float(runner.getXArg('javaMemoryBudgetMB', str(self.memoryBudgetMB)))
+		if self.memoryBudgetMB == 0 and 'javaMemoryBudgetMB' not in runner.xargs:
+			if physicalMB is None: raise Exception('The memoryBudgetMB property of JavaHeapBudget must be set on this platform')
+			self.memoryBudgetMB = physicalMB*0.75
+		self.defaultHeapMB = float(self.defaultHeapMB) or (physicalMB or 1024.0*4)/4
+		self.nonHeapOverheadMB = float(self.nonHeapOverheadMB)
+		self.maxWaitSecs = float(self.maxWaitSecs)
+
+		self.__condition = threading.Condition()
+		self.__queue = collections.deque() # _HeapReservation objects waiting to be admitted, in request order
+		self.__running = [] # admitted _HeapReservation objects
+		self.reservedMB = 0.0
+		"""The total memory currently reserved by running processes. """
+		self.peakReservedMB = 0.0
+		"""The highest value of ``reservedMB`` during the run. """
+		self.launches = self.queuedLaunches = 0
+		self.queuedSecs = 0.0
+
+		if self.memoryBudgetMB > 0:
+			log.info('Java heap budget is limiting Java processes to a total of %d MB', self.memoryBudgetMB)
+			runner.addCleanupFunction(lambda: log.info('Java heap budget of %d MB had a peak usage of %d MB; %d of %d Java processes waited for memory, for a total of %0.1f secs',
+				self.memoryBudgetMB, self.peakReservedMB, self.queuedLaunches, self.launches, self.queuedSecs) if self.launches else None)
+
+	def getRequiredMB(self, jvmArgs, environs=None):
+		"""
+		Calculate the memory to be reserved for a Java process.
+
+		:param list[str] jvmArgs: The JVM arguments of the process.
+		:param dict[str,str] environs: The environment variables of the process, which may include
+			``JAVA_TOOL_OPTIONS`` (whose options are overridden by the jvmArgs).
+		:return float: The required memory in MB.
+		"""
+		toolOptions = (environs or {}).get('JAVA_TOOL_OPTIONS', '').split()
+		maxMB, initialMB = parseJVMHeapArgs(toolOptions+list(jvmArgs))
+		return max(maxMB or self.defaultHeapMB, initialMB or 0)+self.nonHeapOverheadMB
+
+	def admit(self, owner, jvmArgs, displayName, environs=None):
+		"""
+		Wait until there is enough memory available to start the specified Java process.
+
+		Every call must be followed by a call to ``started()`` on the returned reservation once the process has been
+		started (or has failed to start).
+
+		:param owner: The test (or runner) that is starting the process, whose cleanup will release the memory of
+			any background processes that are still running.
+		:param list[str] jvmArgs: The JVM arguments of the process.
+		:param str displayName: The name of the process, for logging.
+		:param dict[str,str] environs: The environment variables of the process.
+		:return _HeapReservation: The reservation for this process, or None if admission control is disabled.
+		"""
+		if self.memoryBudgetMB <= 0: return None
+		reservation = _HeapReservation(self, self.getRequiredMB(jvmArgs, environs), displayName)
+		ownerLog = getattr(owner, 'log', log)
+		with self.__condition:
+			self.launches += 1
+			self.__queue.append(reservation)
+			startTime = time.monotonic()
+			waited = None
+			while not self.__canAdmit(reservation):
+				if waited is None:
+					ownerLog.info('Waiting to start %s until %d MB of the Java heap budget is available (%d of %d MB are in use)',
+						displayName, reservation.mb, self.reservedMB, self.memoryBudgetMB)
+				waited = time.monotonic()-startTime
+				if waited >= self.maxWaitSecs:
+					ownerLog.warning('Starting %s although it requires %d MB which would exceed the Java heap budget (%d of %d MB are in use), since it has been waiting for %d secs',
+						displayName, reservation.mb, self.reservedMB, self.memoryBudgetMB, waited)
+					break
+				# poll so that background processes that have exited are noticed
+				self.__condition.wait(timeout=min(0.5, self.maxWaitSecs-waited))
+				self.__releaseExited()
+			self.__queue.remove(reservation)
+			self.__running.append(reservation)
+			self.reservedMB += reservation.mb
+			self.peakReservedMB = max(self.peakReservedMB, self.reservedMB)
+			if waited is not None:
+				waited = time.monotonic()-startTime
+				self.queuedLaunches += 1
+				self.queuedSecs += waited
+			self.__condition.notify_all() # the next in the queue may be able to start too
+		if waited is not None: ownerLog.info('Waited %0.1f secs for Java heap budget to start %s', waited, displayName)
+
+		owner.addCleanupFunction(reservation.release)
+		return reservation
+
+	def __canAdmit(self, reservation):
+		# Must be called with the lock held. Processes are admitted in order, so large processes are not starved
+		if self.__queue[0] is not reservation: return False
+		return self.reservedMB+reservation.mb <= self.memoryBudgetMB or not self.__running
+
+	def __releaseExited(self):
+		# Must be called with the lock held
+		for r in list(self.__running):
+			if r.process is not None and not r.process.running(): self._release(r)
+
+	def _release(self, reservation):
+		with self.__condition:
+			if reservation not in self.__running: return
+			self.__running.remove(reservation)
+			self.reservedMB -= reservation.mb
+			self.__condition.notify_all()
+
+class _HeapReservation(object):
+	"""
+	:meta private: Not public API.
+
+	The memory reserved for a single Java process.
+	"""
+	def __init__(self, budget, mb, displayName):
+		self.budget, self.mb, self.displayName = budget, mb, displayName
+		self.process = None
+
+	def started(self, process, background):
+		"""
+		Called after the process has been started (with process=None if it failed to start). The memory is released
+		now unless this is a background process that is still running.
+		"""
+		if background and process is not None and process.running():
+			self.process = process
+		else:
+			self.release()
+
+	def release(self):
+		self.budget._release(self)
@@ -0,0 +1,284 @@
+"""
+Support for reading and writing the JaCoCo execution data format, which is used both for ``.exec`` coverage files
+and for the TCP protocol between the JaCoCo agent and a coverage server.
+
+An execution data stream consists of a sequence of blocks, each identified by a single type byte. All numbers are
+big-endian, strings are prefixed by a 2-byte length, and boolean arrays (the probes for each class) are prefixed by a
+variable-length integer and packed into bytes with the first probe in the least significant bit.
+
+As well as the low-level `readBlock` function, this module provides `ExecutionDataStore` which can load, merge and 
+save execution data files entirely in Python (without starting a JVM), and gives access to the probes of each class 
+for further analysis. If NumPy is installed it is used to speed up merging. 
+"""
+
+import os
+import struct
+
+from pysys.utils.fileutils import mkdir, toLongPathSafe
+
+try:
+	import numpy
+except ImportError: # NumPy is optional
+	numpy = None
+
+BLOCK_HEADER = 0x01
+"""Block type for the header, containing the magic number and format version. """
+BLOCK_SESSIONINFO = 0x10
+"""Block type for the session information, containing the session id, start time and dump time. """
+BLOCK_EXECUTIONDATA = 0x11
+"""Block type for the execution data of a single class, containing the class id, name and probes. """
+BLOCK_CMD_OK = 0x20
+"""Block type sent by the agent to indicate the end of the response to a command. """
+BLOCK_CMD_DUMP = 0x40
+"""Block type for a command requesting the agent to dump (and/or reset) its execution data. """
+
+MAGIC_NUMBER = 0xC0C0
+FORMAT_VERSION = 0x1007
+
+def getHeader():
+	"""
+	Returns the bytes of the header block that starts every execution data stream.
+	"""
+	return struct.pack('>BHH', BLOCK_HEADER, MAGIC_NUMBER, FORMAT_VERSION)
+
+def getDumpCommand(dump=True, reset=False):
+	"""
+	Returns the bytes of a command block that requests the agent to dump and/or reset its execution data.
+	"""
+	return struct.pack('>B??', BLOCK_CMD_DUMP, dump, reset)
+
+def _readFully(stream, length):
+	data = stream.read(length)
+	while len(data) < length:
+		more = stream.read(length-len(data))
+		if not more: raise EOFError('Unexpected end of JaCoCo execution data')
+		data += more
+	return data
+
+def _readVarInt(stream):
+	value, shift, raw = 0, 0, b''
+	while True:
+		b = _readFully(stream, 1)
+		raw += b
+		value |= (b[0] & 0x7F) << shift
+		if b[0] & 0x80 == 0: return value, raw
+		shift += 7
+
+def _readUTF(stream):
+	raw = _readFully(stream, 2)
+	raw += _readFully(stream, struct.unpack('>H', raw)[0])
+	return raw[2:].decode('utf-8', errors='replace'), raw
+
+def readBlock(stream):
+	"""
+	Read a single block from the specified binary stream.
+
+	:param stream: A file or socket stream, opened in binary mode.
+	:return (int,bytes,obj): The block type, the raw bytes of the block (including the type byte), and the parsed
+		value which is the session id for a session info block, or the class name for an execution data block
+		(otherwise None). Returns None if the stream ends before the start of a new block.
+	:raises IOError: If the stream contains invalid data or ends part way through a block.
+	"""
+	blockType = stream.read(1)
+	if not blockType: return None
+	raw = blockType
+	blockType = blockType[0]
+	value = None
+	if blockType == BLOCK_HEADER:
+		raw += _readFully(stream, 4)
+		magic, version = struct.unpack('>HH', raw[1:])
+		if magic != MAGIC_NUMBER: raise IOError('Invalid JaCoCo execution data (incorrect magic number)')
+		if version != FORMAT_VERSION: raise IOError('Unsupported JaCoCo execution data version 0x%x'%version)
+	elif blockType == BLOCK_SESSIONINFO:
+		value, utf = _readUTF(stream)
+		raw += utf+_readFully(stream, 16)
+	elif blockType == BLOCK_EXECUTIONDATA:
+		raw += _readFully(stream, 8)
+		value, utf = _readUTF(stream)
+		probeCount, varint = _readVarInt(stream)
+		raw += utf+varint+_readFully(stream, (probeCount+7)//8)
+	elif blockType == BLOCK_CMD_DUMP:
+		raw += _readFully(stream, 2)
+	elif blockType != BLOCK_CMD_OK:
+		raise IOError('Unknown JaCoCo execution data block type 0x%x'%blockType)
+	return blockType, raw, value
+
+class SessionInfo(object):
+	"""
+	Information about a coverage session, i.e. a single Java process (or a single dump from a process). 
+	
+	:ivar str id: The session id. 
+	:ivar int start: The epoch time in milliseconds when the session started. 
+	:ivar int dump: The epoch time in milliseconds when the coverage data was dumped. 
+	"""
+	def __init__(self, id, start, dump):
+		self.id, self.start, self.dump = id, start, dump
+
+	def __repr__(self): return 'SessionInfo(%r, %d, %d)'%(self.id, self.start, self.dump)
+
+class ExecutionData(object):
+	"""
+	The coverage probes for a single class. 
+	
+	:ivar int classId: The class id, which is a checksum of the class file. 
+	:ivar str name: The VM name of the class, e.g. ``myorg/MyClass``. 
+	:ivar int probeCount: The number of probes in this class. 
+	"""
+	def __init__(self, classId, name, probeCount, packedProbes):
+		self.classId, self.name, self.probeCount = classId, name, probeCount
+		self._packed = packedProbes # bytes, or a NumPy uint8 array once merged
+
+	@property
+	def probes(self):
+		"""
+		The probes for this class, as a list of bools (True if the probe was executed). 
+		"""
+		packed = bytes(self._packed)
+		return [bool(packed[i >> 3] & (1 << (i & 7))) for i in range(self.probeCount)]
+	
+	def getExecutedProbeCount(self):
+		"""
+		Returns the number of probes that were executed. 
+		"""
+		return sum(bin(b).count('1') for b in bytes(self._packed))
+
+	def merge(self, other):
+		"""
+		Merge the probes from another execution data object for the same class into this one, such that each probe is 
+		executed if it was executed in either. 
+		
+		:raises ValueError: If the other data is not compatible with this class. 
+		"""
+		if other.classId != self.classId or other.name != self.name or other.probeCount != self.probeCount:
+			raise ValueError('Incompatible execution data for class %s with id %016x'%(self.name, self.classId & 0xFFFFFFFFFFFFFFFF))
+		if numpy is not None:
+			if isinstance(self._packed, bytes): self._packed = numpy.frombuffer(self._packed, dtype=numpy.uint8).copy()
+			numpy.bitwise_or(self._packed, numpy.frombuffer(bytes(other._packed), dtype=numpy.uint8), out=self._packed)
+		else:
+			# converting to (arbitrary precision) ints gives a fast bitwise OR of the whole array
+			length = len(self._packed)
+			self._packed = (int.from_bytes(self._packed, 'little') | int.from_bytes(other._packed, 'little')).to_bytes(length, 'little')
+
+	def __repr__(self): return 'ExecutionData(%s, %d/%d probes executed)'%(self.name, self.getExecutedProbeCount(), self.probeCount)
+
+class ExecutionDataStore(object):
+	"""
+	A collection of coverage sessions and per-class execution data, which can be loaded from and saved to JaCoCo 
+	execution data (``.exec``) files. 
+	
+	Loading several files into the same store merges them, in the same way as the JaCoCo ``merge`` command. 
+	
+	:ivar list[SessionInfo] sessions: The sessions that contributed to this data. 
+	:ivar dict[int,ExecutionData] classes: The execution data for each class, keyed by class id. 
+	"""
+	def __init__(self):
+		self.sessions = []
+		self.classes = {}
+
+	def load(self, path):
+		"""
+		Load and merge the execution data from the specified file. 
+		
+		:raises IOError: If the file is not a valid execution data file. 
+		:raises ValueError: If the file contains data that is not compatible with data already in this store. 
+		"""
+		with open(toLongPathSafe(path), 'rb') as f:
+			self.loadBytes(f.read(), name=path)
+		return self
+
+	def loadBytes(self, data, name='<bytes>'):
+		"""
+		Load and merge execution data from a bytes object containing the contents of an execution data file. 
+		"""
+		# This is performance critical, so parses in-place from a memoryview rather than using readBlock
+		view = memoryview(data)
+		unpack_from = struct.unpack_from
+		pos, length = 0, len(data)
+		try:
+			while pos < length:
+				blockType = data[pos]
+				pos += 1
+				if blockType == BLOCK_EXECUTIONDATA:
+					classId, nameLength = unpack_from('>qH', data, pos)
+					pos += 10
+					className = bytes(view[pos:pos+nameLength]).decode('utf-8', errors='replace')
+					pos += nameLength
+					probeCount, shift = 0, 0
+					while True:
+						b = data[pos]
+						pos += 1
+						probeCount |= (b & 0x7F) << shift
+						if b & 0x80 == 0: break
+						shift += 7
+					packedLength = (probeCount+7) >> 3
+					if pos+packedLength > length: raise IndexError()
+					execData = ExecutionData(classId, className, probeCount, bytes(view[pos:pos+packedLength]))
+					pos += packedLength
+					
+					existing = self.classes.get(classId)
+					if existing is None:
+						self.classes[classId] = execData
+					else:
+						existing.merge(execData)
+				elif blockType == BLOCK_SESSIONINFO:
+					idLength, = unpack_from('>H', data, pos)
+					pos += 2
+					sessionId = bytes(view[pos:pos+idLength]).decode('utf-8', errors='replace')
+					pos += idLength
+					start, dump = unpack_from('>qq', data, pos)
+					pos += 16
+					self.sessions.append(SessionInfo(sessionId, start, dump))
+				elif blockType == BLOCK_HEADER:
+					magic, version = unpack_from('>HH', data, pos)
+					pos += 4
+					if magic != MAGIC_NUMBER: raise IOError('Invalid JaCoCo execution data (incorrect magic number) in %s'%name)
+					if version != FORMAT_VERSION: raise IOError('Unsupported JaCoCo execution data version 0x%x in %s'%(version, name))
+				else:
+					raise IOError('Unknown JaCoCo execution data block type 0x%x in %s'%(blockType, name))
+		except (IndexError, struct.error):
+			raise IOError('Unexpected end of JaCoCo execution data in %s'%name)
+		return self
+
+	def toBytes(self):
+		"""
+		Returns the contents of this store in the execution data file format. 
+		
+		Sessions are written in order of dump time, and classes in order of name. 
+		"""
+		out = [getHeader()]
+		def utf(s):
+			b = s.encode('utf-8')
+			return struct.pack('>H', len(b))+b
+		for s in sorted(self.sessions, key=lambda s: (s.dump, s.start, s.id)):
+			out.append(bytes([BLOCK_SESSIONINFO])+utf(s.id)+struct.pack('>qq', s.start, s.dump))
+		for c in sorted(self.classes.values(), key=lambda c: (c.name, c.classId)):
+			varint, n = bytearray(), c.probeCount
+			while n > 0x7F:
+				varint.append(0x80 | (n & 0x7F))
+				n >>= 7
+			varint.append(n)
+			out.append(bytes([BLOCK_EXECUTIONDATA])+struct.pack('>q', c.classId)+utf(c.name)+bytes(varint)+bytes(c._packed))
+		return b''.join(out)
+
+	def save(self, path):
+		"""
+		Save this store to the specified execution data file, replacing it if it already exists. 
+		"""
+		mkdir(os.path.dirname(os.path.abspath(path)))
+		with open(toLongPathSafe(path), 'wb') as f:
+			f.write(self.toBytes())
+
+def mergeExecutionDataFiles(paths, destFile):
+	"""
+	Merge the specified execution data files into a single file, equivalent to the JaCoCo ``merge`` command. 
+	
+	The destination file may also be one of the input files. 
+	
+	:param list[str] paths: The files to merge. 
+	:param str destFile: The file to write. 
+	:return ExecutionDataStore: The merged data. 
+	"""
+	store = ExecutionDataStore()
+	for p in paths: store.load(p)
+	store.save(destFile)
+	return store
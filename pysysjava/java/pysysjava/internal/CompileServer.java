@@ -0,0 +1,95 @@
+package pysysjava.internal;
+
+import java.io.*;
+import java.net.*;
+import java.nio.charset.StandardCharsets;
+import java.util.concurrent.*;
+
+import javax.tools.JavaCompiler;
+import javax.tools.ToolProvider;
+
+/**
+ * A long-lived server that compiles Java source files on behalf of the PySys JavaPlugin, using the
+ * javax.tools.JavaCompiler API to avoid the cost of starting a new javac JVM for each compilation.
+ *
+ * Usage: CompileServer PORT
+ *
+ * Each connection to the server submits one compilation job using UTF-8 lines: the stdout path, the stderr path,
+ * the number of compiler arguments, and then each argument (with backslash and newline characters escaped
+ * as \\ and \n). The compiler output is written to the stdout/stderr paths, and the server responds with a
+ * single line containing the exit code.
+ */
+public class CompileServer
+{
+	public static void main(String[] args) throws Exception
+	{
+		int port = Integer.parseInt(args[0]);
+
+		final JavaCompiler compiler = ToolProvider.getSystemJavaCompiler();
+		if (compiler == null) {
+			System.err.println("No Java compiler is available; a JDK (not a JRE) is required");
+			System.exit(2);
+		}
+
+		ExecutorService executor = Executors.newCachedThreadPool(new ThreadFactory() {
+			public Thread newThread(Runnable r) {
+				Thread t = new Thread(r, "pysysjava-compile-job");
+				t.setDaemon(true);
+				return t;
+			}
+		});
+
+		try (ServerSocket server = new ServerSocket(port, 100, InetAddress.getLoopbackAddress()))
+		{
+			System.out.println("PySys Java compile server listening on port "+port);
+			while (true) {
+				final Socket socket = server.accept();
+				executor.submit(new Runnable() {
+					public void run() { handle(compiler, socket); }
+				});
+			}
+		}
+	}
+
+	static void handle(JavaCompiler compiler, Socket socket)
+	{
+		try {
+			BufferedReader in = new BufferedReader(new InputStreamReader(socket.getInputStream(), StandardCharsets.UTF_8));
+			String stdoutPath = in.readLine();
+			if (stdoutPath == null) return; // e.g. a connection just to check the server is listening
+			String stderrPath = in.readLine();
+			String[] compilerArgs = new String[Integer.parseInt(in.readLine())];
+			for (int i = 0; i < compilerArgs.length; i++)
+				compilerArgs[i] = unescape(in.readLine());
+
+			int exitCode;
+			try (OutputStream out = new FileOutputStream(stdoutPath); OutputStream err = new FileOutputStream(stderrPath)) {
+				exitCode = compiler.run(null, out, err, compilerArgs);
+			}
+
+			Writer response = new OutputStreamWriter(socket.getOutputStream(), StandardCharsets.UTF_8);
+			response.write(exitCode+"\n");
+			response.flush();
+		} catch (Throwable ex) {
+			System.err.println("Compilation job failed: "+ex);
+			ex.printStackTrace();
+		} finally {
+			try { socket.close(); } catch (IOException ex) { }
+		}
+	}
+
+	static String unescape(String s)
+	{
+		StringBuilder result = new StringBuilder(s.length());
+		for (int i = 0; i < s.length(); i++) {
+			char c = s.charAt(i);
+			if (c == '\\' && i+1 < s.length()) {
+				c = s.charAt(++i);
+				if (c == 'n') c = '\n';
+				else if (c == 'r') c = '\r';
+			}
+			result.append(c);
+		}
+		return result.toString();
+	}
+}
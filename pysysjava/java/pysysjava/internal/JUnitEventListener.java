@@ -0,0 +1,135 @@
+package pysysjava.internal;
+
+import java.io.*;
+import java.nio.charset.StandardCharsets;
+import java.util.Map;
+import java.util.concurrent.ConcurrentHashMap;
+
+import org.junit.platform.engine.TestExecutionResult;
+import org.junit.platform.engine.TestSource;
+import org.junit.platform.engine.reporting.ReportEntry;
+import org.junit.platform.engine.support.descriptor.ClassSource;
+import org.junit.platform.engine.support.descriptor.MethodSource;
+import org.junit.platform.launcher.TestExecutionListener;
+import org.junit.platform.launcher.TestIdentifier;
+import org.junit.platform.launcher.TestPlan;
+
+/**
+ * A JUnit Platform listener that streams test execution events as newline-delimited JSON to the file specified by
+ * the pysysjava.junitEventsFile system property, so that PySys can record the results of each testcase as soon as it
+ * completes. The listener does nothing if the property is not set.
+ *
+ * This listener is registered automatically using the ServiceLoader mechanism when its directory is on the classpath.
+ */
+public class JUnitEventListener implements TestExecutionListener
+{
+	private Writer out;
+	private final Map<String, Long> startTimes = new ConcurrentHashMap<>();
+
+	public void testPlanExecutionStarted(TestPlan testPlan)
+	{
+		String path = System.getProperty("pysysjava.junitEventsFile");
+		if (path == null) return;
+		try {
+			out = new OutputStreamWriter(new FileOutputStream(path), StandardCharsets.UTF_8);
+		} catch (IOException ex) {
+			throw new UncheckedIOException(ex);
+		}
+	}
+
+	public void testPlanExecutionFinished(TestPlan testPlan)
+	{
+		if (out == null) return;
+		try {
+			out.close();
+		} catch (IOException ex) {
+			throw new UncheckedIOException(ex);
+		}
+		out = null;
+	}
+
+	public void executionStarted(TestIdentifier id)
+	{
+		if (out == null || !id.isTest()) return;
+		startTimes.put(id.getUniqueId(), System.nanoTime());
+		write(testcase("started", id));
+	}
+
+	public void executionSkipped(TestIdentifier id, String reason)
+	{
+		if (out == null) return;
+		write(testcase("skipped", id)+", \"reason\": "+json(reason));
+	}
+
+	public void executionFinished(TestIdentifier id, TestExecutionResult result)
+	{
+		if (out == null || !id.isTest()) return;
+		Long startTime = startTimes.remove(id.getUniqueId());
+		StringBuilder event = new StringBuilder(testcase("finished", id));
+		event.append(", \"status\": ").append(json(result.getStatus().name()));
+		event.append(", \"durationSecs\": ").append(startTime == null ? 0.0 : (System.nanoTime()-startTime)/1000000000.0);
+		Throwable throwable = result.getThrowable().orElse(null);
+		if (throwable != null) {
+			StringWriter stackTrace = new StringWriter();
+			throwable.printStackTrace(new PrintWriter(stackTrace));
+			event.append(", \"throwableType\": ").append(json(throwable.getClass().getName()));
+			event.append(", \"isAssertion\": ").append(throwable instanceof AssertionError);
+			event.append(", \"message\": ").append(json(throwable.getMessage()));
+			event.append(", \"stackTrace\": ").append(json(stackTrace.toString()));
+		}
+		write(event.toString());
+	}
+
+	public void reportingEntryPublished(TestIdentifier id, ReportEntry entry)
+	{
+		if (out == null) return;
+		for (Map.Entry<String, String> e : entry.getKeyValuePairs().entrySet()) {
+			if (e.getKey().equals("stdout") || e.getKey().equals("stderr"))
+				write("\"event\": \"output\", \"id\": "+json(id.getUniqueId())+", "+json(e.getKey())+": "+json(e.getValue()));
+		}
+	}
+
+	/** Returns the common JSON fields for the specified test, using the same names as the legacy XML report. */
+	private static String testcase(String event, TestIdentifier id)
+	{
+		String classname = null;
+		TestSource source = id.getSource().orElse(null);
+		if (source instanceof MethodSource) {
+			classname = ((MethodSource) source).getClassName();
+		} else if (source instanceof ClassSource) {
+			classname = ((ClassSource) source).getClassName();
+		}
+		return "\"event\": "+json(event)+", \"id\": "+json(id.getUniqueId())+", \"classname\": "+json(classname)
+			+", \"name\": "+json(id.getLegacyReportingName())+", \"displayName\": "+json(id.getDisplayName());
+	}
+
+	private synchronized void write(String fields)
+	{
+		try {
+			out.write("{"+fields+"}\n");
+			out.flush();
+		} catch (IOException ex) {
+			throw new UncheckedIOException(ex);
+		}
+	}
+
+	private static String json(String s)
+	{
+		if (s == null) return "null";
+		StringBuilder result = new StringBuilder(s.length()+2).append('"');
+		for (int i = 0; i < s.length(); i++) {
+			char c = s.charAt(i);
+			switch (c) {
+				case '"': result.append("\\\""); break;
+				case '\\': result.append("\\\\"); break;
+				case '\n': result.append("\\n"); break;
+				case '\r': result.append("\\r"); break;
+				case '\t': result.append("\\t"); break;
+				default:
+					if (c < 0x20) result.append(String.format("\\u%04x", (int) c));
+					else result.append(c);
+			}
+		}
+		return result.append('"').toString();
+	}
+}
@@ -0,0 +1,114 @@
+package pysysjava.internal;
+
+import java.io.*;
+import java.lang.reflect.InvocationTargetException;
+import java.lang.reflect.Method;
+import java.net.*;
+import java.nio.charset.StandardCharsets;
+import java.util.Properties;
+
+/**
+ * A long-lived JVM that executes the JUnit console launcher in-process on behalf of the PySys JUnitWorkerPool,
+ * avoiding the cost of starting a new JVM and loading the JUnit platform for each test.
+ *
+ * Usage: JUnitWorker PORT
+ *
+ * The JUnit framework (including junit-platform-console-standalone) must be on the classpath of this JVM; the test
+ * classes themselves are provided with the launcher's --classpath argument for each job, so that they are loaded in
+ * a separate class loader.
+ *
+ * Each connection to the worker submits one job using UTF-8 lines: the stdout path, the stderr path, the number of
+ * system properties followed by each key=value property, and then the number of launcher arguments followed by
+ * each argument (with backslash and newline characters escaped as \\ and \n). Jobs are executed one at a time, with
+ * System.out/err redirected to the job's stdout/stderr files and the system properties restored afterwards. The
+ * worker responds with a line containing the launcher exit code and the number of bytes of heap in use after
+ * the job.
+ */
+public class JUnitWorker
+{
+	public static void main(String[] args) throws Exception
+	{
+		int port = Integer.parseInt(args[0]);
+
+		Method execute = Class.forName("org.junit.platform.console.ConsoleLauncher").getMethod(
+			"execute", PrintStream.class, PrintStream.class, String[].class);
+
+		try (ServerSocket server = new ServerSocket(port, 10, InetAddress.getLoopbackAddress()))
+		{
+			System.out.println("PySys JUnit worker listening on port "+port);
+			while (true) {
+				try (Socket socket = server.accept()) {
+					handle(execute, socket);
+				}
+			}
+		}
+	}
+
+	static void handle(Method execute, Socket socket) throws IOException
+	{
+		BufferedReader in = new BufferedReader(new InputStreamReader(socket.getInputStream(), StandardCharsets.UTF_8));
+		String stdoutPath = in.readLine();
+		if (stdoutPath == null) return; // e.g. a connection just to check the worker is listening
+		String stderrPath = in.readLine();
+
+		Properties jobProperties = new Properties();
+		int propertyCount = Integer.parseInt(in.readLine());
+		for (int i = 0; i < propertyCount; i++) {
+			String property = unescape(in.readLine());
+			int separator = property.indexOf('=');
+			jobProperties.setProperty(property.substring(0, separator), property.substring(separator+1));
+		}
+		String[] launcherArgs = new String[Integer.parseInt(in.readLine())];
+		for (int i = 0; i < launcherArgs.length; i++)
+			launcherArgs[i] = unescape(in.readLine());
+
+		PrintStream originalOut = System.out, originalErr = System.err;
+		Properties originalProperties = (Properties) System.getProperties().clone();
+		int exitCode;
+		try (PrintStream out = new PrintStream(new FileOutputStream(stdoutPath), true);
+			PrintStream err = new PrintStream(new FileOutputStream(stderrPath), true))
+		{
+			System.setOut(out);
+			System.setErr(err);
+			try {
+				System.getProperties().putAll(jobProperties);
+				Object result = execute.invoke(null, out, err, (Object) launcherArgs);
+				exitCode = (Integer) result.getClass().getMethod("getExitCode").invoke(result);
+			} catch (InvocationTargetException ex) {
+				ex.getCause().printStackTrace(err);
+				exitCode = -1;
+			} catch (Exception ex) {
+				ex.printStackTrace(err);
+				exitCode = -1;
+			} finally {
+				System.setOut(originalOut);
+				System.setErr(originalErr);
+				System.setProperties(originalProperties);
+			}
+		}
+
+		// collect garbage so that the heap usage reflects what has been leaked by the tests
+		Runtime runtime = Runtime.getRuntime();
+		runtime.gc();
+		long heapUsed = runtime.totalMemory()-runtime.freeMemory();
+
+		Writer response = new OutputStreamWriter(socket.getOutputStream(), StandardCharsets.UTF_8);
+		response.write(exitCode+" "+heapUsed+"\n");
+		response.flush();
+	}
+
+	static String unescape(String s)
+	{
+		StringBuilder result = new StringBuilder(s.length());
+		for (int i = 0; i < s.length(); i++) {
+			char c = s.charAt(i);
+			if (c == '\\' && i+1 < s.length()) {
+				c = s.charAt(++i);
+				if (c == 'n') c = '\n';
+				else if (c == 'r') c = '\r';
+			}
+			result.append(c);
+		}
+		return result.toString();
+	}
+}
@@ -8,15 +8,26 @@ import logging
 import fnmatch
 import shlex
 import glob
+import time
+import threading
+import concurrent.futures
 
 import pysys
+import pysys.process
 from pysys.constants import *
 from pysys.utils.pycompat import isstring
+from pysys.exceptions import ProcessTimeout
 from pysys.utils.fileutils import *
 
+from pysysjava.compilecache import JavaCompileCache
+from pysysjava.appcds import AppCDSArchiveCache
+from pysysjava.launchtimings import JavaLaunchTiming, timingSpan
+from pysysjava.chrometrace import getTraceWriters
+from pysysjava.gclog import getGCLoggingJVMArgs, parseGCLog
+
 log = logging.getLogger('pysys.pysysjava.javaplugin')
 
-def walkDirTree(dir, dirIgnores=None, followlinks=False):
+def walkDirTree(dir, dirIgnores=None, followlinks=False, fileSuffixes=None, threads=1):
 	"""
 	:meta private: Not public API.
 	
@@ -27,22 +38,33 @@ def walkDirTree(dir, dirIgnores=None, followlinks=False):
 	exceed the windows MAX_PATH limit, and has a simpler mechanism for skipping directories from the search tree. 
 	Entries are sorted before being returned to ensure deterministic results. 
 	
+	To speed up scanning of very large trees on network filesystems, the ``threads`` argument can be used to list 
+	directories concurrently using a pool of threads, which scans ahead of the directories that have been yielded so 
+	far. The results are always the same as for a single-threaded walk. For local filesystems a single thread is 
+	usually faster. 
+	
 	For example::
 	
-		for dirpath, entries in walkDirTree(i, dirIgnores=pysys.constants.OSWALK_IGNORES):
+		for dirpath, entries in walkDirTree(i, dirIgnores=pysys.constants.OSWALK_IGNORES, fileSuffixes='.java'):
 			for entry in entries:
-				if entry.is_file() and entry.name.endswith('.java'):
+				if entry.is_file():
 					inputfiles.append(entry.path)
 
 	
 	:param list[str], callable(DirEntry)->bool dirIgnores: Either a callable that returns True if the specified 
 		directory should be skipped from traversal and from being returned, or a string or list of strings which are 
-		glob patterns to be evaluated against the basename, e.g. ``dirIgnores=['.svn', '.git*']``. 
+		glob patterns to be evaluated against the basename, e.g. ``dirIgnores=['.svn', '.git*']``. A callable must be 
+		thread-safe if threads are used. 
 	:param bool followlinks: If True, directory symbolic links will be traversed as directories. Be careful of loops 
 		when using this option. 
+	:param str|list[str] fileSuffixes: If specified, only (non-directory) entries whose name ends with one of these 
+		suffixes are returned, e.g. ``'.java'``. Directories are returned regardless of this filter. 
+	:param int threads: The maximum number of threads used to list directories. The default value of 1 means all 
+		directories are listed by the calling thread, and 0 means an automatically chosen number of threads. 
 	:return (str,list[DirEntry]): Returns a generator that yields a tuple ``(dirpath: str, contents: list[DirEntry])`` 
-		for each (non-ignored) directory in the tree. If running on Windows, the returned paths will have the long path 
-		prefix ``\\?\`` which can be removed using `pysys.utils.fileutils.fromLongPathSafe` if needed. 
+		for each (non-ignored) directory in the tree. Subdirectories are yielded before their parent. If running on 
+		Windows, the returned paths will have the long path prefix ``\\?\`` which can be removed using 
+		`pysys.utils.fileutils.fromLongPathSafe` if needed. 
 		
 	"""
 	
@@ -52,27 +74,74 @@ def walkDirTree(dir, dirIgnores=None, followlinks=False):
 		else:
 			if isstring(dirIgnores): dirIgnores = [dirIgnores]
 			dirIgnores = lambda e, dirIgnores=dirIgnores: any(fnmatch.fnmatch(e.name, ignore) for ignore in dirIgnores)
+	if fileSuffixes is not None: fileSuffixes = (fileSuffixes,) if isstring(fileSuffixes) else tuple(fileSuffixes)
 	
-	dir = pysys.utils.fileutils.toLongPathSafe(dir)
-	with os.scandir(dir) as it:
-		contents = []
-
-		sortedEntries = list(it)
-		sortedEntries.sort(key=lambda entry: entry.name)
-		for entry in sortedEntries:
-			if not entry.is_dir(follow_symlinks=followlinks):
+	def scan(path):
+		# returns the sorted contents, and the sorted subdirectories to be traversed
+		contents, subdirs = [], []
+		with os.scandir(path) as it:
+			for entry in it:
+				if entry.is_dir(follow_symlinks=followlinks):
+					if dirIgnores(entry): continue
+					subdirs.append(entry)
+				elif fileSuffixes is not None and not entry.name.endswith(fileSuffixes):
+					continue
 				contents.append(entry)
-				continue
-			
-			if dirIgnores(entry): 
-				continue
-			contents.append(entry)
-			yield from walkDirTree(entry.path, dirIgnores=dirIgnores, followlinks=followlinks)
-		yield dir, contents		
+		contents.sort(key=lambda entry: entry.name)
+		subdirs.sort(key=lambda entry: entry.name)
+		return contents, subdirs
+	
+	dir = pysys.utils.fileutils.toLongPathSafe(dir)
+	threads = threads or min(16, (os.cpu_count() or 1)+4)
+
+	executor = None
+	if threads > 1:
+		executor = concurrent.futures.ThreadPoolExecutor(max_workers=threads, thread_name_prefix='walkDirTree')
+		pending = {} # path -> future, for directories that have been queued but not yet consumed
+		lock = threading.Lock()
+		stopping = []
+
+		def scanAndQueue(path):
+			if stopping: return None
+			result = scan(path)
+			for entry in result[1]: queue(entry.path)
+			return result
+
+		def queue(path):
+			with lock:
+				if not stopping: pending[path] = executor.submit(scanAndQueue, path)
+		
+		def getContents(path):
+			with lock:
+				future = pending.pop(path)
+			return future.result()
+		
+		queue(dir)
+	else:
+		getContents = scan
+	
+	try:
+		# an explicit stack avoids recursion, and yields each directory after its subdirectories
+		contents, subdirs = getContents(dir)
+		stack = [(dir, contents, iter(subdirs))]
+		while stack:
+			dirpath, contents, remainingSubdirs = stack[-1]
+			entry = next(remainingSubdirs, None)
+			if entry is None:
+				stack.pop()
+				yield dirpath, contents
+			else:
+				contents, subdirs = getContents(entry.path)
+				stack.append((entry.path, contents, iter(subdirs)))
+	finally:
+		if executor is not None:
+			with lock:
+				stopping.append(True)
+			executor.shutdown(wait=False)
 
 # TODO: or is it better to return (entry, contentsentries), which is simpler? or create a wrapper for this that returns that?
 
-def walkDirTreeContents(dir, dirIgnores=None, followlinks=False):	
+def walkDirTreeContents(dir, dirIgnores=None, followlinks=False, fileSuffixes=None, threads=1):	
 	"""
 	:meta private: Not public API.
 
@@ -85,8 +154,8 @@ def walkDirTreeContents(dir, dirIgnores=None, followlinks=False):
 	
 	For example::
 	
-		for entry in walkDirTreeContents(i, dirIgnores=pysys.constants.OSWALK_IGNORES):
-			if entry.is_file() and entry.name.endswith('.java'):
+		for entry in walkDirTreeContents(i, dirIgnores=pysys.constants.OSWALK_IGNORES, fileSuffixes='.java'):
+			if entry.is_file():
 				inputfiles.append(entry.path)
 	
 	:param list[str], callable(DirEntry)->bool dirIgnores: Either a callable that returns True if the specified 
@@ -94,16 +163,45 @@ def walkDirTreeContents(dir, dirIgnores=None, followlinks=False):
 		glob patterns to be evaluated against the basename, e.g. ``dirIgnores=['.svn', '.git*']``. 
 	:param bool followlinks: If True, directory symbolic links will be traversed as directories. Be careful of loops 
 		when using this option. 
+	:param str|list[str] fileSuffixes: If specified, only (non-directory) entries whose name ends with one of these 
+		suffixes are returned. 
+	:param int threads: The maximum number of threads used to list directories; see `walkDirTree`. 
 	:return (str,list[DirEntry]): Returns a generator that yields a tuple ``(dirpath: str, contents: list[DirEntry])`` 
 		for each (non-ignored) directory in the tree. If running on Windows, the returned paths will have the long path 
 		prefix ``\\?\`` which can be removed using `pysys.utils.fileutils.fromLongPathSafe` if needed. 
 		
 	"""
 
-	for dirpath, contents in walkDirTree(dir, dirIgnores=dirIgnores, followlinks=followlinks):
+	for dirpath, contents in walkDirTree(dir, dirIgnores=dirIgnores, followlinks=followlinks, fileSuffixes=fileSuffixes, threads=threads):
 		for c in contents:
 			yield c
 
+class _FunctionProcess(pysys.process.Process):
+	"""
+	:meta private: Not public API.
+	
+	A process object that executes a Python function instead of starting an operating system process, which allows 
+	work that replaces a real process (such as materializing cached compilation results) to be executed via 
+	`pysys.basetest.BaseTest.startProcess` with the usual logging, exit status checking and error handling. 
+	
+	The function is called with this process object as its only argument, may write output to the process's 
+	stdout/stderr files (which are created if they do not already exist), and returns the exit status. 
+	"""
+	def __init__(self, function, **kwargs):
+		super(_FunctionProcess, self).__init__(**kwargs)
+		self.__function = function
+	
+	def startBackgroundProcess(self):
+		for f in [self.stdout, self.stderr]:
+			if f and not os.path.exists(toLongPathSafe(f)): open(toLongPathSafe(f), 'w').close()
+		self.exitStatus = self.__function(self)
+
+	def setExitStatus(self): 
+		return self.exitStatus
+
+	def stop(self, timeout=None, hard=False): 
+		pass
+
 class JavaPlugin(object):
 	"""
 	This is a PySys test plugin that for compiling and running Java applications from a PySys testcase (or from 
@@ -159,7 +257,8 @@ class JavaPlugin(object):
 	
 	By default the maximum heap size is limited to 512MB, but you may wish to set a larger heap limit if you are 
 	starting processes that require more memory - but be careful that the test machine has sufficient resources to 
-	cope with multiple tests running concurrently without risking out of memory conditions. 
+	cope with multiple tests running concurrently without risking out of memory conditions (the 
+	`pysysjava.heapbudget.JavaHeapBudget` runner plugin can be used to enforce this). 
 	Also by default the ``-XX:-UsePerfData`` option is used to avoid creation of ``hsperfdata_XXX`` files 
 	in the temp directory (typically the test output directory) which aren't useful and can prevent test cleanup. 
 	
@@ -181,6 +280,87 @@ class JavaPlugin(object):
 	
 	"""
 
+	compileCacheDir = ''
+	"""
+	If set, compiled classes are stored in an on-disk cache in this directory (absolute, or relative to the 
+	testRootDir), and `compile()` will copy classes from the cache instead of running ``javac`` if 
+	the same source files have already been compiled with the same classpath and compiler arguments. 
+	
+	The cache key includes a hash of the contents of the source files, the compiler arguments and the classpath 
+	entries (including the size and modification time of each jar), so it is safe to share the cache across 
+	tests and across test runs. 
+	
+	See `pysysjava.compilecache` for more details. 
+	"""
+	
+	compileCacheMaxSizeMB = 1024.0
+	"""
+	The maximum total size of the ``compileCacheDir``. When this size is exceeded, the least recently used entries 
+	are removed from the cache. 
+	"""
+
+	compileCacheUseHardLinks = False
+	"""
+	Set to True to hard link class files from the ``compileCacheDir`` into the output directory (where supported) 
+	instead of copying them, which is faster for large numbers of classes. 
+	
+	Linked files share their storage with the cache, so they are read-only; this option should not be used by tests 
+	that rewrite compiled class files in-place (for example, to instrument or patch them). 
+	"""
+
+	appCDSCacheDir = ''
+	"""
+	If set, `startJava()` will use Application Class-Data Sharing (AppCDS) archives stored in this directory 
+	(absolute, or relative to the testRootDir) to reduce JVM startup time, which is especially useful for 
+	processes that are started many times with the same classpath, such as the JUnit launcher. 
+	
+	The first foreground process started for each distinct combination of Java executable, main class/jar, JVM 
+	arguments and classpath creates an archive when it exits (``-XX:ArchiveClassesAtExit``), and subsequent processes 
+	use it (``-XX:SharedArchiveFile``). Archives are keyed on the contents of each classpath jar, so changing a jar 
+	results in a new archive being created. Since the JVM can only archive classes loaded from jars, archives are not 
+	used for processes that have a directory of classes on their classpath. For foreground processes the duration is 
+	logged compared to the first (archive-creating) run, to give an indication of the savings. 
+	
+	This requires Java 13 or later; for earlier versions this property is ignored. 
+	See `pysysjava.appcds` for more details. 
+	"""
+
+	dirScanThreads = 1
+	"""
+	The number of threads used by `compile()` to search input directories for ``.java`` files. Using multiple threads 
+	can speed up compilation of very large source trees on network filesystems, but is usually slower for local 
+	filesystems. The value 0 means an automatically chosen number of threads. 
+	"""
+
+	recordLaunchTimings = False
+	"""
+	If True, the time taken by each stage of starting ``java`` and ``javac`` processes (including the JVM's own 
+	startup time), the exit status and peak memory usage of each process are recorded and written to a 
+	``java-launch-timings.json`` file in the test output directory, and the slowest launches are logged at the end of 
+	the run. This can also be enabled for a particular run using ``-XjavaLaunchTimings=true``, and is always enabled 
+	when the `pysysjava.chrometrace.ChromeTraceWriter` is configured. 
+	
+	See `pysysjava.launchtimings` for more details. 
+	"""
+
+	gcLogging = False
+	"""
+	If True, `startJava()` adds unified GC logging to each Java process started by a test (Java 9+ only), writing a 
+	``<stdouterr>.gc.log`` file in the process's working directory. During test cleanup the GC logs are analyzed and 
+	the pause time percentiles, total pause time, heap after GC trend and allocation rate of each process are logged 
+	and written to ``java-gc-summary.json`` in the test output directory. This can also be enabled for a particular 
+	run using ``-XjavaGCLog=true``. 
+	
+	See `pysysjava.gclog` for more details. 
+	"""
+
+	gcMaxPauseP99Ms = 0.0
+	"""
+	If set to a value greater than zero when `gcLogging` is enabled, a test fails if the 99th percentile GC pause 
+	time of any of its Java processes exceeds this number of milliseconds. This can also be set for a particular run 
+	using ``-XjavaGCMaxPauseP99Ms=N``. 
+	"""
+
 	def setup(self, owner):
 		self.owner = owner # Usually a BaseTest, but since this is a dual-purpose plugin could also be a runner
 		self.runner = getattr(owner, 'runner', owner)
@@ -209,6 +389,11 @@ class JavaPlugin(object):
 			descriptorUserData.get('javaClasspath', self.defaultClasspath)))
 		self.defaultJVMArgs = self._splitShellArgs(self.project.expandProperties(
 			descriptorUserData.get('jvmArgs', self.defaultJVMArgs)))
+		self.recordLaunchTimings = self.runner.getXArg('javaLaunchTimings', str(self.recordLaunchTimings).lower() == 'true') or bool(
+			getTraceWriters(self.runner))
+		self.gcLogging = self.runner.getXArg('javaGCLog', str(self.gcLogging).lower() == 'true')
+		self.gcMaxPauseP99Ms = self.runner.getXArg('javaGCMaxPauseP99Ms', float(self.gcMaxPauseP99Ms))
+		self.__gcLogs = [] # paths of the GC logs of processes started by this plugin
 
 		self.owner.addCleanupFunction(lambda: [deletedir(self.owner.output+'/'+d) for d in os.listdir(self.owner.output)
 			if d.startswith('hsperfdata_')] if os.path.exists(self.owner.output) else None, ignoreErrors=True)
@@ -235,6 +420,9 @@ class JavaPlugin(object):
 		:param kwargs: Additional keyword arguments such as ``timeout=`` will be passed to 
 			`pysys.basetest.BaseTest.startProcess`. 
 			
+		If the project has a `pysysjava.compileserver.JavaCompileServer` runner plugin with alias ``javaCompileServer``, 
+		the compilation is performed by that server rather than by starting a new ``javac`` process. 
+		
 		:return: The process object, with the full path to the output dir in the ``info`` dictionary.
 		:rtype: pysys.process.Process
 		"""
@@ -246,20 +434,32 @@ class JavaPlugin(object):
 		assert input, 'At least one input must be specified'
 		
 		inputfiles = []
+		inputnames = [] # paths relative to the input dir, used for the compilation cache key
 		for i in input:	
 			i = os.path.join(self.owner.input, i)
 			if os.path.isfile(i):
 				inputfiles.append(i)
+				inputnames.append(os.path.basename(i))
 			elif os.path.isdir(i):
-				for entry in walkDirTreeContents(i, dirIgnores=OSWALK_IGNORES):
-					if entry.is_file() and entry.name.endswith('.java'):
+				for entry in walkDirTreeContents(i, dirIgnores=OSWALK_IGNORES, fileSuffixes='.java', threads=int(self.dirScanThreads)):
+					if entry.is_file():
 						inputfiles.append(fromLongPathSafe(entry.path) if len(entry.path) < 256 else entry.path)
+						inputnames.append(os.path.relpath(fromLongPathSafe(entry.path), fromLongPathSafe(i)))
 			else: 
 				assert False, 'Compilation input path does not exist: %s'%i
 		assert inputfiles, 'No .java files found to compile in %s'%input		
 		displayName = kwargs.pop('displayName', 'javac<%s => %s>'%(os.path.basename(input[0]), os.path.basename(output)))
+		timing = JavaLaunchTiming(self.owner, 'javac', displayName) if self.recordLaunchTimings else None
 		
-		classpath = self.toClasspathList(classpath)
+		with timingSpan(timing, 'classpath'):
+			classpath = self.toClasspathList(classpath)
+
+		cacheKey, cacheHit = None, False
+		if self.compileCacheDir:
+			cache = JavaCompileCache.getCache(os.path.join(self.project.testRootDir, self.compileCacheDir), self.compileCacheMaxSizeMB, 
+				useHardLinks=self.compileCacheUseHardLinks)
+			cacheKey = cache.getKey(self.compilerExecutable, list(zip(inputnames, inputfiles)), classpath, arguments, 
+				workingDir=os.path.join(self.owner.output, kwargs.get('workingDir') or self.owner.output))
 
 		args = list(arguments)
 		
@@ -274,21 +474,72 @@ class JavaPlugin(object):
 		if classpath: args = ['-classpath', os.pathsep.join(classpath)]+args
 		
 		stdouterr = kwargs.pop('stdouterr', self.owner.allocateUniqueStdOutErr('javac.%s'%os.path.basename(output)))
-		
-		process = self.owner.startProcess(self.compilerExecutable, self._argsOrArgsFile(args, stdouterr), stdouterr=stdouterr, displayName=displayName, 
-			onError=lambda process: [
-				self.owner.logFileContents(process.stderr, maxLines=0, 
-					logFunction=lambda line: # colouring the main lines in red makes this a lot easier to read
-						self.log.info(u'  %s', line, extra=pysys.utils.logutils.BaseLogFormatter.tag(
-							LOG_ERROR if ': error:' in line else 
-							LOG_WARN if ': warning:' in line else 
-							LOG_FILE_CONTENTS))
-				),
-				self.owner.getExprFromFile(process.stderr, '(.*(error|invalid).*)')
-			][-1], info={'output':output}, **kwargs)
+
+		if cacheKey is not None:
+			stderr = os.path.join(self.owner.output, stdouterr+'.err' if isstring(stdouterr) else stdouterr[1])
+			if cache.materialize(cacheKey, output, stderr):
+				self.log.info('Java compilation cache hit for %s (key %s)', displayName, cacheKey[:12])
+				kwargs['processFactory'] = lambda **kw: _FunctionProcess(lambda process: 0, **kw)
+				args, cacheHit = [], True
+			else:
+				self.log.info('Java compilation cache miss for %s (key %s)', displayName, cacheKey[:12])
+
+		compileServer = getattr(self.runner, 'javaCompileServer', None)
+		if 'processFactory' not in kwargs and compileServer is not None and compileServer.isAvailable() and not any(
+				a.startswith('-J') for a in args):
+			# The server has a different working directory, so make sure classpath entries are absolute
+			workingDir = os.path.join(self.owner.output, kwargs.get('workingDir', self.owner.output))
+			serverArgs = list(args)
+			if classpath: serverArgs[1] = os.pathsep.join(os.path.join(workingDir, c) for c in classpath)
+			javacArgs = list(args)
+
+			def compileUsingServer(process):
+				exitStatus = compileServer.compile(serverArgs, process.stdout, process.stderr, process.timeout)
+				if exitStatus is not None: return exitStatus
+
+				# fall back to executing javac directly if the server has died (only then is an args file needed)
+				fallback = pysys.process.helper.ProcessImpl(command=self.compilerExecutable, arguments=self._argsOrArgsFile(javacArgs, stdouterr),
+					environs=process.environs, workingDir=process.workingDir, state=FOREGROUND, timeout=process.timeout,
+					stdout=process.stdout, stderr=process.stderr, displayName=process.displayName,
+					expectedExitStatus=process.expectedExitStatus, info=process.info, owner=process.owner)
+				try:
+					fallback.start()
+				except ProcessTimeout:
+					fallback.stop()
+					raise
+				return fallback.exitStatus
+			kwargs['processFactory'] = lambda **kw: _FunctionProcess(compileUsingServer, **kw)
+			args = []
+
+		with timingSpan(timing, 'argsFile'):
+			processArgs = self._argsOrArgsFile(args, stdouterr)
+		if timing is not None:
+			if 'processFactory' not in kwargs: # -J options are not permitted in an args file
+				processArgs = timing.getStartupTimeLoggingArgs(self.javaHome, os.path.join(self.owner.output, kwargs.get('workingDir') or self.owner.output, 
+					os.path.basename(stdouterr if isstring(stdouterr) else stdouterr[0][:-4])+'.startuptime.log'), prefix='-J')+processArgs
+			kwargs['processFactory'] = timing.getProcessFactory(kwargs.get('processFactory'))
+		
+		process = None
+		try:
+			process = self.owner.startProcess(self.compilerExecutable, processArgs, stdouterr=stdouterr, displayName=displayName, 
+				onError=lambda process: [
+					self.owner.logFileContents(process.stderr, maxLines=0, 
+						logFunction=lambda line: # colouring the main lines in red makes this a lot easier to read
+							self.log.info(u'  %s', line, extra=pysys.utils.logutils.BaseLogFormatter.tag(
+								LOG_ERROR if ': error:' in line else 
+								LOG_WARN if ': warning:' in line else 
+								LOG_FILE_CONTENTS))
+					),
+					self.owner.getExprFromFile(process.stderr, '(.*(error|invalid).*)')
+				][-1], info={'output':output}, **kwargs)
+		finally:
+			if timing is not None: timing.processStarted(process, background=kwargs.get('background', False))
 		
 		# log stderr even when it works so we see warnings
 		self.owner.logFileContents(process.stderr, maxLines=0)
+
+		if cacheKey is not None and process.exitStatus == 0 and not cacheHit:
+			cache.store(cacheKey, output, process.stderr)
 		return process
 
 	def _argsOrArgsFile(self, args, stdouterr):
@@ -305,7 +556,7 @@ class JavaPlugin(object):
 				f.write('"%s"'%a.replace('\\','\\\\')+'\n')
 		return ['@'+argsFilename]
 
-	def startJava(self, classOrJar, arguments=[], classpath=None, jvmArgs=None, jvmProps={}, disableCoverage=False, stdouterr=None, **kwargs):
+	def startJava(self, classOrJar, arguments=[], classpath=None, jvmArgs=None, jvmProps={}, disableCoverage=False, stdouterr=None, disableProfiling=False, **kwargs):
 		"""
 		Start a Java process to execute the specified class or .jar file. 
 		
@@ -320,7 +571,13 @@ class JavaPlugin(object):
 				classpath=self.java.defaultClasspath+[self.output+'/javaclasses'], timeout=60)
 		
 		If the project includes a writer with alias "javaCoverageWriter" then that writer is requested to add some 
-		JVM arguments to control code coverage (unless disableCoverage=True). 
+		JVM arguments to control code coverage (unless disableCoverage=True). Similarly, if there is a 
+		`pysysjava.profiling.JavaProfilingWriter` with alias "javaProfilingWriter" and profiling is enabled (for example 
+		with ``-XjavaProfile=jfr``), JVM arguments are added to record a Java Flight Recording (unless 
+		disableProfiling=True). 
+		
+		If the project includes a `pysysjava.heapbudget.JavaHeapBudget` runner plugin with alias "javaHeapBudget", this 
+		method waits until the process's maximum heap size fits within the memory budget before starting it. 
 		
 		:param str classOrJar: Either a class (from the classpath) to execute, or the path to a ``.jar`` file 
 			(an absolute path or relative to the output directory) whose manifest indicates the main class.
@@ -344,6 +601,10 @@ class JavaPlugin(object):
 			Code coverage can also be disabled on a per-test/directory basis by setting ``self.disableCoverage`` or 
 			adding the ``disableCoverage`` group to the ``pysystest.xml``.
 		
+		:param bool disableProfiling: Set to True to ensure Java profiling data is not captured for this process. 
+			Profiling can also be disabled on a per-test/directory basis by setting ``self.disableJavaProfiling`` or 
+			adding the ``disableJavaProfiling`` group to the ``pysystest.xml``.
+		
 		:param str stdouterr: The filename prefix to use for the stdout and stderr of the process 
 			(out/err will be appended), or a tuple of (stdout,stderr) as returned from 
 			`pysys.basetest.BaseTest.allocateUniqueStdOutErr`. 
@@ -360,6 +621,10 @@ class JavaPlugin(object):
 		if jvmArgs is None: jvmArgs = self.defaultJVMArgs
 
 		jvmArgs = list(jvmArgs) # copy it so we can mutate it below
+		userJVMArgs = list(jvmArgs)
+		if (not disableProfiling) and hasattr(self.runner, 'javaProfilingWriter'):
+			jvmArgs = self.runner.javaProfilingWriter.getProfilingJVMArgs(
+				owner=self.owner, stdouterr=stdouterr)+jvmArgs
 		if (not disableCoverage) and (not self.owner.disableCoverage) and hasattr(self.runner, 'javaCoverageWriter'):
 			jvmArgs = self.runner.javaCoverageWriter.getCoverageJVMArgs(
 				owner=self.owner, stdouterr=stdouterr)+jvmArgs
@@ -370,6 +635,20 @@ class JavaPlugin(object):
 		shortName = os.path.basename(stdouterr[0] if isinstance(stdouterr, tuple) else (stdouterr or classOrJar))
 
 		displayName = kwargs.pop('displayName', 'java %s'%shortName)
+		timing = JavaLaunchTiming(self.owner, 'java', displayName) if self.recordLaunchTimings else None
+		if timing is not None:
+			jvmArgs = timing.getStartupTimeLoggingArgs(self.javaHome, os.path.join(self.owner.output, 
+				kwargs.get('workingDir') or self.owner.output, shortName+'.startuptime.log'))+jvmArgs
+
+		if self.gcLogging and hasattr(self.owner, 'descriptor'):
+			gcLog = os.path.join(self.owner.output, kwargs.get('workingDir') or self.owner.output, shortName+'.gc.log')
+			gcLoggingArgs = getGCLoggingJVMArgs(self.javaHome, gcLog)
+			if gcLoggingArgs:
+				jvmArgs = gcLoggingArgs+jvmArgs
+				kwargs['info'] = dict(kwargs.get('info') or {}, gcLog=gcLog)
+				# registered when the first process is started, so it runs after any cleanup functions added later
+				if not self.__gcLogs: self.owner.addCleanupFunction(self.__summarizeGCLogs)
+				self.__gcLogs.append(gcLog)
 
 		if classOrJar.endswith('.jar'):
 			assert not originalClasspath, 'Java does not accept any classpath options when executing a .jar'
@@ -383,13 +662,93 @@ class JavaPlugin(object):
 			if not os.path.exists(classOrJar): raise FileNotFoundError('Cannot find file: "%s"'%classOrJar)
 			jvmArgs.append(os.path.join(self.owner.output, classOrJar))
 		else:
-			classpath = self.toClasspathList(classpath)
+			with timingSpan(timing, 'classpath'):
+				classpath = self.toClasspathList(classpath)
 			self.log.debug('Starting Java process %s with classpath: \n%s', displayName, '\n'.join("     cp #%-2d    : %s%s"%(
 				i+1, pathelement, '' if os.path.exists(pathelement) else ' (does not exist!)') for i, pathelement in enumerate(classpath)))
 			jvmArgs = ['-classpath', os.pathsep.join(classpath)] + jvmArgs
 			jvmArgs.append(classOrJar)
+		
+		appCDSKey, appCDSArgs, appCDSCreating = None, [], False
+		if self.appCDSCacheDir and AppCDSArchiveCache.isSupported(self.javaHome):
+			appCDSCache = AppCDSArchiveCache.getCache(os.path.join(self.project.testRootDir, self.appCDSCacheDir))
+			appCDSKey = appCDSCache.getKey(self.javaExecutable, [] if classOrJar.endswith('.jar') else classpath, classOrJar, 
+				jvmArgs=userJVMArgs, workingDir=os.path.join(self.owner.output, kwargs.get('workingDir') or self.owner.output))
+			if appCDSKey is not None:
+				# background processes may not exit until the end of the run, so only foreground processes create archives
+				appCDSArgs, appCDSCreating = appCDSCache.getJVMArgs(appCDSKey, create=not kwargs.get('background'))
+				jvmArgs = appCDSArgs+jvmArgs
+
+		heapBudget = getattr(self.runner, 'javaHeapBudget', None)
+		with timingSpan(timing if heapBudget is not None else None, 'heapBudget'):
+			heapReservation = None if heapBudget is None else heapBudget.admit(self.owner, jvmArgs, displayName, 
+				environs=kwargs['environs'] if kwargs.get('environs') is not None else self.owner.getDefaultEnvirons(command=self.javaExecutable))
+
+		with timingSpan(timing, 'argsFile'):
+			processArgs = self._argsOrArgsFile(jvmArgs+arguments, shortName)
+		if timing is not None: kwargs['processFactory'] = timing.getProcessFactory(kwargs.get('processFactory'))
+
+		startTime = time.monotonic()
+		process = None
+		try:
+			process = self.owner.startProcess(self.javaExecutable, processArgs, stdouterr=stdouterr, displayName=displayName, **kwargs)
+		finally:
+			if heapReservation is not None: heapReservation.started(process, background=kwargs.get('background', False))
+			if timing is not None: timing.processStarted(process, background=kwargs.get('background', False))
+			if appCDSCreating: # even if the process failed, so that the key does not remain pending
+				appCDSCreated = appCDSCache.archiveCreated(appCDSKey, 
+					time.monotonic()-startTime if process is not None and process.exitStatus is not None else None)
+		if appCDSCreating:
+			if appCDSCreated:
+				self.log.debug('Created AppCDS archive for %s (key %s)', displayName, appCDSKey[:16])
+			else:
+				self.log.info('AppCDS archive was not created by %s, so it will not be used for this classpath during this run (key %s)', 
+					displayName, appCDSKey[:16])
+		elif appCDSArgs and not kwargs.get('background') and process.exitStatus is not None:
+			duration = time.monotonic()-startTime
+			baseline = appCDSCache.getBaselineDurationSecs(appCDSKey)
+			if baseline is not None: self.log.info('Started %s using AppCDS archive; duration %0.2f secs compared to %0.2f secs without the archive (saving approximately %0.2f secs)', 
+				displayName, duration, baseline, baseline-duration)
+		return process
 
-		return self.owner.startProcess(self.javaExecutable, self._argsOrArgsFile(jvmArgs+arguments, shortName), stdouterr=stdouterr, **kwargs)
+	def getGCLogSummary(self, process):
+		"""
+		Analyze the GC log of a process started by `startJava()` when `gcLogging` is enabled. 
+		
+		For example, to check that a server did not leak memory::
+		
+			self.assertThat('heapAfterGCSlopeMBPerSec < 0.1', 
+				heapAfterGCSlopeMBPerSec=self.java.getGCLogSummary(server)['heapAfterGCSlopeMBPerSec'])
+		
+		For background processes that are still running, this includes the GC activity that has been logged so far. 
+		
+		:param pysys.process.Process process: The process. 
+		:return dict: The summary, as returned by `pysysjava.gclog.GCLogParser.getSummary`, or None if there is no GC 
+			log for this process. 
+		"""
+		gcLog = process.info.get('gcLog')
+		return parseGCLog(gcLog) if gcLog else None
+
+	def __summarizeGCLogs(self):
+		summaries = []
+		for gcLog in self.__gcLogs:
+			summary = parseGCLog(gcLog)
+			if summary is None: continue
+			name = os.path.basename(gcLog)[:-len('.gc.log')]
+			summaries.append(dict(gcLog=os.path.basename(gcLog), **summary))
+			
+			def formatMs(ms): return '-' if ms is None else '%0.1f'%ms
+			self.log.info('GC summary for %s: %d pauses totalling %0.3f secs (p50/p99/max %s/%s/%s ms); heap after GC %s; allocation rate %s', 
+				name, summary['pauseCount'], summary['totalPauseSecs'], formatMs(summary['pausePercentilesMs']['p50']), 
+				formatMs(summary['pausePercentilesMs']['p99']), formatMs(summary['maxPauseMs']), 
+				'%d -> %d MB'%(summary['heapAfterGC'][0][1], summary['heapAfterGC'][-1][1]) if summary['heapAfterGC'] else 'unknown',
+				'unknown' if summary['allocationRateMBPerSec'] is None else '%0.1f MB/s'%summary['allocationRateMBPerSec'])
+			if self.gcMaxPauseP99Ms > 0 and summary['pausePercentilesMs']['p99'] is not None:
+				self.owner.assertThat('p99PauseMs <= gcMaxPauseP99Ms', p99PauseMs=summary['pausePercentilesMs']['p99'], 
+					gcMaxPauseP99Ms=self.gcMaxPauseP99Ms, assertMessage='GC pause time p99 for %s'%name)
+		if summaries:
+			with open(toLongPathSafe(os.path.join(self.owner.output, 'java-gc-summary.json')), 'w', encoding='utf-8') as f:
+				json.dump(summaries, f, indent='\t')
 
 	def toClasspathList(self, classpath):
 		"""
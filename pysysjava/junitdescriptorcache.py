@@ -0,0 +1,161 @@
+"""
+An on-disk cache of the ``.java`` files found under each ``Input/`` directory by
+`pysysjava.junittest.JUnitDescriptorLoader`, which avoids rescanning unchanged directories every time the test
+descriptors are loaded (for example by ``pysys run`` and ``pysys print``).
+
+The cache is enabled by setting the ``junitDescriptorCacheDir`` project property.
+"""
+
+import os
+import json
+import hashlib
+import fnmatch
+import logging
+import time
+import uuid
+
+from pysys.utils.fileutils import mkdir, toLongPathSafe
+
+from pysysjava.javaplugin import walkDirTree
+
+log = logging.getLogger('pysys.pysysjava.junitdescriptorcache')
+
+class JavaSourceTreeCache(object):
+	"""
+	A directory of snapshots, each recording the subdirectories and ``.java`` files of every directory in a source
+	tree along with the directory's modification time.
+
+	Adding, removing or renaming a file changes the modification time of the directory containing it, so when the
+	tree is next listed only directories whose modification time has changed are rescanned; for other directories a
+	single ``stat`` is enough to reuse the snapshot. Directories modified very shortly before a snapshot was taken are
+	always rescanned, since a further change within the filesystem's timestamp granularity would not be detected.
+
+	Each snapshot is identified by a key (see `getKey`) so that changing the directory configuration results in a
+	fresh scan. It is safe for multiple PySys processes to share the same cache directory.
+
+	:param str cacheDir: The absolute path of the directory to store snapshots in.
+	"""
+
+	FORMAT_VERSION = 1
+	"""Incremented whenever the snapshot format changes. """
+
+	RACY_INTERVAL_NS = 2*1000*1000*1000
+	"""Directories modified less than this many nanoseconds before a scan are not trusted by later scans. """
+
+	def __init__(self, cacheDir):
+		self.cacheDir = os.path.normpath(cacheDir)
+
+	@staticmethod
+	def getKey(inputdir, dirconfigFile):
+		"""
+		Calculate the snapshot key for a source tree.
+
+		:param str inputdir: The root of the source tree.
+		:param str dirconfigFile: The path of the ``pysysdirconfig.xml`` that configures the loader for this tree,
+			whose contents are included in the key.
+		:return str: A hex string.
+		"""
+		h = hashlib.sha256()
+		h.update(('%s\0%s\0'%(JavaSourceTreeCache.FORMAT_VERSION, os.path.normpath(inputdir))).encode('utf-8', errors='surrogateescape'))
+		with open(toLongPathSafe(dirconfigFile), 'rb') as f:
+			h.update(f.read())
+		return h.hexdigest()
+
+	def getSnapshotPath(self, key):
+		return os.path.join(self.cacheDir, 'junit-sources-%s.json'%key[:16])
+
+	def listJavaFiles(self, inputdir, key, dirIgnores, threads=1):
+		"""
+		List the ``.java`` files in the specified source tree, using and updating the snapshot for the specified key.
+
+		The files are returned in the same order as `pysysjava.javaplugin.walkDirTreeContents`, i.e. each directory's
+		files come after those of its subdirectories, with entries sorted by name.
+
+		:param str inputdir: The root of the source tree, which should be long path safe.
+		:param str key: The key from `getKey`.
+		:param list[str] dirIgnores: Glob patterns for the names of directories that should not be searched.
+		:param int threads: The number of threads used to list directories if there is no existing snapshot.
+		:return list[str]: The paths of the ``.java`` files, relative to the inputdir, using ``/`` as a separator.
+		"""
+		starttime = time.time_ns()
+		snapshot = self.__load(key)
+
+		dirs = {} # relative dir path -> (mtime_ns, subdirs, javafiles)
+		if snapshot is None:
+			for dirpath, contents in walkDirTree(inputdir, dirIgnores=dirIgnores, fileSuffixes='.java', threads=threads):
+				dirs[self.__relPath(inputdir, dirpath)] = (os.stat(dirpath).st_mtime_ns,
+					[e.name for e in contents if e.is_dir(follow_symlinks=False)],
+					[e.name for e in contents if e.is_file()])
+			rescanned = len(dirs)
+		else:
+			rescanned = self.__refresh(inputdir, snapshot, dirs, dirIgnores)
+
+		result = []
+		def addFiles(rel): # iterative post-order traversal, matching walkDirTree
+			stack = [(rel, iter(dirs[rel][1]))]
+			while stack:
+				rel, remaining = stack[-1]
+				subdir = next(remaining, None)
+				if subdir is None:
+					stack.pop()
+					result.extend(rel+f for f in dirs[rel][2])
+				else:
+					stack.append((rel+subdir+'/', iter(dirs[rel+subdir+'/'][1])))
+		addFiles('')
+
+		if snapshot is None or rescanned > 0:
+			self.__save(key, {rel: [None if mtime >= starttime-self.RACY_INTERVAL_NS else mtime, subdirs, files]
+				for rel, (mtime, subdirs, files) in dirs.items()})
+		log.debug('Listed %d .java files under %s, rescanning %d of %d directories', len(result), inputdir, rescanned, len(dirs))
+		return result
+
+	def __refresh(self, inputdir, snapshot, dirs, dirIgnores):
+		# Populate dirs from the snapshot, rescanning any directories that have changed. Returns the number rescanned.
+		rescanned = 0
+		pending = ['']
+		while pending:
+			rel = pending.pop()
+			path = os.path.join(inputdir, rel.replace('/', os.sep)) if rel else inputdir
+			mtime = os.stat(path).st_mtime_ns
+			cached = snapshot.get(rel)
+			if cached is not None and cached[0] == mtime:
+				subdirs, files = cached[1], cached[2]
+			else:
+				rescanned += 1
+				subdirs, files = [], []
+				with os.scandir(path) as it:
+					for entry in it:
+						if entry.is_dir(follow_symlinks=False):
+							if not any(fnmatch.fnmatch(entry.name, ignore) for ignore in dirIgnores): subdirs.append(entry.name)
+						elif entry.name.endswith('.java') and entry.is_file():
+							files.append(entry.name)
+				subdirs.sort()
+				files.sort()
+			dirs[rel] = (mtime, subdirs, files)
+			pending.extend(rel+s+'/' for s in subdirs)
+		return rescanned
+
+	@staticmethod
+	def __relPath(inputdir, dirpath):
+		rel = dirpath[len(inputdir):].strip(os.sep).replace(os.sep, '/')
+		return rel+'/' if rel else ''
+
+	def __load(self, key):
+		try:
+			with open(toLongPathSafe(self.getSnapshotPath(key)), 'r', encoding='utf-8') as f:
+				data = json.load(f)
+		except FileNotFoundError:
+			return None
+		except Exception as ex:
+			log.warning('Ignoring invalid JUnit descriptor cache file %s: %s', self.getSnapshotPath(key), ex)
+			return None
+		if data.get('formatVersion') != self.FORMAT_VERSION or data.get('key') != key: return None
+		return data['dirs']
+
+	def __save(self, key, dirs):
+		path = self.getSnapshotPath(key)
+		mkdir(self.cacheDir)
+		tmp = '%s.%s.tmp'%(path, uuid.uuid4().hex) # unique name in case of concurrent PySys processes
+		with open(toLongPathSafe(tmp), 'w', encoding='utf-8') as f:
+			json.dump({'formatVersion': self.FORMAT_VERSION, 'key': key, 'dirs': dirs}, f)
+		os.replace(toLongPathSafe(tmp), toLongPathSafe(path))
@@ -0,0 +1,104 @@
+"""
+Support for reading the newline-delimited JSON events written by the bundled JUnit Platform listener while JUnit
+tests are executing, which allows results to be recorded incrementally rather than waiting for the XML reports.
+"""
+
+import json
+import logging
+
+from pysys.utils.fileutils import toLongPathSafe
+
+from pysysjava.junitxml import JUnitXMLParser, _setOutcomeReason, _setOutcomeDetails, _setTestFileLine
+
+log = logging.getLogger('pysys.pysysjava.junitevents')
+
+class JUnitEventStreamReader(object):
+	"""
+	Incrementally reads testcase results from a JUnit events file that may still be being written.
+
+	Each call to `readTestcases` returns the testcases that have completed since the previous call, as dictionaries
+	with the same keys as those returned by `pysysjava.junitxml.JUnitXMLParser.parse`.
+
+	:param str path: The path of the events file.
+	"""
+
+	def __init__(self, path):
+		self.path = path
+		self.__offset = 0
+		self.__partialLine = b''
+		self.__running = {} # uniqueId -> testcase dict for testcases that have started but not finished
+
+	def readTestcases(self):
+		"""
+		Read any new events from the file.
+
+		:return list[dict[str,obj]]: The testcases that have completed since the last call.
+		"""
+		try:
+			with open(toLongPathSafe(self.path), 'rb') as f:
+				f.seek(self.__offset)
+				data = f.read()
+		except FileNotFoundError: # not created yet
+			return []
+		self.__offset += len(data)
+
+		lines = (self.__partialLine+data).split(b'\n')
+		self.__partialLine = lines.pop() # the last line is incomplete unless empty
+		completed = []
+		for line in lines:
+			if not line.strip(): continue
+			t = self._handleEvent(json.loads(line.decode('utf-8')))
+			if t is not None: completed.append(t)
+		return completed
+
+	def getIncompleteTestcases(self):
+		"""
+		Returns the testcases that have started but not yet completed, for example because the JUnit process timed out.
+		"""
+		return list(self.__running.values())
+
+	def _handleEvent(self, event):
+		kind = event['event']
+		if kind == 'output':
+			t = self.__running.get(event['id'])
+			if t is not None:
+				for k in ['stdout', 'stderr']:
+					text = (event.get(k) or '').strip()
+					if text: t[k] = (t[k]+'\n'+text) if k in t else text
+			return None
+
+		if kind == 'started':
+			self.__running[event['id']] = self._newTestcase(event)
+			return None
+
+		t = self.__running.pop(event['id'], None) or self._newTestcase(event)
+		if kind == 'skipped':
+			t['outcome'] = 'skipped'
+			t['outcomeReason'] = (event.get('reason') or '').strip()
+			return t
+
+		assert kind == 'finished', 'Unexpected JUnit event: %s'%kind
+		t['durationSecs'] = event.get('durationSecs', 0.0)
+		if event['status'] == 'SUCCESSFUL':
+			t['outcome'] = 'passed'
+		elif event['status'] == 'ABORTED': # e.g. assumption failures, which the legacy XML report treats as skipped
+			t['outcome'] = 'skipped'
+			t['outcomeReason'] = (event.get('message') or '').strip()
+		else:
+			t['outcome'] = 'failure' if event.get('isAssertion') else 'error'
+			if event.get('throwableType'): t['outcomeType'] = event['throwableType']
+			details = (event.get('stackTrace') or '').replace('\r\n', '\n').lstrip() # the whole stack trace, as in the XML report
+			_setOutcomeReason(t, (event.get('message') or '').strip(), details)
+			_setOutcomeDetails(t, details, JUnitXMLParser.outcomeDetailsExcludeLinesRegex)
+			_setTestFileLine(t)
+		return t
+
+	@staticmethod
+	def _newTestcase(event):
+		t = {
+			'classname': event.get('classname') or '',
+			'name': event.get('name'),
+			'durationSecs': 0.0,
+		}
+		if event.get('displayName'): t['displayName'] = event['displayName']
+		return t
@@ -0,0 +1,330 @@
+"""
+A compact on-disk store of the JUnit testcase results from many test runs, with a query API for questions such as
+which tests are slowest, which are flakiest, and how the duration of each test class has changed over time.
+
+The store is populated by adding `JUnitResultsStoreWriter` to your project configuration::
+
+	<writer classname="pysysjava.junitresults.JUnitResultsStoreWriter" alias="junitResultsStoreWriter">
+		<property name="storeDir" value="${testRootDir}/../junit-results-store"/>
+		<property name="runId" value="${env.BUILD_NUMBER}"/>
+	</writer>
+
+and can then be queried from Python using `JUnitResultsStore`, for example::
+
+	store = JUnitResultsStore('junit-results-store')
+	for classname, name, secs in store.getSlowestTests(10): print('%s.%s: %0.1fs'%(classname, name, secs))
+"""
+
+import os
+import sys
+import json
+import time
+import array
+import heapq
+import logging
+import uuid
+
+from pysys.writer.api import BaseRecordResultsWriter
+from pysys.utils.fileutils import mkdir, toLongPathSafe
+
+log = logging.getLogger('pysys.pysysjava.junitresults')
+
+class JUnitResultsStore(object):
+	"""
+	A directory containing the JUnit testcase results from any number of test runs, stored by column.
+
+	Each run is written to a separate immutable ``.jrs`` segment file containing a JSON header line (with the run id
+	and a table of the distinct strings used in that run) followed by one binary array per column: `COLUMNS` gives
+	the names and ``array`` type codes. String columns are stored as indexes into the string table, so each row
+	takes only 24 bytes regardless of how long the test names are.
+
+	To allow queries over millions of rows to complete in milliseconds, the store also maintains a ``summary.json``
+	file with per-test and per-class aggregates. When the store is queried, any segments written since the summary
+	was last updated are added to it (so the cost of reading each row is paid only once), and the updated summary is
+	saved. Deleting old segment files to limit the history is allowed, and causes the summary to be rebuilt.
+
+	It is safe for multiple PySys processes to add runs to the same store concurrently. Instances of this class are
+	not thread-safe.
+
+	:param str storeDir: The absolute path of the store directory, which is created if needed.
+	"""
+
+	FORMAT_VERSION = 1
+	"""Incremented whenever the segment or summary file format changes. """
+
+	COLUMNS = [
+		('testId', 'I'),
+		('classname', 'I'),
+		('name', 'I'),
+		('outcome', 'I'),
+		('outcomeType', 'I'),
+		('durationSecs', 'f'),
+	]
+	"""The name and ``array`` type code of each column. String columns use the type code ``I``. """
+
+	FAILURE_OUTCOMES = ('failure', 'error')
+	"""The JUnit outcomes that are counted as failures when identifying flaky tests. """
+
+	def __init__(self, storeDir):
+		self.storeDir = os.path.normpath(storeDir)
+		self.__summary = None
+
+	def addRun(self, runId, testcases, startTime=None):
+		"""
+		Add the results of a test run to the store, as a new segment.
+
+		:param str runId: An identifier for the run, such as a CI build number. This does not need to be unique.
+		:param list[tuple] testcases: The results for each testcase, as a tuple of
+			``(testId, classname, name, outcome, outcomeType, durationSecs)`` where testId is the PySys test id,
+			outcome is the JUnit outcome (e.g. ``passed``/``failure``/``error``/``skipped``) and outcomeType is the
+			exception class of a failure, or an empty string.
+		:param float startTime: The time the run started, in seconds since the epoch. Runs are ordered by this time.
+			Defaults to the current time.
+		:return str: The path of the new segment file.
+		"""
+		startTime = time.time() if startTime is None else startTime
+		strings, stringIndexes = [], {}
+		columns = [array.array(typecode) for name, typecode in self.COLUMNS]
+		stringColumns = [c for c, (name, typecode) in zip(columns, self.COLUMNS) if typecode == 'I']
+		for t in testcases:
+			for column, value in zip(stringColumns, t):
+				i = stringIndexes.get(value)
+				if i is None:
+					i = stringIndexes[value] = len(strings)
+					strings.append(value)
+				column.append(i)
+			columns[-1].append(t[-1])
+
+		header = {
+			'formatVersion': self.FORMAT_VERSION,
+			'runId': str(runId),
+			'startTime': startTime,
+			'rows': len(testcases),
+			'byteorder': sys.byteorder,
+			'columns': [[name, c.typecode, c.itemsize] for (name, typecode), c in zip(self.COLUMNS, columns)],
+			'strings': strings,
+		}
+		# the name starts with the time so that listing the directory gives the segments in run order
+		path = os.path.join(self.storeDir, '%s.%06d.%s.jrs'%(time.strftime('%Y%m%d-%H%M%S', time.gmtime(startTime)),
+			int(startTime%1*1000000), uuid.uuid4().hex[:8]))
+		mkdir(self.storeDir)
+		tmp = path+'.tmp'
+		with open(toLongPathSafe(tmp), 'wb') as f:
+			f.write(json.dumps(header).encode('utf-8')+b'\n')
+			for c in columns: c.tofile(f)
+		os.replace(toLongPathSafe(tmp), toLongPathSafe(path))
+		return path
+
+	@staticmethod
+	def readSegment(path):
+		"""
+		Read all columns of the specified segment file.
+
+		This is useful for ad-hoc queries that cannot be answered using the summary; reading each column is fast, but
+		processing millions of rows in Python will take seconds rather than milliseconds.
+
+		:return (dict,dict[str,array.array]): The header (including the ``runId``, ``startTime`` and ``strings``
+			table), and a dictionary of the arrays for each column name in `COLUMNS`.
+		"""
+		with open(toLongPathSafe(path), 'rb') as f:
+			header = json.loads(f.readline().decode('utf-8'))
+			if header.get('formatVersion') != JUnitResultsStore.FORMAT_VERSION:
+				raise Exception('Unsupported JUnit results store format version %s in %s'%(header.get('formatVersion'), path))
+			columns = {}
+			for name, typecode, itemsize in header['columns']:
+				column = array.array(typecode)
+				if column.itemsize != itemsize:
+					raise Exception('Cannot read JUnit results store segment written on a platform with a different size for array type %s: %s'%(typecode, path))
+				column.fromfile(f, header['rows'])
+				if header['byteorder'] != sys.byteorder: column.byteswap()
+				columns[name] = column
+		return header, columns
+
+	def getSegmentPaths(self):
+		"""
+		Returns the absolute paths of all segment files in the store, in run order.
+		"""
+		try:
+			names = os.listdir(toLongPathSafe(self.storeDir))
+		except FileNotFoundError:
+			return []
+		return [os.path.join(self.storeDir, n) for n in sorted(names) if n.endswith('.jrs')]
+
+	def iterTestcases(self):
+		"""
+		Yields every row in the store in run order, as a dictionary with keys ``runId``, ``startTime`` and each of the
+		column names in `COLUMNS`.
+		"""
+		for path in self.getSegmentPaths():
+			header, columns = self.readSegment(path)
+			strings = header['strings']
+			values = [columns[name] if typecode != 'I' else [strings[i] for i in columns[name]] for name, typecode in self.COLUMNS]
+			for row in zip(*values):
+				t = dict(zip([name for name, typecode in self.COLUMNS], row))
+				t['runId'], t['startTime'] = header['runId'], header['startTime']
+				yield t
+
+	def getRuns(self):
+		"""
+		Returns a list of ``(runId, startTime)`` for each run in the store, in run order.
+		"""
+		return [(runId, startTime) for runId, startTime, segment in self.__getSummary()['runs']]
+
+	def getSlowestTests(self, count=10, by='mean'):
+		"""
+		Returns the JUnit testcases with the longest durations.
+
+		:param int count: The maximum number of testcases to return.
+		:param str by: Which duration to use for each testcase: ``mean`` (over all runs), ``max`` or ``last`` (the
+			most recent run that executed it).
+		:return list[(str,str,float)]: The classname, name and duration in seconds of each testcase, slowest first.
+		"""
+		index = {'mean': None, 'max': 2, 'last': 3}[by]
+		def secs(stats): return stats[1]/stats[0] if index is None else stats[index]
+		tests = self.__getSummary()['tests']
+		return [tuple(key.split('#', 1))+(secs(tests[key]),) for key in
+			heapq.nsmallest(count, tests, key=lambda key: (-secs(tests[key]), key))]
+
+	def getFlakiestTests(self, count=10, minRuns=2):
+		"""
+		Returns the JUnit testcases whose outcome most often changes between passing and failing (an ``error`` or
+		``failure`` outcome) in consecutive runs that executed them. Skipped results are ignored, and testcases that
+		always fail are not considered flaky.
+
+		:param int count: The maximum number of testcases to return.
+		:param int minRuns: Testcases with fewer non-skipped results than this are ignored.
+		:return list[(str,str,float,int,int)]: The classname, name, flakiness (the fraction of consecutive runs where
+			the outcome changed), number of failures and number of non-skipped runs for each testcase with at least one
+			change, flakiest first.
+		"""
+		tests = self.__getSummary()['tests']
+		def flakiness(key):
+			runs, flips = tests[key][4], tests[key][6]
+			return flips/(runs-1) if runs > 1 else 0.0
+		candidates = [key for key, stats in tests.items() if stats[6] > 0 and stats[4] >= minRuns]
+		return [tuple(key.split('#', 1))+(flakiness(key), tests[key][5], tests[key][4]) for key in
+			heapq.nsmallest(count, candidates, key=lambda key: (-flakiness(key), -tests[key][5], key))]
+
+	def getClassDurationTrend(self, classname):
+		"""
+		Returns the total duration of the testcases in the specified JUnit test class for each run that executed it.
+
+		:param str classname: The fully qualified class name.
+		:return list[(str,float)]: The run id and total duration in seconds for each run, in run order.
+		"""
+		runs = self.__getSummary()['runs']
+		return [(runs[run][0], secs) for run, secs in self.__getSummary()['classes'].get(classname, [])]
+
+	def __getSummary(self):
+		# Returns the summary, first adding any new segments to it
+		segments = [os.path.basename(p) for p in self.getSegmentPaths()]
+		summary = self.__summary
+		if summary is None:
+			summary = self.__summary = self.__loadSummary()
+		if summary['runs'] and summary['runs'][-1][2] == (segments[-1] if segments else None) and len(summary['runs']) == len(segments):
+			return summary
+
+		included = {run[2] for run in summary['runs']}
+		if not included.issubset(segments): # some segments were deleted
+			summary = self.__summary = self.__newSummary()
+			included = set()
+		added = [s for s in segments if s not in included]
+		for s in added:
+			self.__addToSummary(summary, s)
+		if added:
+			log.debug('Added %d segments to JUnit results store summary in %s', len(added), self.storeDir)
+			self.__saveSummary(summary)
+		return summary
+
+	def __newSummary(self):
+		return {
+			'formatVersion': self.FORMAT_VERSION,
+			'runs': [], # list of [runId, startTime, segment name]
+			'tests': {}, # "classname#name" -> [runs, totalSecs, maxSecs, lastSecs, nonSkippedRuns, failures, flips, lastFailed]
+			'classes': {}, # classname -> list of [run index, totalSecs]
+		}
+
+	def __addToSummary(self, summary, segment):
+		header, columns = self.readSegment(os.path.join(self.storeDir, segment))
+		strings = header['strings']
+		run = len(summary['runs'])
+		summary['runs'].append([header['runId'], header['startTime'], segment])
+		tests, classes = summary['tests'], {}
+		failureIndexes = {strings.index(o) for o in self.FAILURE_OUTCOMES if o in strings}
+		skippedIndex = strings.index('skipped') if 'skipped' in strings else -1
+
+		for classname, name, outcome, secs in zip(columns['classname'], columns['name'], columns['outcome'], columns['durationSecs']):
+			classname = strings[classname]
+			key = classname+'#'+strings[name]
+			stats = tests.get(key)
+			if stats is None: stats = tests[key] = [0, 0.0, 0.0, 0.0, 0, 0, 0, None]
+			stats[0] += 1
+			stats[1] += secs
+			if secs > stats[2]: stats[2] = secs
+			stats[3] = secs
+			if outcome != skippedIndex:
+				failed = outcome in failureIndexes
+				stats[4] += 1
+				if failed: stats[5] += 1
+				if stats[7] is not None and stats[7] != failed: stats[6] += 1
+				stats[7] = failed
+			classes[classname] = classes.get(classname, 0.0)+secs
+
+		for classname, secs in classes.items():
+			summary['classes'].setdefault(classname, []).append([run, secs])
+
+	def __loadSummary(self):
+		path = os.path.join(self.storeDir, 'summary.json')
+		try:
+			with open(toLongPathSafe(path), 'r', encoding='utf-8') as f:
+				summary = json.load(f)
+			if summary.get('formatVersion') == self.FORMAT_VERSION: return summary
+		except FileNotFoundError:
+			pass
+		except Exception as ex:
+			log.warning('Ignoring invalid JUnit results store summary file %s: %s', path, ex)
+		return self.__newSummary()
+
+	def __saveSummary(self, summary):
+		path = os.path.join(self.storeDir, 'summary.json')
+		tmp = '%s.%s.tmp'%(path, uuid.uuid4().hex) # unique name in case of concurrent PySys processes
+		with open(toLongPathSafe(tmp), 'w', encoding='utf-8') as f:
+			json.dump(summary, f)
+		os.replace(toLongPathSafe(tmp), toLongPathSafe(path))
+
+class JUnitResultsStoreWriter(BaseRecordResultsWriter):
+	"""
+	Writer that adds the results of every JUnit testcase executed by `pysysjava.junittest.JUnitTest` tests in this
+	run to a `JUnitResultsStore`, so that the history of test durations and outcomes across many runs can be queried.
+
+	As with other record writers, this is only enabled when ``pysys run`` is executed with ``--record``. The results
+	are written as a single new segment at the end of the run.
+	"""
+
+	storeDir = ''
+	"""
+	The directory of the store, which should be somewhere that is kept between test runs. If a relative path is
+	specified, it is relative to the testRootDir. This property must be set.
+	"""
+
+	runId = ''
+	"""
+	The identifier recorded for this run, such as a CI build number. Defaults to the start time and ``outDirName``
+	of the run.
+	"""
+
+	def setup(self, **kwargs):
+		if not self.storeDir: raise Exception('The storeDir property must be set for JUnitResultsStoreWriter')
+		self.storeDir = os.path.join(self.runner.project.testRootDir, self.storeDir)
+		self.testcases = []
+
+	def processResult(self, testObj, **kwargs):
+		for t in getattr(testObj, 'junitTestcaseResults', None) or []:
+			self.testcases.append((testObj.descriptor.id,)+t)
+
+	def cleanup(self, **kwargs):
+		if not self.testcases: return
+		runId = self.runId or '%s_%s'%(time.strftime('%Y-%m-%d_%H.%M.%S', time.localtime(self.runner.startTime)),
+			self.runner.project.properties['outDirName'])
+		path = JUnitResultsStore(self.storeDir).addRun(runId, self.testcases, startTime=self.runner.startTime)
+		log.info('JUnit results for %d testcases written to: %s', len(self.testcases), path)
@@ -0,0 +1,196 @@
+"""
+Scheduling of JUnit tests based on the durations recorded in previous test runs, so that the longest tests start
+first (rather than a long test starting at the end and dominating the total duration of the run), and so that tests
+can be split into shards with similar expected durations for execution on separate CI nodes.
+
+The duration history is enabled by setting the ``junitDurationHistoryFile`` project property, for example::
+
+	<property name="junitDurationHistoryFile" value="${testRootDir}/.pysys-cache/junit-durations.json"/>
+
+When this is set, `pysysjava.junittest.JUnitTest` records the total duration of the JUnit testcases executed by each
+test (as reported by JUnit, so excluding JVM startup and compilation), the history file is updated at the end of
+the test run, and `pysysjava.junittest.JUnitDescriptorLoader` uses it to set the ``executionOrderHint`` of each
+test. To split the tests into shards, use `JUnitShardSelector`.
+"""
+
+import os
+import json
+import heapq
+import logging
+import threading
+import uuid
+
+from pysys.utils.fileutils import mkdir, toLongPathSafe
+
+log = logging.getLogger('pysys.pysysjava.junitschedule')
+
+class JUnitDurationHistory(object):
+	"""
+	The expected duration of each test, keyed by test id (including the mode suffix, if any), which can be loaded
+	from and saved to a JSON file.
+
+	This class is thread-safe.
+
+	:param str path: The absolute path of the history file. It is not an error if it does not exist yet.
+	"""
+
+	FORMAT_VERSION = 1
+	"""Incremented whenever the file format changes. """
+
+	__instancesLock = threading.Lock()
+
+	def __init__(self, path):
+		self.path = path
+		self.__lock = threading.Lock()
+		self.__durations = {} # test id -> secs
+		self.__byIdWithoutMode = None # test id without mode -> longest secs for any mode; created when needed
+		self.__changed = False
+		try:
+			with open(toLongPathSafe(path), 'r', encoding='utf-8') as f:
+				data = json.load(f)
+			if data.get('formatVersion') == self.FORMAT_VERSION:
+				self.__durations = data['durations']
+		except FileNotFoundError:
+			pass
+		except Exception as ex:
+			log.warning('Ignoring invalid JUnit duration history file %s: %s', path, ex)
+
+	@staticmethod
+	def getInstance(runner):
+		"""
+		Get the history for this runner, which is saved automatically during runner cleanup.
+
+		:return JUnitDurationHistory: The history, or None if the ``junitDurationHistoryFile`` project property is not
+			set.
+		"""
+		with JUnitDurationHistory.__instancesLock:
+			history = getattr(runner, '_pysysjava_junitDurationHistory', None)
+			if history is None:
+				path = runner.project.getProperty('junitDurationHistoryFile', '')
+				if not path: return None
+				history = JUnitDurationHistory(os.path.join(runner.project.testRootDir, path))
+				runner._pysysjava_junitDurationHistory = history
+				runner.addCleanupFunction(history.save)
+			return history
+
+	def record(self, testId, durationSecs):
+		"""
+		Record the duration of the specified test, replacing any previous value.
+		"""
+		with self.__lock:
+			self.__durations[testId] = durationSecs
+			self.__byIdWithoutMode = None
+			self.__changed = True
+
+	def getDuration(self, testId):
+		"""
+		Returns the expected duration of the specified test, or None if it is not in the history.
+
+		If the id has no mode suffix, the longest duration for any mode of the test is returned.
+		"""
+		with self.__lock:
+			secs = self.__durations.get(testId)
+			if secs is None and '~' not in testId:
+				if self.__byIdWithoutMode is None:
+					self.__byIdWithoutMode = {}
+					for t, s in self.__durations.items():
+						t = t.split('~')[0]
+						self.__byIdWithoutMode[t] = max(s, self.__byIdWithoutMode.get(t, s))
+				secs = self.__byIdWithoutMode.get(testId)
+			return secs
+
+	def getMaxDuration(self):
+		"""
+		Returns the longest duration of any test in the history, or 0 if it is empty.
+		"""
+		with self.__lock:
+			return max(self.__durations.values(), default=0.0)
+
+	def getMeanDuration(self):
+		"""
+		Returns the mean duration of the tests in the history, or 0 if it is empty.
+		"""
+		with self.__lock:
+			return sum(self.__durations.values())/len(self.__durations) if self.__durations else 0.0
+
+	def save(self):
+		"""
+		Save the history file, if any durations have been recorded.
+		"""
+		with self.__lock:
+			if not self.__changed: return
+			durations = dict(sorted(self.__durations.items()))
+			self.__changed = False
+		mkdir(os.path.dirname(os.path.abspath(self.path)))
+		tmp = '%s.%s.tmp'%(self.path, uuid.uuid4().hex) # unique name in case of concurrent PySys processes
+		with open(toLongPathSafe(tmp), 'w', encoding='utf-8') as f:
+			json.dump({'formatVersion': self.FORMAT_VERSION, 'durations': durations}, f, indent='\t')
+		os.replace(toLongPathSafe(tmp), toLongPathSafe(self.path))
+		log.info('JUnit duration history for %d tests written to: %s', len(durations), self.path)
+
+def assignShards(durations, shardCount):
+	"""
+	Split a set of tests into shards with similar total durations, using the "longest processing time first"
+	algorithm: each test is assigned in order of decreasing duration to the shard with the lowest total so far.
+
+	The result is deterministic (ties are broken using the test id and shard number), so separate processes given
+	the same inputs will agree on the assignment.
+
+	:param dict[str,float] durations: The expected duration of each test, keyed by test id.
+	:param int shardCount: The number of shards.
+	:return list[list[str]]: The ids of the tests in each shard.
+	"""
+	shards = [[] for i in range(shardCount)]
+	totals = [(0.0, i) for i in range(shardCount)] # a heap of (total secs, shard)
+	for testId, secs in sorted(durations.items(), key=lambda item: (-item[1], item[0])):
+		total, shard = totals[0]
+		shards[shard].append(testId)
+		heapq.heapreplace(totals, (total+secs, shard))
+	return shards
+
+class JUnitShardSelector(object):
+	"""
+	This is a PySys runner plugin that executes only one shard of the selected tests, so that a test run can be
+	split across several CI nodes. The shards are balanced by the expected duration of each test from the
+	``junitDurationHistoryFile`` (see `pysysjava.junitschedule`) rather than by the number of tests.
+
+	To enable this plugin, add it to your project configuration::
+
+		<runner-plugin classname="pysysjava.junitschedule.JUnitShardSelector" alias="junitShardSelector"/>
+
+	and then run shard ``k`` of ``n`` (numbered from 1) using ``pysys run -XjunitShard=k/n``, with the same
+	test selection arguments and history file on every node. If ``-XjunitShard`` is not specified, all tests are
+	executed as usual.
+
+	Tests that are not in the history (including non-JUnit tests) are assumed to take the average duration of the
+	tests that are (or 1 second if none are).
+	"""
+
+	def setup(self, runner):
+		self.runner = runner
+		self.selectedTests = None
+		"""The list of ids of the tests in this shard, or None if sharding was not performed. """
+
+		shard = runner.getXArg('junitShard', '')
+		if not shard: return
+		try:
+			shardIndex, shardCount = [int(x) for x in shard.split('/')]
+		except ValueError:
+			shardIndex = shardCount = 0
+		if not 1 <= shardIndex <= shardCount:
+			raise Exception('Invalid -XjunitShard value "%s"; expected k/n where 1 <= k <= n'%shard)
+
+		history = JUnitDurationHistory.getInstance(runner)
+		durations = {d.id: history.getDuration(d.id) if history is not None else None for d in runner.descriptors}
+		known = [secs for secs in durations.values() if secs is not None]
+		default = sum(known)/len(known) if known else 1.0
+		durations = {t: default if secs is None else secs for t, secs in durations.items()}
+
+		shards = assignShards(durations, shardCount)
+		self.selectedTests = shards[shardIndex-1]
+		selected = set(self.selectedTests)
+		total = len(runner.descriptors)
+		runner.descriptors[:] = [d for d in runner.descriptors if d.id in selected]
+		log.info('JUnit sharding is executing %d of %d tests in shard %d/%d (%0.1f of %0.1f expected secs); %d of the tests are not in the duration history',
+			len(runner.descriptors), total, shardIndex, shardCount, sum(durations[t] for t in selected), sum(durations.values()),
+			len(durations)-len(known))
@@ -0,0 +1,309 @@
+"""
+A fast scan of JUnit ``.java`` source files for test annotations, which allows
+`pysysjava.junittest.JUnitDescriptorLoader` to skip classes that have a test-like name but contain no tests, without
+compiling them.
+
+The scan is enabled using the ``junitSkipClassesWithoutTests`` user-data. It is also used to find the test methods of
+each class when using ``junitTestDescriptorForEach=method``.
+"""
+
+import os
+import re
+import json
+import mmap
+import hashlib
+import logging
+import uuid
+
+from pysys.utils.fileutils import mkdir, toLongPathSafe
+
+log = logging.getLogger('pysys.pysysjava.junitsourcescan')
+
+TEST_ANNOTATIONS_REGEX = re.compile(rb'@\s*(?:[\w$]+\s*\.\s*)*(?:Test|ParameterizedTest|RepeatedTest|TestFactory|TestTemplate|RunWith|Suite|SelectClasses|SelectPackages)\b')
+"""
+A regular expression that matches the JUnit 4 and 5 annotations identifying a class that contains tests (or a suite
+of tests), including fully qualified names such as ``@org.junit.Test``.
+"""
+
+_TEST_METHOD_ANNOTATIONS = [b'Test', b'ParameterizedTest', b'RepeatedTest', b'TestFactory', b'TestTemplate']
+_TEST_TOKENS_REGEX = re.compile(rb'[{}]|@\s*(?:[\w$]+\s*\.\s*)*(Test|ParameterizedTest|RepeatedTest|TestFactory|TestTemplate|RunWith|Suite|SelectClasses|SelectPackages)\b')
+_ANNOTATION_REGEX = re.compile(rb'\s*@\s*(?:[\w$]+\s*\.\s*)*[\w$]+')
+_METHOD_NAME_REGEX = re.compile(rb'[\w$\s<>\[\],.?&]*?\b([\w$]+)\s*(?=\()')
+_WHITESPACE_REGEX = re.compile(rb'\s*')
+_PARENTHESES_REGEX = re.compile(rb'[()]')
+_IMPORT_REGEX = re.compile(rb'^\s*import\s+([\w.]+\.([\w$]+))\s*;', flags=re.MULTILINE)
+_COMMENTS_AND_STRINGS_REGEX = re.compile(rb'/\*.*?\*/|//[^\n]*|("(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])+\')', flags=re.DOTALL)
+_PRIMITIVE_TYPES = {'boolean', 'byte', 'char', 'short', 'int', 'long', 'float', 'double'}
+_JAVA_LANG_TYPES = {'Boolean', 'Byte', 'Character', 'CharSequence', 'Class', 'Double', 'Enum', 'Float', 'Integer', 'Iterable', 
+	'Long', 'Number', 'Object', 'Runnable', 'Short', 'String', 'StringBuilder', 'Thread', 'Void'}
+_COMMENTS_REGEX = re.compile(rb'/\*.*?\*/|//[^\n]*', flags=re.DOTALL)
+_GENERICS_REGEX = re.compile(rb'<[^<>]*>')
+_PACKAGE_REGEX = re.compile(rb'^\s*package\s+([\w.]+)\s*;', flags=re.MULTILINE)
+
+class JavaSourceInfo(object):
+	"""
+	The results of scanning a ``.java`` file.
+
+	:ivar bool hasTestAnnotations: True if the file contains any of the `TEST_ANNOTATIONS_REGEX` annotations.
+	:ivar bool isAbstract: True if the class named after the file is abstract, an interface or an annotation, and 
+		therefore is not executed directly by JUnit.
+	:ivar list[str] supertypes: The names of the superclass and interfaces of the class named after the file, as
+		written in the source file (i.e. simple or qualified names).
+	:ivar str package: The package name, or an empty string for the default package.
+	:ivar list[str] testMethods: The test methods declared in the class named after the file (see `findTestMethods`), 
+		or None if they could not be identified or the file has no test annotations.
+	"""
+	def __init__(self, hasTestAnnotations, isAbstract, supertypes, package, testMethods=None):
+		self.hasTestAnnotations, self.isAbstract, self.supertypes, self.package = hasTestAnnotations, isAbstract, supertypes, package
+		self.testMethods = testMethods
+
+	def toJSON(self):
+		return [self.hasTestAnnotations, self.isAbstract, self.supertypes, self.package, self.testMethods]
+
+	@staticmethod
+	def fromJSON(data):
+		return JavaSourceInfo(*data)
+
+def scanJavaSource(contents, className):
+	"""
+	Scan the contents of a ``.java`` file.
+
+	:param bytes contents: The file contents (or a memory-mapped view of the file).
+	:param str className: The simple name of the class named after the file.
+	:return JavaSourceInfo: The results.
+	"""
+	hasTestAnnotations = TEST_ANNOTATIONS_REGEX.search(contents) is not None
+	if not hasTestAnnotations and all(contents.find(word) == -1 for word in [b'extends', b'implements', b'abstract', b'interface']):
+		# fast path for the common case of a class with no tests and no supertypes (using find since mmap has no "in")
+		package = _PACKAGE_REGEX.search(contents)
+		return JavaSourceInfo(False, False, [], package.group(1).decode('ascii', errors='replace') if package else '')
+
+	# comments are removed only when detailed parsing is needed
+	source = _COMMENTS_REGEX.sub(b' ', bytes(contents))
+	if hasTestAnnotations: hasTestAnnotations = TEST_ANNOTATIONS_REGEX.search(source) is not None
+	package = _PACKAGE_REGEX.search(source)
+	isAbstract, supertypes = False, []
+	m = re.search(rb'(@\s*)?\b(class|interface|enum|record)\s+%s\b([^{;]*)[{]'%re.escape(className.encode('utf-8')), source)
+	if m is not None:
+		# the modifiers are the words since the end of the previous declaration or import
+		modifiers = re.split(rb'[;{}]', source[:m.start()])[-1].split()
+		isAbstract = m.group(1) is not None or m.group(2) == b'interface' or b'abstract' in modifiers
+		header = m.group(3)
+		while True: # remove generic type parameters, innermost first
+			header, count = _GENERICS_REGEX.subn(b' ', header)
+			if count == 0: break
+		for clause in re.findall(rb'\b(?:extends|implements)\s+([\w.$\s,]+?)(?=\bimplements\b|\bpermits\b|$)', header.strip()):
+			supertypes.extend(s.strip().decode('utf-8', errors='replace') for s in clause.split(b',') if s.strip())
+		supertypes = [re.sub(r'\s+', '', s) for s in supertypes]
+	return JavaSourceInfo(hasTestAnnotations, isAbstract, supertypes, package.group(1).decode('ascii', errors='replace') if package else '', 
+		findTestMethods(contents, className) if hasTestAnnotations else None)
+
+def _skipParentheses(source, pos):
+	# If there is a parenthesized list at pos (after optional whitespace), returns the position after it
+	start = _WHITESPACE_REGEX.match(source, pos).end()
+	if source[start:start+1] != b'(': return pos
+	depth = 0
+	for m in _PARENTHESES_REGEX.finditer(source, start):
+		depth += 1 if m.group(0) == b'(' else -1
+		if depth == 0: return m.end()
+	return len(source)
+
+def _getParameterTypes(params, imports):
+	# Returns a list of the fully qualified parameter types in the format used by the JUnit method selector, or None 
+	# if any type cannot be resolved
+	params = re.sub(rb'@\s*[\w$.]+\s*(\([^()]*\))?', b' ', params)
+	while True: # erase generic types, innermost first
+		params, count = _GENERICS_REGEX.subn(b' ', params)
+		if count == 0: break
+	types = []
+	for param in params.decode('utf-8', errors='replace').split(','):
+		tokens = [t for t in param.replace('...', '[] ').replace('[', ' [').split() if t != 'final']
+		if not param.strip(): continue
+		name = next((i for i, t in enumerate(tokens) if i > 0 and not t.startswith('[')), None)
+		if name is None: return None
+		basetype, dimensions = tokens[0], ''.join(t for t in tokens if t.startswith('['))
+		if basetype not in _PRIMITIVE_TYPES and '.' not in basetype:
+			if basetype in imports: basetype = imports[basetype]
+			elif basetype in _JAVA_LANG_TYPES: basetype = 'java.lang.'+basetype
+			else: return None # e.g. from a wildcard import or the same package
+		types.append(basetype+dimensions)
+	return types
+
+def findTestMethods(contents, className):
+	"""
+	Find the names of the test methods declared directly in the specified class, in a format suitable for the JUnit 
+	console launcher's ``--select-method`` argument (after the class name and ``#``). 
+	
+	Methods with parameters (such as parameterized tests) include the fully qualified parameter types, which are 
+	resolved using the imports of the file. 
+
+	Since the source is not fully parsed, None is returned whenever the test methods cannot be reliably identified 
+	this way: for example if the class is a suite, or contains nested classes with tests, or a test method is 
+	overloaded or has a parameter type that cannot be resolved. 
+
+	:param bytes contents: The file contents.
+	:param str className: The simple name of the class named after the file.
+	:return list[str]: The test method selectors in the order they are declared, or None.
+	"""
+	source = _COMMENTS_AND_STRINGS_REGEX.sub(lambda m: b'""' if m.group(1) else b' ', bytes(contents))
+	header = re.search(rb'\b(?:class|enum|record)\s+%s\b[^{;]*[{]'%re.escape(className.encode('utf-8')), source)
+	if header is None: return None
+	classAnnotations = source[source.rfind(b';', 0, header.start())+1:header.start()]
+	if TEST_ANNOTATIONS_REGEX.search(classAnnotations): return None # suites and custom runners are treated as a unit
+
+	imports = {m.group(2).decode('utf-8', errors='replace'): m.group(1).decode('utf-8', errors='replace') 
+		for m in _IMPORT_REGEX.finditer(source[:header.start()])}
+	methods, names = [], set()
+	depth = 1
+	for m in _TEST_TOKENS_REGEX.finditer(source, header.end()):
+		token = m.group(0)
+		if token == b'{': depth += 1
+		elif token == b'}':
+			depth -= 1
+			if depth == 0: break # end of the class
+		elif depth != 1 or m.group(1) not in _TEST_METHOD_ANNOTATIONS: 
+			return None
+		else:
+			pos = _skipParentheses(source, m.end())
+			while True: # skip any other annotations
+				other = _ANNOTATION_REGEX.match(source, pos)
+				if other is None: break
+				pos = _skipParentheses(source, other.end())
+			declaration = _METHOD_NAME_REGEX.match(source, pos)
+			if declaration is None: return None
+			name = declaration.group(1).decode('utf-8', errors='replace')
+			if name in names: return None # overloaded
+			names.add(name)
+			paramsEnd = _skipParentheses(source, declaration.end())
+			types = _getParameterTypes(source[declaration.end()+1:paramsEnd-1], imports)
+			if types is None: return None
+			methods.append('%s(%s)'%(name, ','.join(types)) if types else name)
+	return methods
+
+class JUnitTestClassFinder(object):
+	"""
+	Identifies which of a set of JUnit source files contain tests that JUnit would execute, based on a scan of each
+	file for test annotations.
+
+	A class is considered to contain tests if it is not abstract (or an interface), and either it has test annotations,
+	or one of its supertypes does (directly or indirectly). Since only the source files passed to this class are
+	scanned, a class with a supertype that cannot be found among them (for example a JUnit 3 ``TestCase`` subclass, or
+	a base class from a library) is assumed to contain tests. The scan does not fully parse the Java source (for example 
+	annotations inside string literals are not ignored), so it may report that a class contains tests when it does not, 
+	but not the reverse.
+
+	The files are read using memory-mapping, and the results for each file are cached by a hash of its contents. If a
+	cache file is specified, the cache is loaded from and saved to that file so that unchanged files do not need to be
+	scanned again in future (files with the same size and modification time are not even hashed).
+
+	:param str cacheFile: The path of a JSON file in which to cache scan results, or None.
+	"""
+
+	FORMAT_VERSION = 2
+	"""Incremented whenever the cache file format or the scanning logic changes. """
+
+	def __init__(self, cacheFile=None):
+		self.cacheFile = cacheFile
+		self.__byHash = {} # sha1 -> JavaSourceInfo
+		self.__byStat = {} # path -> [size, mtime_ns, sha1]
+		self.__used = set() # paths looked up by this instance; other entries are discarded when saving
+		self.__changed = False
+		self.scannedFiles = 0
+		"""The number of files that were scanned (rather than loaded from the cache). """
+
+		if cacheFile and os.path.exists(toLongPathSafe(cacheFile)):
+			try:
+				with open(toLongPathSafe(cacheFile), 'r', encoding='utf-8') as f:
+					data = json.load(f)
+				if data.get('formatVersion') == self.FORMAT_VERSION:
+					self.__byHash = {h: JavaSourceInfo.fromJSON(info) for h, info in data['hashes'].items()}
+					self.__byStat = data['files']
+			except Exception as ex:
+				log.warning('Ignoring invalid JUnit source scan cache file %s: %s', cacheFile, ex)
+
+	def getSourceInfo(self, path, className):
+		"""
+		Get the scan results for the specified file, from the cache if possible.
+
+		:param str path: The path of the ``.java`` file.
+		:param str className: The simple name of the class named after the file.
+		:return JavaSourceInfo: The results.
+		"""
+		st = os.stat(toLongPathSafe(path))
+		cached = self.__byStat.get(path)
+		if cached is not None and cached[0] == st.st_size and cached[1] == st.st_mtime_ns and cached[2] in self.__byHash:
+			self.__used.add(path)
+			return self.__byHash[cached[2]]
+
+		with open(toLongPathSafe(path), 'rb') as f:
+			if st.st_size == 0: # cannot memory-map an empty file
+				contents = b''
+			else:
+				contents = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+			try:
+				# include the class name in the hash since it affects the results
+				sha = hashlib.sha1(className.encode('utf-8')+b'\0')
+				sha.update(contents)
+				sha = sha.hexdigest()
+				info = self.__byHash.get(sha)
+				if info is None:
+					info = self.__byHash[sha] = scanJavaSource(contents, className)
+					self.scannedFiles += 1
+			finally:
+				if st.st_size != 0: contents.close()
+		self.__byStat[path] = [st.st_size, st.st_mtime_ns, sha]
+		self.__used.add(path)
+		self.__changed = True
+		return info
+
+	def findTestClasses(self, javafiles, candidates):
+		"""
+		Identify the classes that contain tests.
+
+		:param dict[str,str] javafiles: A dictionary of the fully qualified class names and paths of all the ``.java`` 
+			files in the source tree, which are used to find the supertypes of the candidate classes. Only the 
+			candidates and their supertypes are scanned. 
+		:param list[str] candidates: The fully qualified names of the classes to check. 
+		:return set[str]: The names of the candidate classes that contain tests.
+		"""
+		infos = {}
+		def getInfo(classname):
+			if classname not in infos: infos[classname] = self.getSourceInfo(javafiles[classname], classname.split('.')[-1])
+			return infos[classname]
+		bySimpleName = {}
+		for classname in javafiles: bySimpleName.setdefault(classname.split('.')[-1], []).append(classname)
+
+		declaresTests = {} # classname -> bool, for the class or any of its supertypes
+		def hasTests(classname, visiting):
+			if classname in declaresTests: return declaresTests[classname]
+			if classname in visiting: return False # cyclic hierarchy (which would not compile anyway)
+			visiting.add(classname)
+			info = getInfo(classname)
+			result = info.hasTestAnnotations
+			for supertype in info.supertypes:
+				if result: break
+				matches = [c for c in bySimpleName.get(supertype.split('.')[-1], []) if ('.'+c).endswith('.'+supertype)]
+				if not matches:
+					result = supertype not in ['Object', 'java.lang.Object'] # unknown supertype might contain tests
+				else:
+					result = any(hasTests(c, visiting) for c in matches)
+			visiting.discard(classname)
+			declaresTests[classname] = result
+			return result
+
+		return {c for c in candidates if not getInfo(c).isAbstract and hasTests(c, set())}
+
+	def save(self):
+		"""
+		Save the cache file, if one was specified and there are new results.
+		"""
+		if not self.cacheFile or not self.__changed: return
+		mkdir(os.path.dirname(self.cacheFile))
+		tmp = '%s.%s.tmp'%(self.cacheFile, uuid.uuid4().hex) # unique name in case of concurrent PySys processes
+		files = {path: st for path, st in self.__byStat.items() if path in self.__used}
+		hashes = {st[2] for st in files.values()}
+		with open(toLongPathSafe(tmp), 'w', encoding='utf-8') as f:
+			json.dump({'formatVersion': self.FORMAT_VERSION, 'files': files,
+				'hashes': {h: info.toJSON() for h, info in self.__byHash.items() if h in hashes}}, f)
+		os.replace(toLongPathSafe(tmp), toLongPathSafe(self.cacheFile))
+		self.__changed = False
@@ -18,15 +18,27 @@ highlighting of actual vs expected comparison failure, to make it as easy as pos
 """
 
 import pysys
+import pysys.utils.safeeval
+import time
 import logging
+import hashlib
+import shutil
+import xml.etree.ElementTree as ET
 from pysys.constants import *
 from pysys.basetest import BaseTest
 from pysys.utils.fileutils import *
 from pysys.utils.logutils import BaseLogFormatter
 from pysys.config.descriptor import DescriptorLoader, TestDescriptor
 
-from pysysjava.junitxml import JUnitXMLParser
+import pysysjava
+from pysysjava.junitxml import JUnitXMLParser, parseJUnitXMLFiles, PARALLEL_PARSE_MIN_FILES
+from pysysjava.junitevents import JUnitEventStreamReader
 from pysysjava.javaplugin import JavaPlugin, walkDirTreeContents
+from pysysjava.chrometrace import traceSpan
+from pysysjava.junitdescriptorcache import JavaSourceTreeCache
+from pysysjava.junitsourcescan import JUnitTestClassFinder
+from pysysjava.junitschedule import JUnitDurationHistory
+from pysysjava._sharedtasks import SharedTaskCoordinator, SharedTaskFailedException, SharedTaskTimedOutException, getSharedProcessPool
 
 class JUnitTest(BaseTest):
 	"""
@@ -44,9 +56,17 @@ class JUnitTest(BaseTest):
 		</data>
 
 	
-	Compilation happens in `pysys.basetest.BaseTest.setup` (shared across all JUnit tests that use the same source 
-	directory), then execution in `pysys.basetest.BaseTest.execute` and finally reads the resulting XML reports and 
-	adds outcomes for each testcase in `pysys.basetest.BaseTest.validate`. 
+	Compilation happens in `pysys.basetest.BaseTest.setup`, then execution in `pysys.basetest.BaseTest.execute` and 
+	finally reads the resulting XML reports and adds outcomes for each testcase in `pysys.basetest.BaseTest.validate`. 
+	
+	When many tests use the same source directory (for example when created by `JUnitDescriptorLoader`), set 
+	`junitShareCompiledClasses` to compile the classes only once per test run. 
+	
+	To avoid starting a new JVM for each test, the tests can be executed in pre-started JVMs by configuring a 
+	`pysysjava.junitworkerpool.JUnitWorkerPool`. 
+	
+	Alternatively, set `junitStreamResults` to record the outcome of each testcase as soon as it completes rather 
+	than waiting for the XML reports at the end. 
 	
 	There are 3 options for customizing the arguments that will be passed to the JUnit console launcher:
 	
@@ -118,6 +138,58 @@ class JUnitTest(BaseTest):
 	The time allowed in total for execution of all JUnit tests. 
 	"""
 
+	junitBatch = ''
+	"""
+	Identifies the batch this test belongs to, when using ``junitTestDescriptorForEach=batch`` or ``method`` (see 
+	`JUnitDescriptorLoader`). All the tests in the same batch that are selected for the current test run are executed 
+	in a single JUnit process, started by whichever test in the batch executes first (usually the batch leader, 
+	which is scheduled ahead of the other tests), and each test then adds outcomes for only the testcases from its 
+	own class (or method). The other tests wait for the batch to complete for up to ``junitTimeoutSecs`` plus 
+	the ``WaitForProcess`` timeout, and are TIMEDOUT if it does not complete by then, or BLOCKED if it failed. 
+	
+	After the batch has executed, each test writes the XML reports for just its own testcases to the ``junit-reports`` 
+	directory of its own output directory, along with a copy of the ``junit.out``/``junit.err`` output of the whole 
+	batch, so that failures can be triaged per test. 
+	
+	This is set automatically by the descriptor loader. 
+	"""
+
+	junitStreamResults = False
+	"""
+	Set this to True to record the outcome of each JUnit testcase while the tests are still executing, using a 
+	JUnit Platform listener that writes an event for each testcase to ``junit-events.ndjson`` in the test output 
+	directory. This means results are logged as soon as they are available, and if the JUnit process times out the 
+	testcases that completed before the timeout still get their outcomes (and any testcase that was still executing 
+	is reported as timed out). 
+	
+	This can be set in the descriptor ``user-data``, or on the command line with ``-XjunitStreamResults``. It is 
+	ignored when using ``junitTestDescriptorForEach=batch``, and tests using this option always start a new JVM 
+	rather than using the `pysysjava.junitworkerpool.JUnitWorkerPool`. 
+	"""
+
+	junitShareCompiledClasses = False
+	"""
+	Set this to True to compile the test classes only once per test run when many tests use the same source directory 
+	(for example when created by `JUnitDescriptorLoader`). The first test that needs a given combination of source 
+	directory, classpath and compiler arguments compiles the classes into a shared directory under the runner's output 
+	directory, and all other tests (including those running concurrently, which wait for the compilation to complete) 
+	reuse the same classes rather than compiling them into their own output directory. The number of compilations 
+	and the time saved are included in the summary at the end of the test run. 
+	
+	This can be set as a project property, in the descriptor ``user-data``, or on the command line with 
+	``-XjunitShareCompiledClasses=true``. 
+	"""
+
+	junitReportParseProcesses = 0
+	"""
+	The maximum number of processes used to parse the JUnit XML reports when there are many report files (for 
+	example the per-class files generated by Ant), or 1 to always parse them in the test's own process. The default 
+	of 0 means the number of CPUs. 
+	
+	Processes are only used if there are at least `pysysjava.junitxml.PARALLEL_PARSE_MIN_FILES` files, and the same 
+	pool of processes is shared by all tests in the test run. 
+	"""
+
 	# Undocumented properties that could be overridden by a subclass if needed
 	javaclassesDir = 'javaclasses'
 	junitReportsDir = 'junit-reports'
@@ -135,24 +207,223 @@ class JUnitTest(BaseTest):
 		if not self.junitFrameworkClasspath or not os.path.exists(self.junitFrameworkClasspath[0]):
 			raise Exception('The junitFrameworkClasspath project (or descriptor) property must be set to a valid list of jars containing the JUnit framework and launcher: %s'%self.junitFrameworkClasspath)
 		
-		# TODO: only compile if no test has already compiled them
+		if not self.junitShareCompiledClasses:
+			self.junitShareCompiledClasses = self.project.getProperty('junitShareCompiledClasses', False)
+		self.testClassesDir = os.path.join(self.output, self.javaclassesDir)
 		self.compileTestClasses()
 
 	def execute(self):
-		self.java.startJava(**self.getJUnitKwArgs()) 
+		if self.junitBatch:
+			self.executeJUnitBatch()
+		elif self.junitStreamResults:
+			self.executeJUnitStreaming()
+		else:
+			self.startJUnit(**self.getJUnitKwArgs()) 
 
 	def validate(self):
-		self.validateJUnitReports(os.path.join(self.output, self.junitReportsDir))
+		if self.junitBatch:
+			self.validateJUnitReports(os.path.join(self.output, self.junitReportsDir))
+		elif self.junitStreamResults:
+			self._logJUnitSummary(self.junitStreamedOutcomeCounts, self.junitStreamedLastTestcase)
+		else:
+			self.validateJUnitReports(os.path.join(self.output, self.junitReportsDir))
+		
+		history = JUnitDurationHistory.getInstance(self.runner)
+		if history is not None and getattr(self, 'junitTestcaseDurationSecs', None) is not None:
+			history.record(self.descriptor.id, self.junitTestcaseDurationSecs)
 
 	# The methods above override the standard test class; following are where they are implemented
 
 	def compileTestClasses(self):
-		self.java.compile(input=self.input, classpath=self.java.defaultClasspath+self.junitFrameworkClasspath, output=self.javaclassesDir)
+		if not self.junitShareCompiledClasses:
+			self.java.compile(input=self.input, classpath=self.java.defaultClasspath+self.junitFrameworkClasspath, output=self.javaclassesDir)
+			return
+		
+		# Compile once per runner and share the result with all other tests that need the same classes
+		classpath = self.java.defaultClasspath+self.junitFrameworkClasspath
+		arguments = self.java._splitShellArgs(self.java.defaultCompilerArgs)
+		key = (os.path.normpath(self.input), tuple(classpath), tuple(arguments))
+		
+		self.testClassesDir = os.path.join(self.runner.output, 'junit-shared-'+self.javaclassesDir, '%s.%s'%(
+			os.path.basename(os.path.dirname(os.path.normpath(self.input))), hashlib.sha256(repr(key).encode('utf-8')).hexdigest()[:12]))
+		
+		def compile():
+			if os.path.exists(self.testClassesDir): deletedir(self.testClassesDir) # in case it contains stale classes from a previous run
+			self.java.compile(input=self.input, classpath=classpath, arguments=arguments, output=self.testClassesDir)
+
+		# runner cleanup happens just after the results summary is written, so log this alongside it (and at the same 
+		# level, so it's visible even when INFO messages are not)
+		coordinator = SharedTaskCoordinator.getInstance(self.runner, 'junitCompilation', 
+			lambda coordinator: logging.getLogger('pysys.resultssummary').critical(
+				'Compilation of JUnit test classes was shared by %d tests, requiring %d compilation(s) and saving approximately %0.1f seconds', 
+				coordinator.executions+coordinator.reuses, coordinator.executions, coordinator.savedSecs) if coordinator.executions else None)
+		try:
+			compiledBy = coordinator.runOnce(key, compile, owner=str(self))
+		except SharedTaskFailedException as ex:
+			self.abort(BLOCKED, 'Failed to compile JUnit test classes (see %s for details): %s'%(ex.owner, ex))
+		if compiledBy != str(self):
+			self.log.info('Using test classes compiled by %s in: %s', compiledBy, self.testClassesDir)
 	
-	def getJUnitKwArgs(self):
+	def executeJUnitBatch(self):
+		# Run all tests in this batch that are part of the current test run in a single JUnit process, which is 
+		# executed by whichever test gets here first (usually the batch's leader, which the descriptor loader 
+		# schedules ahead of the other tests); the others wait (for a bounded time) and then split out their results
+		members = sorted([d for d in self.runner.descriptors if d.userData.get('junitBatch') == self.junitBatch 
+			and d.mode == self.descriptor.mode], key=lambda d: d.id)
+		if self.descriptor.id not in [d.id for d in members]: members.append(self.descriptor)
+		unit = 'method' if getattr(self, 'junitTestDescriptorForEach', None) == 'method' else 'class'
+		
+		batchDir = os.path.join(self.runner.output, 'junit-batches', self.junitBatch
+			+('~'+self.descriptor.mode if self.descriptor.mode else '')
+			+('.cycle%03d'%self.testCycle if self.testCycle else ''))
+		self.junitBatchReportsDir = os.path.join(batchDir, self.junitReportsDir)
+		
+		def execute():
+			if os.path.exists(batchDir): deletedir(batchDir) # in case it contains reports from a previous run
+			mkdir(batchDir)
+			selectionArgs = []
+			for d in members: selectionArgs.extend(self.java._splitShellArgs(d.userData.get('junitSelectionArgs', '')))
+			
+			kwargs = self.getJUnitKwArgs(selectionArgs=selectionArgs, reportsDir=self.junitBatchReportsDir)
+			kwargs['stdouterr'] = os.path.join(batchDir, 'junit')
+			kwargs['displayName'] = 'JUnit batch %s (%d %s)'%(self.junitBatch, len(members), 'methods' if unit == 'method' else 'classes')
+			self.startJUnit(**kwargs)
+
+		coordinator = SharedTaskCoordinator.getInstance(self.runner, 'junitBatch', 
+			lambda coordinator: log.info('JUnit batch mode executed %d test %s using %d JUnit processes', 
+				coordinator.executions+coordinator.reuses, unit+'es' if unit == 'class' else unit+'s', coordinator.executions) if coordinator.executions else None)
+		# the timeout is a safety net in case the test executing the batch never completes it; allow extra time beyond 
+		# the JUnit timeout for starting the process (or waiting for a worker) and stopping it
+		timeout = float(self.junitTimeoutSecs)+TIMEOUTS['WaitForProcess']
+		try:
+			executedBy = coordinator.runOnce(batchDir, execute, owner=str(self), timeout=timeout)
+		except SharedTaskTimedOutException as ex:
+			self.abort(TIMEDOUT, 'Timed out after %d secs waiting for %s to execute JUnit batch %s'%(timeout, ex.owner, self.junitBatch))
+		except SharedTaskFailedException as ex:
+			self.abort(BLOCKED, 'Failed to execute JUnit batch (see %s for details): %s'%(ex.owner, ex))
+		if executedBy != str(self):
+			self.log.info('JUnit tests for this %s were executed by %s in batch: %s', unit, executedBy, batchDir)
+		
+		self.splitJUnitBatchOutput(batchDir, 
+			classnames=self._getSelectedClasses(self.java._splitShellArgs(self.junitSelectionArgs), includeMethods=True))
+
+	def splitJUnitBatchOutput(self, batchDir, classnames):
+		# Copies the parts of the batch output that belong to this test into its own output directory, so it looks 
+		# (almost) the same as if the test had been executed by itself
+		reportsDir = os.path.join(self.output, self.junitReportsDir)
+		mkdir(reportsDir)
+		isSelected = self._getTestcaseSelector(classnames)
+		if os.path.isdir(toLongPathSafe(self.junitBatchReportsDir)):
+			for f in sorted(os.listdir(toLongPathSafe(self.junitBatchReportsDir))):
+				if not f.endswith('.xml'): continue
+				tree = ET.parse(toLongPathSafe(os.path.join(self.junitBatchReportsDir, f)))
+				suite = tree.getroot()
+				for t in suite.findall('testcase'):
+					if not isSelected(t.get('classname', ''), t.get('name', '')): suite.remove(t)
+				tests = suite.findall('testcase')
+				if not tests: continue
+				suite.set('tests', str(len(tests)))
+				for outcome, attr in [('failure', 'failures'), ('error', 'errors'), ('skipped', 'skipped')]:
+					if attr in suite.attrib: suite.set(attr, str(sum(1 for t in tests if t.find(outcome) is not None)))
+				tree.write(toLongPathSafe(os.path.join(reportsDir, f)), encoding='utf-8', xml_declaration=True)
+		
+		for ext in ['out', 'err']:
+			path = os.path.join(batchDir, 'junit.'+ext)
+			if os.path.exists(toLongPathSafe(path)): 
+				shutil.copyfile(toLongPathSafe(path), toLongPathSafe(os.path.join(self.output, 'junit.'+ext)))
+
+	def executeJUnitStreaming(self):
+		# Execute JUnit in the background with a listener that writes an event as each testcase completes, and 
+		# record the outcomes as we go
+		kwargs = self.getJUnitKwArgs()
+		listenerDir = self.compileJUnitEventListener()
+		kwargs['arguments'] = [a+os.pathsep+listenerDir if a.startswith('--classpath=') else a for a in kwargs['arguments']]
+		eventsFile = os.path.join(self.output, 'junit-events.ndjson')
+		kwargs['jvmProps'] = dict(kwargs.get('jvmProps', {}), **{'pysysjava.junitEventsFile': eventsFile})
+		timeout = kwargs.pop('timeout')
+		expectedExitStatus = kwargs.pop('expectedExitStatus')
+		onError = kwargs.pop('onError')
+		
+		self.addOutcome(PASSED) # if no failures, pass
+		self.junitStreamedOutcomeCounts = outcomeCounts = {PASSED: 0, SKIPPED: 0, FAILED: 0, BLOCKED: 0, TIMEDOUT: 0}
+		self.junitStreamedLastTestcase = {}
+		
+		reader = JUnitEventStreamReader(eventsFile)
+		def recordTestcases(testcases):
+			for t in testcases:
+				outcomeCounts[self.validateJUnitTestcaseResult(t)] += 1
+				self.junitStreamedLastTestcase = t
+		
+		process = self.java.startJava(background=True, **kwargs)
+		endTime = time.monotonic()+timeout
+		while True:
+			running = process.running()
+			recordTestcases(reader.readTestcases()) # must read again after the process has terminated
+			if not running: break
+			if time.monotonic() > endTime:
+				process.stop()
+				recordTestcases(reader.readTestcases())
+				recordTestcases(dict(t, outcome='error', outcomeType='Timeout', outcomeReason='Testcase was still executing when the JUnit process timed out after %d secs'%timeout)
+					for t in reader.getIncompleteTestcases())
+				self.addOutcome(TIMEDOUT, 'JUnit process timed out after %d secs'%timeout, abortOnError=False)
+				return
+			self.pollWait(0.1)
+
+		if not pysys.utils.safeeval.safeEval('%d %s'%(process.exitStatus, expectedExitStatus), extraNamespace={'self':self}):
+			try:
+				reason = onError(process)
+			except Exception: # e.g. no stderr
+				reason = None
+			self.addOutcome(BLOCKED, '%s returned exit code %d (expected %s)%s'%(process, process.exitStatus, expectedExitStatus, 
+				(': '+reason) if reason else ''), abortOnError=False)
+
+	def compileJUnitEventListener(self):
+		# Compile the listener used by junitStreamResults once per runner for each JUnit framework classpath
+		outputDir = os.path.join(self.runner.output, 'pysysjava-junit-listener', 
+			hashlib.sha256(repr(self.junitFrameworkClasspath).encode('utf-8')).hexdigest()[:12])
+		javaDir = os.path.join(os.path.dirname(pysysjava.__file__), 'java') # not __file__ since PySys may load this module from a path
+		
+		def compile():
+			self.java.compile(os.path.join(javaDir, 'pysysjava', 'internal', 'JUnitEventListener.java'), output=outputDir, 
+				classpath=self.junitFrameworkClasspath, arguments=[], stdouterr=outputDir+'-javac')
+			self.copy(os.path.join(javaDir, 'META-INF'), os.path.join(outputDir, 'META-INF'))
+
+		try:
+			SharedTaskCoordinator.getInstance(self.runner, 'junitListenerCompilation').runOnce(outputDir, compile, owner=str(self))
+		except SharedTaskFailedException as ex:
+			self.abort(BLOCKED, 'Failed to compile JUnit event listener (see %s for details): %s'%(ex.owner, ex))
+		return outputDir
+
+	def startJUnit(self, **kwargs):
+		"""
+		Start the JUnit console launcher using the specified `getJUnitKwArgs`, either in a new JVM or (if the 
+		project has a `pysysjava.junitworkerpool.JUnitWorkerPool` runner plugin with alias ``junitWorkerPool``) in 
+		a pre-started worker JVM. 
+		
+		:return: The process object.
+		"""
+		pool = getattr(self.runner, 'junitWorkerPool', None)
+		if pool is not None and pool.isAvailable(self):
+			return pool.startJUnit(self, **kwargs)
+		return self.java.startJava(**kwargs)
+
+	@staticmethod
+	def _getSelectedClasses(selectionArgs, includeMethods=False):
+		# If includeMethods, selected methods are also returned, as "classname#method(params)"
+		classes = []
+		options = ['--select-class', '-c']+(['--select-method', '-m'] if includeMethods else [])
+		for i, a in enumerate(selectionArgs):
+			if a in options and i+1 < len(selectionArgs): 
+				classes.append(selectionArgs[i+1])
+			elif '=' in a and a.split('=', 1)[0] in options and a.startswith('--'): 
+				classes.append(a.split('=', 1)[1])
+		return classes
+
+	def getJUnitKwArgs(self, selectionArgs=None, reportsDir=None):
 		# This is a flexible way to defining the arguments that allows a subclass to make changes if needed
+		# (the optional parameters are used when executing several tests in one batch)
 	
-		testClasses = os.path.join(self.output, self.javaclassesDir)
+		testClasses = self.testClassesDir
 		if not os.listdir(testClasses):
 			raise Exception('No classes were found after compiling "%s"'%self.input)
 		classpath = self.java.toClasspathList(self.java.defaultClasspath)+[testClasses]
@@ -169,7 +440,7 @@ class JUnitTest(BaseTest):
 		]
 		args.extend(self.java._splitShellArgs(self.junitConfigArgs))
 		
-		selectionArgs = self.java._splitShellArgs(self.junitSelectionArgs)
+		if selectionArgs is None: selectionArgs = self.java._splitShellArgs(self.junitSelectionArgs)
 		if len(selectionArgs)==0: # If not overridden in the descriptor, use default of "everything"
 			# We want to run all the test classes under this directory; the -d option doesn't seem to work so use the 
 			# package option to achieve the same thing. This should be more efficient than scanning the entire 
@@ -192,7 +463,7 @@ class JUnitTest(BaseTest):
 			self.log.info('Running with additional JUnit args: \n%s', '\n'.join("    arg #%-2d    : %s"%(
 				i+1, a) for i, a in enumerate(customArgs)))
 		
-		args = ['--reports-dir', os.path.join(self.output, self.junitReportsDir), 
+		args = ['--reports-dir', reportsDir or os.path.join(self.output, self.junitReportsDir), 
 			'--disable-ansi-colors',
 			'--classpath=%s'%os.pathsep.join(classpath),
 			]+args
@@ -218,24 +489,30 @@ class JUnitTest(BaseTest):
 				}
 		return kwargs
 		
-	def validateJUnitReports(self, reportsDir):
-		outcomeCounts = {
-			PASSED: 0,
-			SKIPPED: 0,
-			FAILED: 0,
-			BLOCKED: 0,
-			TIMEDOUT: 0,
-		}
+	def validateJUnitReports(self, reportsDir, classnames=None):
+		# If classnames is specified, only testcases from those classes (or their nested classes) are included; 
+		# "classname#method" items select only the testcases for that method (including any parameterized invocations)
+		with traceSpan(self, 'validateJUnitReports', 'junit', reportsDir=reportsDir):
+			if classnames is not None: isSelected = self._getTestcaseSelector(classnames)
+			outcomeCounts = {
+				PASSED: 0,
+				SKIPPED: 0,
+				FAILED: 0,
+				BLOCKED: 0,
+				TIMEDOUT: 0,
+			}
 		
-		t = {} # just in case no tests were found at all
+			t = {} # just in case no tests were found at all
 		
-		self.addOutcome(PASSED) # if no failures, pass	
+			self.addOutcome(PASSED) # if no failures, pass	
 	
-		logSeparator = False
-		alreadyseen = set() # JUnit 5 doesn't do this, but Ant can sometimes generate duplicates for nested test classes
-		for f in sorted(os.listdir(toLongPathSafe(reportsDir))):
-			if f.endswith('.xml'):
-				suite, tests = JUnitXMLParser(toLongPathSafe(reportsDir+'/'+f)).parse()
+			logSeparator = False
+			alreadyseen = set() # JUnit 5 doesn't do this, but Ant can sometimes generate duplicates for nested test classes
+			for path, suite, tests in self.parseJUnitReports(reportsDir):
+				f = os.path.basename(path)
+				if classnames is not None:
+					tests = [t for t in tests if isSelected(t['classname'], t['name'])]
+					suite = dict(suite, tests=len(tests), skipped=0)
 				if suite['tests']+suite.get('skipped',0) == 0:
 					self.log.debug('Ignoring suite "%s" which contains no tests', suite['name'])
 					continue
@@ -244,24 +521,47 @@ class JUnitTest(BaseTest):
 					self.log.info('')
 					self.log.info('~'*63)
 				logSeparator = True
-					
+				
 				self.log.info('Results for %d testcases from suite "%s":', suite['tests'], suite['name'])
 				self.log.info('')
-				
+			
 				for t in tests:
 					key = t['classname']+'.'+t['name']
 					if key in alreadyseen:
 						self.log.info('Ignoring duplicate results for %s', key)
 						continue
 					alreadyseen.add(key)
-					
+				
 					outcome = self.validateJUnitTestcaseResult(t)
 					outcomeCounts[outcome] += 1
-				
+			
 				# some JUnit formats (but not JUnit5) provide stdout/err at the suite level rather than per test 
 				if suite.get('stdout') or suite.get('stderr'):
 					self.log.info('This testsuite produced some stdout/err, see it at: %s', f)
 
+			self._logJUnitSummary(outcomeCounts, t)
+	
+	@staticmethod
+	def _getTestcaseSelector(classnames):
+		# Returns a function(classname, name) that returns True for testcases from the specified classes (or their 
+		# nested classes); "classname#method" items select only the testcases for that method (including any 
+		# parameterized invocations)
+		methods = [c.split('#', 1) for c in classnames if '#' in c]
+		methods = [(c, m.split('(')[0]) for c, m in methods]
+		classnames = [c for c in classnames if '#' not in c]
+		return lambda classname, name: (any(classname == c or classname.startswith(c+'$') for c in classnames)
+			or any(classname == c and (name == m or name.startswith((m+'(', m+'['))) for c, m in methods))
+
+	def parseJUnitReports(self, reportsDir):
+		# Returns a list of (path, suite, testcases) for each .xml file, using other processes if there are lots of files
+		paths = [toLongPathSafe(reportsDir+'/'+f) for f in os.listdir(toLongPathSafe(reportsDir)) if f.endswith('.xml')]
+		processes = int(self.junitReportParseProcesses) or os.cpu_count() or 1
+		if processes == 1 or len(paths) < PARALLEL_PARSE_MIN_FILES: 
+			return parseJUnitXMLFiles(paths, processes=1)
+		return parseJUnitXMLFiles(paths, processes=processes, executor=getSharedProcessPool(self.runner, 'junitReportParse', processes))
+	
+	def _logJUnitSummary(self, outcomeCounts, t):
+		# t is the last testcase, whose reason is used if all were skipped
 		totalTestcases = sum(outcomeCounts.values())
 		self.log.info('~'*63)
 		if totalTestcases == 0:
@@ -286,6 +586,13 @@ class JUnitTest(BaseTest):
 		}.get(t['outcome'], BLOCKED)
 		if outcome in [BLOCKED,FAILED] and 'Timeout' in t.get('outcomeType',''): outcome = TIMEDOUT
 		
+		self.junitTestcaseDurationSecs = getattr(self, 'junitTestcaseDurationSecs', None) or 0.0
+		self.junitTestcaseDurationSecs += t['durationSecs']
+		
+		# A compact record of each result, for writers such as JUnitResultsStoreWriter
+		self.junitTestcaseResults = getattr(self, 'junitTestcaseResults', None) or []
+		self.junitTestcaseResults.append((t['classname'], t['name'], t['outcome'], t.get('outcomeType') or '', t['durationSecs']))
+
 		maintag = BaseLogFormatter.tag(str(outcome).lower())
 		self.log.info('-- %s %s: %s (%0.1fs)', t['classname'], t['name'], t['outcome'], t['durationSecs'], 
 			extra=maintag)
@@ -344,9 +651,50 @@ class JUnitDescriptorLoader(DescriptorLoader):
 	
 	To use this, create a ``pysysdirconfig.xml`` with a user-data element ``junitTestDescriptorForEach``. 
 	
+	The ``junitTestDescriptorForEach`` value can be ``class`` to execute each test class in a separate JUnit process, 
+	or ``batch`` which also creates a PySys test for each class, but executes groups of up to ``junitBatchSize`` 
+	(default 20) classes in a single JUnit process to avoid the cost of starting a JVM for every class. In batch mode 
+	each PySys test still reports the outcomes of only its own class's testcases, and since only the classes selected 
+	for the current test run are executed, failed classes can be re-run individually as usual. Note that the 
+	``junitTimeoutSecs`` applies to the whole batch. The first test of each batch is its leader, which is given an 
+	``executionOrderHint`` 1.0 lower than the other tests so that the leaders of all batches are scheduled first, 
+	and the other tests in a batch (which wait for the batch to complete before reading their results) do not occupy 
+	the worker threads while their batch is still waiting to start. 
+	
+	Alternatively use ``method`` to create a separate PySys test for each test method, so that individual methods 
+	(for example flaky ones) can be re-run or distributed across test runs at a fine granularity. The selected methods 
+	of each class are executed together in a single JUnit process (using ``--select-method``), with each PySys test 
+	reporting the outcomes for its own method (including all invocations of parameterized and repeated tests). The 
+	test methods are found by scanning the source file of each class (see `pysysjava.junitsourcescan`), and classes 
+	whose methods cannot be reliably identified this way - for example if they extend another class, contain nested 
+	test classes or are suites - get a single PySys test for the whole class as with ``class``. The id of each 
+	method's test is the id of its class followed by ``.`` and the method name. As with ``batch``, the test for the 
+	first method of each class is the leader that is scheduled ahead of the others. 
+	
 	You may also wish to add a ``junitStripPrefixes`` user-data to strip off long common package names from your 
 	test classes and/or an ``id-prefix`` to add a common testId prefix indicating these are JUnit tests. 
 	
+	For very large source trees on network filesystems, set the ``junitScanThreads`` user-data to the number of threads 
+	to use when searching the ``Input/`` directory for test classes (or 0 for an automatically chosen number). 
+	
+	To avoid searching the whole ``Input/`` directory every time the descriptors are loaded, set the 
+	``junitDescriptorCacheDir`` project property to a directory (absolute, or relative to the testRootDir) where a 
+	snapshot of the source tree can be stored. Subsequent loads only rescan directories whose modification time has 
+	changed. See `pysysjava.junitdescriptorcache` for details. 
+	
+	By default every class whose name matches ``junitIncludeClassnameRegex`` gets a test descriptor, so helper classes 
+	with test-like names result in a BLOCKED "No tests were found" outcome. To avoid this, set the 
+	``junitSkipClassesWithoutTests`` user-data to ``true``, which scans the source files (without compiling them) and 
+	skips classes that are abstract, or that have no JUnit test annotations either in the class or in any of its 
+	superclasses/interfaces under the ``Input/`` directory. Scan results are cached in the ``junitDescriptorCacheDir`` 
+	if configured. See `pysysjava.junitsourcescan` for details. 
+	
+	If the ``junitDurationHistoryFile`` project property is set, the ``executionOrderHint`` of each test is reduced by 
+	up to 1.0 in proportion to its duration in previous test runs, so that within each group of tests with the same 
+	hint the longest tests are executed first. Tests with no recorded duration are assumed to take the mean duration. 
+	For tests in a batch the reduction is up to 0.5, so that they are still executed after the batch leaders. 
+	See `pysysjava.junitschedule` for details, including how to split tests into shards balanced by duration. 
+	
 	You can also use the ``junit*`` user-data options described in `JUnitTest` and the 
 	``javaClasspath`` and ``jvmArgs`` described in `pysysjava.javaplugin.JavaPlugin`. 
 	
@@ -378,56 +726,121 @@ class JUnitDescriptorLoader(DescriptorLoader):
 		thing = parentDirDefaults.userData.get('junitTestDescriptorForEach', None)
 		if not thing: return False
 		
-		# we could support other granularity such as per directory, per test method etc
-		assert thing in ['class', ]
+		# we could support other granularity such as per directory
+		assert thing in ['class', 'batch', 'method'], 'Unsupported junitTestDescriptorForEach value: "%s"'%thing
+		
+		batchSize = int(parentDirDefaults.userData.get('junitBatchSize', '20'))
+		assert batchSize > 0, 'junitBatchSize must be a positive integer'
+		# batch ids must be unique across the whole project
+		batchPrefix = '%s.%s.batch'%(os.path.basename(os.path.dirname(parentDirDefaults.file)), 
+			hashlib.sha256(os.path.normpath(parentDirDefaults.file).encode('utf-8')).hexdigest()[:8])
 	
 		stripPrefixes = [x.strip() for x in parentDirDefaults.userData.get('junitStripPrefixes', '').split(',') if x.strip()]
 		
 		# default regex is from the JUnit 5 console launcher
-		includeClassnameRegex = re.compile(parentDirDefaults.userData.get('junitIncludeClassnameRegex', '^(Test.*|.+[.$]Test.*|.*Tests?)$')) 
+		includeClassnameRegex = parentDirDefaults.userData.get('junitIncludeClassnameRegex', '^(Test.*|.+[.$]Test.*|.*Tests?)$')
 		includeClassnameRegexCompiled = re.compile(includeClassnameRegex) 
 		
 		inputdir = toLongPathSafe(os.path.normpath(fromLongPathSafe(os.path.join(os.path.dirname(parentDirDefaults.file), parentDirDefaults.input))))
 	
 		found = 0
-		for entry in walkDirTreeContents(inputdir, dirIgnores=OSWALK_IGNORES):
-			if entry.is_file() and entry.name.endswith('.java'):
-				classname = entry.path[len(inputdir):-5].strip(os.sep).replace(os.sep, '.')
+		scanThreads = int(parentDirDefaults.userData.get('junitScanThreads', '1'))
+		cacheDir = self.project.getProperty('junitDescriptorCacheDir', '')
+		if cacheDir:
+			cacheDir = os.path.join(self.project.testRootDir, cacheDir)
+			cacheKey = JavaSourceTreeCache.getKey(inputdir, parentDirDefaults.file)
+			javafiles = [inputdir+os.sep+f.replace('/', os.sep) for f in JavaSourceTreeCache(cacheDir).listJavaFiles(inputdir, 
+				cacheKey, OSWALK_IGNORES, threads=scanThreads)]
+		else:
+			javafiles = [entry.path for entry in walkDirTreeContents(inputdir, dirIgnores=OSWALK_IGNORES, fileSuffixes='.java', 
+				threads=scanThreads) if entry.is_file()]
+		javafiles = {javafile[len(inputdir):-5].strip(os.sep).replace(os.sep, '.'): javafile for javafile in javafiles}
 
-				if not includeClassnameRegexCompiled.match(classname):
-					log.debug('Ignoring JUnit class as name does not match regex for tests: "%s"', classname)
-					continue
-				
-				found += 1
+		history = None
+		historyFile = self.project.getProperty('junitDurationHistoryFile', '')
+		if historyFile:
+			history = getattr(self, '_junitDurationHistory', None)
+			if history is None: history = self._junitDurationHistory = JUnitDurationHistory(os.path.join(self.project.testRootDir, historyFile))
+			maxSecs = history.getMaxDuration() or 1.0
+			defaultSecs = history.getMeanDuration()
+
+		testClasses = None
+		finder = JUnitTestClassFinder(os.path.join(cacheDir, 'junit-source-scan-%s.json'%cacheKey[:16]) if cacheDir else None)
+		if parentDirDefaults.userData.get('junitSkipClassesWithoutTests', 'false').lower() == 'true':
+			candidates = [c for c in javafiles if includeClassnameRegexCompiled.match(c)]
+			testClasses = finder.findTestClasses(javafiles, candidates)
+			log.debug('Found %d JUnit classes with tests out of %d candidates in %s (scanned %d source files)', 
+				len(testClasses), len(candidates), fromLongPathSafe(inputdir), finder.scannedFiles)
+
+		for classname, javafile in javafiles.items():
+			if not includeClassnameRegexCompiled.match(classname):
+				log.debug('Ignoring JUnit class as name does not match regex for tests: "%s"', classname)
+				continue
+			if testClasses is not None and classname not in testClasses:
+				log.debug('Ignoring JUnit class as it does not contain any test annotations: "%s"', classname)
+				continue
+			
+			found += 1
+			id = classname
+			for p in stripPrefixes:
+				if id.startswith(p):
+					id = id[len(p):].lstrip('.')
+					break
+
+			methods = None
+			if thing == 'method':
+				info = finder.getSourceInfo(javafile, classname.split('.')[-1])
+				# classes that might inherit test methods (or where the methods can't be identified) are run as a unit
+				if info.testMethods and not info.supertypes and not info.isAbstract: 
+					methods = info.testMethods
+				else:
+					log.debug('Creating a single test descriptor for JUnit class since its test methods cannot be identified: "%s"', classname)
+			
+			for methodIndex, method in enumerate(methods or [None]):
 				userData = dict(parentDirDefaults.userData)
-				userData['junitSelectionArgs'] = '--select-class %s'%classname
+				if method is None:
+					userData['junitSelectionArgs'] = '--select-class %s'%classname
+				else:
+					# all methods of a class are executed in the same JUnit process
+					userData['junitSelectionArgs'] = '--select-method %s#%s'%(classname, method)
+					userData['junitBatch'] = '%s.%s'%(batchPrefix, classname)
+				if thing == 'batch': 
+					userData['junitBatch'] = '%s%03d'%(batchPrefix, (found-1)//batchSize)
+				methodSuffix = '' if method is None else '.'+method.split('(')[0]
 				
-				id = classname
-				for p in stripPrefixes:
-					if id.startswith(p):
-						id = id[len(p):].lstrip('.')
-						break
+				executionOrderHint = parentDirDefaults.executionOrderHint
+				isBatchLeader = (thing == 'batch' and (found-1)%batchSize == 0) or (method is not None and methodIndex == 0)
+				if isBatchLeader:
+					# the first test of each batch usually executes the whole batch, so schedule all the leaders ahead of 
+					# the other tests with this hint, rather than filling the worker threads with tests waiting for them
+					executionOrderHint -= 1.0
+				elif history is not None:
+					# longest first (lower hints execute earlier), without affecting the order relative to other hints
+					# (or to batch leaders)
+					secs = history.getDuration(parentDirDefaults.id+id+methodSuffix)
+					executionOrderHint -= (defaultSecs if secs is None else secs)/maxSecs*(0.5 if 'junitBatch' in userData else 1.0)
 				
 				descriptors.append(TestDescriptor(
 					file=fromLongPathSafe(parentDirDefaults.file), 
-					id=parentDirDefaults.id+id, 
-					title='JUnit %s - %s'%(thing, classname),
+					id=parentDirDefaults.id+id+methodSuffix, 
+					title='JUnit class - %s'%classname if method is None else 'JUnit method - %s#%s'%(classname, method),
 					groups=[u'junit']+parentDirDefaults.groups, 
 					modes=parentDirDefaults.modes,
 					classname="JUnitTest", # pysysjava.junittest.JUnitTest
 					module=os.path.abspath(os.path.splitext(__file__)[0]),
-					purpose = fromLongPathSafe(entry.path),
+					purpose = fromLongPathSafe(javafile),
 					userData = userData,
 					
 					# must ensure output dirs are unique even though lots of classes share the same testDir
-					output=((parentDirDefaults.output+os.sep) if parentDirDefaults.output else '')+classname, 
+					output=((parentDirDefaults.output+os.sep) if parentDirDefaults.output else '')+classname+methodSuffix, 
 
 					# copy everything else across from the defaults
 					input=parentDirDefaults.input,
 					traceability=parentDirDefaults.traceability,
-					executionOrderHint=parentDirDefaults.executionOrderHint,
+					executionOrderHint=executionOrderHint,
 					skippedReason=parentDirDefaults.skippedReason,
 					))
+		finder.save()
 		if found == 0: raise Exception('No JUnit test .java files found matching "%s" in %s', includeClassnameRegex, fromLongPathSafe(inputdir))
 		
 		return True # means this directory has been fully handled so don't continue looking for PySys tests under this tree
@@ -0,0 +1,206 @@
+"""
+A pool of long-lived JVMs for executing JUnit tests from `pysysjava.junittest.JUnitTest`, which avoids paying the
+JVM startup and JUnit platform loading cost for every test.
+"""
+
+import os
+import logging
+import socket
+import threading
+
+import pysys
+from pysys.constants import *
+from pysys.exceptions import ProcessTimeout
+from pysys.utils.fileutils import mkdir
+
+from pysysjava.javaplugin import JavaPlugin, _FunctionProcess
+
+log = logging.getLogger('pysys.pysysjava.junitworkerpool')
+
+class JUnitWorkerPool(object):
+	"""
+	This is a PySys runner plugin that manages a pool of pre-started worker JVMs which execute the JUnit console
+	launcher in-process, so that `pysysjava.junittest.JUnitTest` can dispatch each test to an already-warm JVM
+	instead of starting a new ``junit-platform-console-standalone`` process.
+
+	To enable it, add this to your project configuration (the alias must be ``junitWorkerPool``)::
+
+		<runner-plugin classname="pysysjava.junitworkerpool.JUnitWorkerPool" alias="junitWorkerPool"/>
+
+	Each worker JVM has the ``junitFrameworkClasspath`` on its classpath and is started with the test's ``jvmArgs``;
+	workers are only reused by tests with the same framework classpath and JVM arguments. The test classes (and the
+	test's ``javaClasspath``) are loaded in a separate class loader for each test, and any ``jvmProps`` are set as
+	system properties for the duration of the test only. The JUnit reports are written to the test's
+	``junit-reports`` directory as usual.
+
+	Since tests executed in the same JVM could affect each other (for example through static state, or threads that
+	are not stopped), each worker is replaced by a new JVM after `maxRunsPerWorker` tests or when its heap usage
+	exceeds `maxHeapUsedMB`.
+
+	Workers are not used when Java code coverage is enabled (since coverage data is collected per JVM), or if the
+	pool is disabled for a particular run using ``pysys run -XjunitWorkerPool=false``. If a test causes the worker
+	JVM to terminate (e.g. by calling ``System.exit``), the test is blocked and a new worker is started for
+	subsequent tests.
+	"""
+
+	maxWorkers = 0
+	"""
+	The maximum number of worker JVMs. The default value of 0 means the same as the number of test threads.
+	"""
+
+	maxRunsPerWorker = 50
+	"""
+	The maximum number of tests executed by each worker before it is replaced by a new JVM.
+	"""
+
+	maxHeapUsedMB = 256.0
+	"""
+	A worker is replaced by a new JVM if the heap in use (after garbage collection) exceeds this size at the end
+	of a test.
+	"""
+
+	def setup(self, runner):
+		self.runner = runner
+		self.enabled = runner.getBoolProperty('junitWorkerPool', default=True)
+		if not self.enabled:
+			log.info('JUnit worker pool is disabled for this run')
+			return
+
+		self.maxWorkers = self.maxWorkers or runner.threads
+		self.__condition = threading.Condition()
+		self.__idle = [] # list of (key, worker)
+		self.__workers = 0
+		self.__workersStarted = 0
+		self.__runs = 0
+
+		self.__java = JavaPlugin()
+		self.__java.setup(runner)
+		self.__dir = mkdir(os.path.join(runner.output, 'pysysjava-junit-workers'))
+		self.__java.compile(os.path.join(os.path.dirname(__file__), 'java', 'pysysjava', 'internal', 'JUnitWorker.java'),
+			output=self.__dir+'/classes', arguments=[], stdouterr=self.__dir+'/javac-junit-worker', abortOnError=True)
+
+		runner.addCleanupFunction(lambda: log.info('JUnit worker pool executed %d tests using %d worker JVMs',
+			self.__runs, self.__workersStarted) if self.__runs else None)
+
+	def isAvailable(self, test):
+		"""
+		Returns True if the specified test can be executed using this pool.
+
+		:param pysysjava.junittest.JUnitTest test: The test.
+		"""
+		return self.enabled and not (hasattr(self.runner, 'javaCoverageWriter') and not test.disableCoverage)
+
+	def startJUnit(self, test, arguments, jvmProps={}, **kwargs):
+		"""
+		Execute the JUnit console launcher in a worker JVM.
+
+		:param pysysjava.junittest.JUnitTest test: The test that is executing JUnit, which provides the
+			``junitFrameworkClasspath`` and JVM arguments.
+		:param list[str] arguments: The console launcher arguments.
+		:param dict[str,str] jvmProps: System properties to set while executing the tests.
+		:param kwargs: Additional keyword arguments such as ``stdouterr=``, ``timeout=`` and ``onError=`` that will be
+			passed to `pysys.basetest.BaseTest.startProcess`. Any ``classOrJar`` argument is ignored since the
+			launcher is already loaded in the worker.
+		:return: The process object.
+		:rtype: pysys.process.Process
+		"""
+		kwargs.pop('classOrJar', None)
+		key = (tuple(test.junitFrameworkClasspath), tuple(test.java.defaultJVMArgs))
+
+		# The worker has a different working directory, so make sure classpath entries are absolute
+		arguments = ['--classpath=%s'%os.pathsep.join(os.path.join(test.output, c) for c in a[len('--classpath='):].split(os.pathsep))
+			if a.startswith('--classpath=') else a for a in arguments]
+
+		def runInWorker(process):
+			worker = self.__acquire(key, test)
+			recycle = True
+			try:
+				result = worker.execute(process.stdout, process.stderr, jvmProps, arguments, process.timeout)
+				if result is None:
+					with open(process.stderr, 'a') as f:
+						f.write('JUnit worker JVM terminated unexpectedly (perhaps due to System.exit); see %s\n'%worker.process.stderr)
+					return -1
+				exitStatus, heapUsedBytes = result
+
+				worker.runs += 1
+				recycle = worker.runs >= self.maxRunsPerWorker or heapUsedBytes > self.maxHeapUsedMB*1024*1024
+				if recycle: test.log.debug('Replacing JUnit worker %s after %d runs with %0.1f MB heap in use',
+					worker, worker.runs, heapUsedBytes/1024.0/1024)
+				return exitStatus
+			finally:
+				self.__release(key, worker, recycle)
+
+		return test.startProcess(test.java.javaExecutable, arguments,
+			processFactory=lambda **kw: _FunctionProcess(runInWorker, **kw), **kwargs)
+
+	def __acquire(self, key, test):
+		with self.__condition:
+			while True:
+				for i, (k, worker) in enumerate(self.__idle):
+					if k == key:
+						del self.__idle[i]
+						self.__runs += 1
+						return worker
+				if self.__workers < self.maxWorkers: break
+				if self.__idle: # free up a worker with a different configuration
+					self.__idle.pop(0)[1].stop()
+					self.__workers -= 1
+					continue
+				self.__condition.wait()
+			self.__workers += 1
+			self.__workersStarted += 1
+			self.__runs += 1
+			workerNumber = self.__workersStarted
+
+		try:
+			return _JUnitWorker(self.runner, self.__java, '%s/worker%03d'%(self.__dir, workerNumber),
+				self.__dir+'/classes', list(key[0]), list(key[1]))
+		except BaseException:
+			self.__release(key, None, True)
+			raise
+
+	def __release(self, key, worker, recycle):
+		if recycle and worker is not None: worker.stop()
+		with self.__condition:
+			if recycle:
+				self.__workers -= 1
+			else:
+				self.__idle.append((key, worker))
+			self.__condition.notify()
+
+class _JUnitWorker(object):
+	# A worker JVM, started by the runner so that it can outlive the test that needed it
+	def __init__(self, runner, java, stdouterr, workerClassesDir, frameworkClasspath, jvmArgs):
+		self.runs = 0
+		self.port = runner.getNextAvailableTCPPort()
+		self.process = java.startJava('pysysjava.internal.JUnitWorker', [str(self.port)],
+			classpath=frameworkClasspath+[workerClassesDir], jvmArgs=jvmArgs, disableCoverage=True,
+			stdouterr=stdouterr, background=True, abortOnError=True)
+		runner.waitForSocket(self.port, host='127.0.0.1', process=self.process, abortOnError=True)
+
+	def __str__(self): return os.path.basename(self.process.stdout)
+
+	def execute(self, stdout, stderr, jvmProps, arguments, timeout):
+		# Returns (exitStatus, heapUsedBytes), or None if the worker terminated
+		escape = lambda a: str(a).replace('\\', '\\\\').replace('\n', '\\n').replace('\r', '\\r')
+		request = [stdout, stderr, str(len(jvmProps))]+[escape('%s=%s'%(k, v)) for k, v in jvmProps.items()]
+		request += [str(len(arguments))]+[escape(a) for a in arguments]
+		response = b''
+		try:
+			with socket.create_connection(('127.0.0.1', self.port), timeout=timeout) as s:
+				s.sendall(('\n'.join(request)+'\n').encode('utf-8'))
+				while not response.endswith(b'\n'):
+					data = s.recv(1024)
+					if not data: break
+					response += data
+		except socket.timeout:
+			raise ProcessTimeout('JUnit worker did not complete within %d secs'%timeout)
+		except OSError as ex:
+			log.debug('Failed to communicate with JUnit worker %s: %s', self, ex)
+			return None
+		if not response.strip(): return None
+		exitStatus, heapUsedBytes = response.decode('ascii').split()
+		return int(exitStatus), int(heapUsedBytes)
+
+	def stop(self):
+		self.process.stop()
@@ -2,18 +2,73 @@
 Support for reading the Ant-style XML files often used for report JUnit results (and also for some non-JUnit test 
 execution engines). 
 
+Use `JUnitXMLParser` to parse a single file, or `parseJUnitXMLFiles` to parse many files (such as the per-class 
+files generated by Ant) using multiple processes. 
 """
 
 import pysys
 from pysys.constants import *
 from pysys.utils.fileutils import *
 
+import re
 import logging
 import calendar
+import functools
+import concurrent.futures
+import multiprocessing
 import xml.etree.ElementTree as ET # Python 3.3+ will automatically use the fast C version if available
 
 log = logging.getLogger('pysys.java.junitxml')
 
+@functools.lru_cache(maxsize=256)
+def _getTestFileLineRegex(classnameUnqualified):
+	# Finds "(MyClass.java:123" in a stack trace (a bounded cache since there could be many classes); this starts with 
+	# a literal so is much faster than a regex that matches the whole line
+	return re.compile(r'[(]%s[^:\n]*:([0-9]+)'%re.escape(classnameUnqualified))
+
+_STACK_TRACE_LINE_REGEX = re.compile(r'[ \t]+at ')
+
+def _findTestFileLine(details, classnameUnqualified):
+	# Returns the line number from the first stack trace line for the specified class in a single pass
+	for m in _getTestFileLineRegex(classnameUnqualified).finditer(details):
+		lineStart = details.rfind('\n', 0, m.start())+1
+		prefix = _STACK_TRACE_LINE_REGEX.match(details, lineStart, m.start())
+		if prefix is not None: return int(m.group(1))
+	return None
+
+@functools.lru_cache(maxsize=16)
+def _compileMultiline(pattern):
+	return re.compile(pattern, flags=re.MULTILINE)
+
+_COMPARISON_REGEX = re.compile('expected: ?<(.*)> but was: ?<(.*)>$')
+
+# The following are shared with the JUnit events reader, so that streamed and XML results are identical
+
+def _setOutcomeReason(t, reason, details=''):
+	# Sets the outcomeReason (and any comparison values) of a failure/error testcase; outcome/outcomeType must be set 
+	# first. If there's no message, the first line of the stack trace is used instead
+	if not reason: reason = details.strip().split('\n', 1)[0].strip()
+	t['outcomeReason'] = reason
+	m = _COMPARISON_REGEX.match(reason)
+	if m is not None and m.group(1)!=m.group(2):
+		t['comparisonExpected'], t['comparisonActual'] = m.group(1), m.group(2)
+	
+	if t['outcome'] == 'error' and t.get('outcomeType') and t['outcomeType'] not in reason:
+		t['outcomeReason'] = '%s: %s'%(t['outcomeType'], reason) if reason else t['outcomeType']
+
+def _setOutcomeDetails(t, details, excludeLinesRegex):
+	# Sets the full and filtered stack trace (without the outcomeReason line) of a failure/error testcase
+	if not details: return
+	t['outcomeDetailsFull'] = details
+	t['outcomeDetails'] = _compileMultiline(excludeLinesRegex).sub('', details).strip()
+
+def _setTestFileLine(t):
+	# Once the classname is known, sets the line in the stack trace from that class (if any)
+	if 'outcomeDetails' not in t: return
+	line = _findTestFileLine(t['outcomeDetails'], (t['classname'] or '').split('.')[-1].split('$')[0])
+	if line is not None:
+		t['testFileLine'] = line
+
 class JUnitXMLParser:
 	""" A fast, minimal parser for Ant-style JUnit XML files.
 	
@@ -27,6 +82,9 @@ class JUnitXMLParser:
 	A regular expression specifying lines that should be stripped out of the outcomeDetails stack traces. 
 	"""
 	
+	# Patterns used for every element are compiled once, since parsing can involve many thousands of testcases
+	_uniqueIdRegex = re.compile('unique-id: (.*)\ndisplay-name: (.+)', flags=re.MULTILINE)
+	
 	isTimestampLocalTime = None
 	"""
 	Set to True to force timestamp to be interpreted as local time (like JUnit5), 
@@ -34,6 +92,20 @@ class JUnitXMLParser:
 	
 	"""
 	
+	maxOutputLength = None
+	"""
+	If set, the ``stdout``, ``stderr``, ``outcomeDetails`` and ``outcomeDetailsFull`` values of each testcase (and the 
+	suite) are truncated to this many characters, to limit memory usage for reports with very verbose output. 
+	A line is appended to each truncated value indicating how many characters were removed. 
+	"""
+	
+	outputSpillDir = None
+	"""
+	If set (along with `maxOutputLength`), the full value of each ``stdout``, ``stderr`` and ``outcomeDetailsFull`` 
+	that needs to be truncated is first written to a UTF-8 file in this directory, and the path of the file is added to 
+	the dictionary with the key suffix ``File``, e.g. ``stdoutFile``. 
+	"""
+	
 	def __init__(self, path):
 		self.path = os.path.normpath(path)
 		
@@ -51,7 +123,9 @@ class JUnitXMLParser:
 	def parse(self):
 		"""
 		Parses this file and returns a tuple of (testsuite: dict[str,obj], testcases: list[dict[str,obj]]) 
-		representing the contents of this file. 
+		representing the contents of this file, with the testcases sorted by classname and name. 
+		
+		For very large files, consider using `iterTestcases` instead, which avoids holding all the testcases in memory. 
 		
 		The testsuite dictionary contains keys:
 		
@@ -81,36 +155,71 @@ class JUnitXMLParser:
 			* ``outcomeDetails: str`` (optional) - multi-line details string for the outcome, typically a stack trace. 
 			  To avoid excessive verbosity lines involving org.junit.* or java.* packages are excluded. 		
 			* ``outcomeDetailsFull: str`` (optional) - multi-line details string for the outcome, without exclusions. 	
-			* ``comparisonExpected/comparisonActual: str`` (optional) - actual and expected comparison values from the outcomeReason, if known. 		"""
+			* ``comparisonExpected/comparisonActual: str`` (optional) - actual and expected comparison values from the outcomeReason, if known. 
+			* ``stdoutFile/stderrFile/outcomeDetailsFullFile: str`` (optional) - the path of a file containing the full 
+			  value, if it was truncated (see `outputSpillDir`). 
+		"""
+		# The order seems to be random, so sort it
+		results = list(self.iterTestcases())
+		results.sort(key=lambda r: (r.get('classname'), r.get('name')))
+		self.results = results
+		return self.suite, results
+
+	def iterTestcases(self):
+		"""
+		Parses this file, yielding a dictionary for each testcase as soon as it has been parsed, in the order they 
+		appear in the file. 
+		
+		This uses much less memory than `parse` for large files, since the XML elements for each testcase are freed 
+		as soon as it has been parsed, and the testcases are not retained by this parser. Use `maxOutputLength` and 
+		`outputSpillDir` to also limit the memory used for very large stdout/stderr output. 
 		
+		The testsuite dictionary is available as ``self.suite``, and contains the attributes of the suite from the 
+		start of the iteration, but some keys such as ``stdout`` may not be present until the iteration has completed. 
+		See `parse` for details of the keys. 
+		
+		:return Iterator[dict[str,obj]]: An iterator over the testcases. 
+		"""
 		log.debug('Parsing JUnitXML: %s', self.path)
 		
-		self.results = []
+		self.results = [] # testcases parsed but not yet yielded
 		self.suite = {}
 		self.currenttest = {}
+		self._testcaseCount = 0
 		unmarshaller = self.unmarshaller
+		count = 0
 		try:
 			with open(toLongPathSafe(self.path), 'rb') as fileptr:
 				nodepath = []
+				root = None
 				for action, elem in ET.iterparse(fileptr, events=['start','end']):
 					if action =='start':
 						nodepath.append(elem.tag)
+						if root is None: # the root's attributes are all we need, so handle it now
+							root = elem
+							u = unmarshaller.get(elem.tag)
+							if u is not None: u(elem, nodepath)
 					else:
-						u = unmarshaller.get(elem.tag)
-						if u is not None: u(elem, nodepath)
+						if elem is not root:
+							u = unmarshaller.get(elem.tag)
+							if u is not None: u(elem, nodepath)
 						nodepath.pop()
+						if len(nodepath) == 1: root.clear() # free the elements we've finished with
+						if self.results:
+							count += len(self.results)
+							yield from self.results
+							del self.results[:]
 			
 			# This check is to make sure we've not missed anything while parsing; 
 			# note that Ant seems to set tests to the total excluding skipped ones whereas JUnit5 launcher includes 
 			# skipped ones; hence not doing an exact check here
-			assert len(self.results) >= self.suite['tests'], 'Suite contains %d tests but found %d testcase elements'%(
-				self.suite['tests'], len(self.results))
+			assert count >= self.suite['tests'], 'Suite contains %d tests but found %d testcase elements'%(
+				self.suite['tests'], count)
+			self._limitOutput(self.suite, 'suite')
 		except Exception as ex: # pragma: no cover
 			raise Exception('Failed to parse JUnit XML %s: %s'%(self.path, ex))
-		# The order seems to be random, so sort it
-		self.results.sort(key=lambda r: (r.get('classname'), r.get('name')))
 		
-		if len(self.results)==0:
+		if count==0:
 			if 'uniqueId' in self.suite:
 				# e.g. if you have JUnit 5 but not JUnit 4 (or vice-versa) you'll get an empty file; the above is a 
 				# a way to detect that the suite is from the JUnit5 launcher rather than an actual Ant/JUnit4 test class/suite
@@ -118,17 +227,30 @@ class JUnitXMLParser:
 			else:
 				assert self.suite.get('skipped') >= 1, 'Test suite "%s" contains no results, but skipped=0: %s'%(self.suite.get('name'), self.path)
 				# Create a fake result so that it shows up. NB: JUnit 5 always generates a result so this is just for JUnit 4 and/or Ant
-				self.results.append({
+				yield {
 					"classname": self.suite['name'],
 					"durationSecs": 0.0,
 					"name": "class",
 					"outcome": "skipped",
 					"outcomeReason": "Test suite is skipped",
-				})
-					
-		return self.suite, self.results
+				}
+
+	def _limitOutput(self, item, name):
+		# Truncates (and optionally spills to a file) any large output values in the specified testcase/suite dict
+		if self.maxOutputLength is None: return
+		for key in ['stdout', 'stderr', 'outcomeDetailsFull', 'outcomeDetails']:
+			text = item.get(key)
+			if text is None or len(text) <= self.maxOutputLength: continue
+			if self.outputSpillDir and key != 'outcomeDetails': # no need to spill outcomeDetails as it's a subset of the full details
+				mkdir(self.outputSpillDir)
+				path = os.path.join(self.outputSpillDir, '%s.%s.%s.txt'%(os.path.basename(self.path), name, key))
+				with open(toLongPathSafe(path), 'w', encoding='utf-8') as f:
+					f.write(text)
+				item[key+'File'] = path
+			item[key] = text[:self.maxOutputLength]+'\n... (truncated %d characters)'%(len(text)-self.maxOutputLength)
 
 	def _testsuite(self, elem, nodepath):
+		# Called at the start of the root element, so only the attributes are available
 		assert len(nodepath)==1, 'Only expecting testsuite elements as the root node, but got: %s'%nodepath
 		self.suite.update(elem.attrib)
 
@@ -149,15 +271,12 @@ class JUnitXMLParser:
 		currenttest['durationSecs'] = float(elem.attrib.get('time') or '0')
 		
 		# Now we know the classname try to find the line in the stack trace from that class
-		classnameUnqualified = (currenttest['classname'] or '').split('.')[-1].split('$')[0]
-		for l in currenttest.get('outcomeDetails', '').split('\n'):
-			m = re.match(r'[ \t]+at .*[(]%s[^:]*:([0-9]+)'%classnameUnqualified, l)
-			if m is not None:
-				currenttest['testFileLine'] = int(m.group(1))
-				break
+		_setTestFileLine(currenttest)
 		
 		currenttest.setdefault('outcome', 'passed')
 		
+		self._testcaseCount += 1
+		self._limitOutput(currenttest, 'testcase%06d'%self._testcaseCount)
 		self.results.append(currenttest)
 		self.currenttest = {}
 
@@ -177,7 +296,7 @@ class JUnitXMLParser:
 		item = self.suite if nodepath[-2]=='testsuite' else self.currenttest
 
 		# instead of real system output it could contain special output from the JUnit 5 Jupiter engine
-		m = re.match('unique-id: (.*)\ndisplay-name: (.+)', text, flags=re.MULTILINE)
+		m = self._uniqueIdRegex.match(text) if text.startswith('unique-id: ') else None
 		if m:
 			item['uniqueId'] = m.group(1)
 			item['displayName'] = m.group(2)
@@ -192,21 +311,55 @@ class JUnitXMLParser:
 		t['outcome'] = elem.tag
 		if elem.attrib.get('type'): t['outcomeType'] = elem.attrib['type']
 
-		if elem.attrib.get('message'): 
-			t['outcomeReason'] = elem.attrib['message'].strip()
-			
-			m = re.match('expected: ?<(.*)> but was: ?<(.*)>$', t['outcomeReason'])
-			if m is not None and m.group(1)!=m.group(2):
-				t['comparisonExpected'], t['comparisonActual'] = m.group(1), m.group(2)
-			
-			if t['outcome'] == 'error' and t.get('outcomeType') and t['outcomeType'] not in t['outcomeReason']:
-				t['outcomeReason'] = '%s: %s'%(t['outcomeType'], t['outcomeReason'])
-			
+		if elem.attrib.get('message') or elem.tag != 'skipped': # failures without a message just have a stack trace
+			_setOutcomeReason(t, (elem.attrib.get('message') or '').strip(), elem.text or '')
 			if elem.text:
-				details = elem.text.lstrip()
-				if details:
-					t['outcomeDetailsFull'] = details
-					t['outcomeDetails'] = re.sub(self.outcomeDetailsExcludeLinesRegex, '', details, flags=re.MULTILINE).strip()
+				_setOutcomeDetails(t, elem.text.lstrip(), self.outcomeDetailsExcludeLinesRegex)
 		else:
 			t['outcomeReason'] = elem.text.strip()
-		
\ No newline at end of file
+		
+PARALLEL_PARSE_MIN_FILES = 64
+"""
+The default minimum number of files for which `parseJUnitXMLFiles` uses multiple processes. Below this, the cost of 
+sending the files to other processes and the results back outweighs the benefit of parsing in parallel. 
+"""
+
+def _parseFile(parserClass, path):
+	return parserClass(path).parse()
+
+def parseJUnitXMLFiles(paths, processes=0, minFilesForParallel=None, parserClass=JUnitXMLParser, executor=None):
+	"""
+	Parse many JUnit XML files, using a pool of processes if there are enough files for this to be faster than 
+	parsing them one at a time. 
+	
+	The results are the same as calling `JUnitXMLParser.parse` for each file, and are returned in order of path 
+	regardless of how many processes are used. 
+	
+	:param list[str] paths: The paths of the files to parse. 
+	:param int processes: The maximum number of processes to use, or 1 to parse all files in the calling process. The 
+		default of 0 means the number of CPUs. If an executor is specified this should be its number of processes. 
+	:param int minFilesForParallel: The minimum number of files to parse in parallel; fewer files are parsed in the 
+		calling process. The default is `PARALLEL_PARSE_MIN_FILES`. 
+	:param type parserClass: The `JUnitXMLParser` class (or subclass) to use. When using multiple processes, a subclass 
+		must be importable from a module so that it can be used in the other processes. 
+	:param concurrent.futures.Executor executor: An existing process pool to use, which avoids the cost of starting new 
+		processes if this function is called many times. If not specified, a pool is created (and shut down) by 
+		this function if needed. 
+	:return list[(str,dict[str,obj],list[dict[str,obj]])]: A list of (path, testsuite, testcases) tuples, one for 
+		each file. 
+	"""
+	paths = sorted(paths)
+	if minFilesForParallel is None: minFilesForParallel = PARALLEL_PARSE_MIN_FILES
+	processes = processes or os.cpu_count() or 1
+	if len(paths) < max(minFilesForParallel, 2) or processes == 1:
+		return [(p,)+_parseFile(parserClass, p) for p in paths]
+	
+	log.debug('Parsing %d JUnit XML files in parallel', len(paths))
+	ownExecutor = executor is None
+	if ownExecutor: # use spawn since forking a process that has other threads (as PySys does) is unsafe
+		executor = concurrent.futures.ProcessPoolExecutor(processes, mp_context=multiprocessing.get_context('spawn'))
+	try:
+		chunksize = max(1, len(paths)//(processes*4))
+		return [(p,)+result for p, result in zip(paths, executor.map(_parseFile, [parserClass]*len(paths), paths, chunksize=chunksize))]
+	finally:
+		if ownExecutor: executor.shutdown()
@@ -0,0 +1,312 @@
+"""
+Timing instrumentation for the ``java`` and ``javac`` processes started by `pysysjava.javaplugin.JavaPlugin`, which
+shows where the time goes between a test asking for a process and the process being useful.
+
+This is enabled by setting the ``recordLaunchTimings`` property of the ``JavaPlugin`` or by running with
+``pysys run -XjavaLaunchTimings=true``. For each `pysysjava.javaplugin.JavaPlugin.startJava` and
+`pysysjava.javaplugin.JavaPlugin.compile` call a `JavaLaunchTiming` is recorded, with spans for:
+
+- ``classpath``: resolving the classpath (including glob expansion) using ``toClasspathList``.
+- ``heapBudget``: waiting for memory to be available, if the `pysysjava.heapbudget.JavaHeapBudget` runner plugin is 
+  configured.
+- ``argsFile``: creating the ``@args`` file, if the command line is long enough to need one.
+- ``spawn``: creating the operating system process.
+- ``firstOutput``: from the end of ``spawn`` until the process first wrote to stdout.
+- ``run``: from the end of ``spawn`` until the process exited.
+
+The exit status and the peak resident set size (RSS) are also recorded (the RSS is sampled from ``/proc`` so is only
+available on Linux). For Java 9+ the JVM's unified logging (``-Xlog:startuptime``) is used to capture the JVM's own
+measurement of the time taken by each phase of its startup, such as ``Create VM``.
+
+The timings for each test are written to ``java-launch-timings.json`` in its output directory as each process
+completes, and at the end of the run the slowest launches are logged and all timings are written to
+``java-launch-timings.json`` in the runner output directory.
+"""
+
+import os
+import re
+import json
+import time
+import logging
+import threading
+import functools
+import contextlib
+
+import pysys
+import pysys.process.helper
+from pysys.utils.fileutils import mkdir, toLongPathSafe
+
+log = logging.getLogger('pysys.pysysjava.launchtimings')
+
+_STARTUP_TIME_REGEX = re.compile(r'\[startuptime *\] (.+), ([0-9.]+) secs$', flags=re.MULTILINE)
+
+@functools.lru_cache(maxsize=None)
+def _getJavaMajorVersion(javaHome):
+	try:
+		with open(toLongPathSafe(os.path.join(javaHome, 'release')), 'r', encoding='utf-8', errors='replace') as f:
+			m = re.search(r'^JAVA_VERSION="(1[.])?([0-9]+)', f.read(), flags=re.MULTILINE)
+		return int(m.group(2)) if m else 0
+	except OSError:
+		return 0
+
+def parseStartupTimeLog(path):
+	"""
+	Parse a log file written by the JVM's ``-Xlog:startuptime`` option.
+
+	:param str path: The log file.
+	:return dict[str,float]: The duration in seconds of each startup phase (such as ``Create VM``), in the order they
+		were logged, or an empty dictionary if the file does not exist.
+	"""
+	try:
+		with open(toLongPathSafe(path), 'r', encoding='utf-8', errors='replace') as f:
+			return {m.group(1): float(m.group(2)) for m in _STARTUP_TIME_REGEX.finditer(f.read())}
+	except FileNotFoundError:
+		return {}
+
+def _readPeakRSSMB(pid):
+	# VmHWM is the peak resident set size of the process so far
+	try:
+		with open('/proc/%d/status'%pid, 'rb') as f:
+			for line in f:
+				if line.startswith(b'VmHWM:'): return int(line.split()[1])/1024.0
+	except (OSError, ValueError):
+		pass
+	return None
+
+def timingSpan(timing, name):
+	"""
+	Returns a context manager that records a span with the specified name in the timing, or does nothing if the
+	timing is None.
+	"""
+	return timing.span(name) if timing is not None else contextlib.nullcontext()
+
+class JavaLaunchTiming(object):
+	"""
+	The timing information for a single ``java`` or ``javac`` process.
+
+	:param owner: The test (or runner) that started the process.
+	:param str kind: Either ``java`` or ``javac``.
+	:param str displayName: The display name of the process.
+	"""
+
+	MAX_POLL_INTERVAL_SECS = 0.1
+	"""The maximum interval between checks of the running process. Checks are more frequent just after it starts. """
+
+	def __init__(self, owner, kind, displayName):
+		self.owner, self.kind, self.displayName = owner, kind, displayName
+		self.runner = getattr(owner, 'runner', owner)
+		self.ownerId = owner.descriptor.id if hasattr(owner, 'descriptor') else 'runner'
+		self.thread = threading.current_thread().name
+		self.startTime = time.time()
+		"""The time at which the launch started, in seconds since the epoch. """
+		self.spans = [] # list of (name, startSecs, durationSecs) relative to startTime
+		self.durationSecs = None
+		self.exitStatus = None
+		self.peakRSSMB = None
+		self.background = False
+		self.jvmStartupSecs = {}
+		self.startupTimeLog = None
+		self.__start = time.monotonic()
+		self.__stopping = threading.Event()
+		self.__monitor = None
+		self.__completed = False
+
+	@contextlib.contextmanager
+	def span(self, name):
+		"""
+		Context manager that records a span for the code it contains.
+		"""
+		start = time.monotonic()
+		try:
+			yield
+		finally:
+			self.spans.append((name, start-self.__start, time.monotonic()-start))
+
+	def getStartupTimeLoggingArgs(self, javaHome, logFile, prefix=''):
+		"""
+		Returns the JVM arguments needed to log the JVM's startup time to the specified file, or an empty list if this
+		Java version does not support unified logging.
+
+		:param str logFile: The log file, which must be in the working directory of the process (to avoid problems with
+			``:`` in Windows paths).
+		:param str prefix: A prefix for each argument, such as ``-J`` for ``javac``.
+		"""
+		if _getJavaMajorVersion(javaHome) < 9: return []
+		self.startupTimeLog = logFile
+		return [prefix+'-Xlog:startuptime:file=%s'%os.path.basename(logFile)]
+
+	def getProcessFactory(self, processFactory=None):
+		"""
+		Returns a process factory for `pysys.basetest.BaseTest.startProcess` that records the time taken to spawn the
+		process and monitors it while it is running.
+		"""
+		def factory(**kwargs):
+			process = (processFactory or pysys.process.helper.ProcessImpl)(**kwargs)
+			startBackgroundProcess, stop = process.startBackgroundProcess, process.stop
+			def startAndMonitor():
+				with self.span('spawn'):
+					startBackgroundProcess()
+				if getattr(process, 'pid', None):
+					self.__monitor = threading.Thread(target=self.__monitorProcess, args=[process],
+						name='pysysjava.launchtimings.%s'%self.displayName, daemon=True)
+					JavaLaunchTimings.getInstance(self.runner).pending.add(self)
+					self.__monitor.start()
+			def stopAndComplete(*args, **kwargs):
+				# so that background processes stopped during cleanup are recorded before the test completes
+				try:
+					return stop(*args, **kwargs)
+				finally:
+					self.waitForCompletion()
+			process.startBackgroundProcess, process.stop = startAndMonitor, stopAndComplete
+			return process
+		return factory
+
+	def __monitorProcess(self, process):
+		spawned = time.monotonic()
+		interval = 0.005
+		while True:
+			if not any(s[0] == 'firstOutput' for s in self.spans) and process.stdout and os.path.exists(process.stdout) and os.path.getsize(process.stdout) > 0:
+				self.spans.append(('firstOutput', spawned-self.__start, time.monotonic()-spawned))
+			rss = _readPeakRSSMB(process.pid)
+			if rss is not None: self.peakRSSMB = rss
+			if self.__stopping.is_set() or not process.running(): break
+			self.__stopping.wait(interval)
+			interval = min(interval*1.5, self.MAX_POLL_INTERVAL_SECS)
+		self.spans.append(('run', spawned-self.__start, time.monotonic()-spawned))
+		self.exitStatus = process.exitStatus
+		if self.exitStatus is not None: self.__complete()
+
+	def processStarted(self, process, background):
+		"""
+		Called after `pysys.basetest.BaseTest.startProcess` returns or raises an exception (with process=None). For
+		foreground processes (and background processes that failed to start) this completes the timing; for background
+		processes that are running it is completed by the monitor thread when the process exits.
+		"""
+		self.background = background and process is not None
+		if background and self.__monitor is not None: return
+		self.__stopping.set()
+		if self.__monitor is not None:
+			self.__monitor.join()
+		if process is not None: self.exitStatus = process.exitStatus
+		self.__complete()
+
+	def waitForCompletion(self, timeout=None):
+		"""
+		Wait for the monitor thread to notice that the process has exited. 
+		"""
+		if self.__monitor is not None and self.__monitor is not threading.current_thread(): self.__monitor.join(timeout)
+
+	def __complete(self):
+		if self.__completed: return
+		self.__completed = True
+		self.durationSecs = time.monotonic()-self.__start
+		if self.startupTimeLog: self.jvmStartupSecs = parseStartupTimeLog(self.startupTimeLog)
+		JavaLaunchTimings.getInstance(self.runner).add(self)
+
+	def getSpanSecs(self, name):
+		"""
+		Returns the duration of the span with the specified name, or None if it was not recorded.
+		"""
+		return next((s[2] for s in self.spans if s[0] == name), None)
+
+	def toJSON(self):
+		"""
+		Returns a dictionary containing the timing information, suitable for serialization as JSON.
+		"""
+		return {
+			'displayName': self.displayName,
+			'kind': self.kind,
+			'testId': self.ownerId,
+			'thread': self.thread,
+			'startTime': self.startTime,
+			'durationSecs': self.durationSecs,
+			'exitStatus': self.exitStatus,
+			'background': self.background,
+			'peakRSSMB': self.peakRSSMB,
+			'jvmStartupSecs': self.jvmStartupSecs,
+			'spans': [{'name': name, 'startSecs': start, 'durationSecs': duration} for name, start, duration in self.spans],
+		}
+
+class JavaLaunchTimings(object):
+	"""
+	The launch timings for all tests in the run, which writes the per-test and run-level JSON files and logs a report
+	of the slowest launches at the end of the run.
+
+	This class is thread-safe.
+	"""
+
+	SLOWEST_LAUNCHES_TO_LOG = 10
+	"""The number of launches included in the report at the end of the run. """
+
+	__instancesLock = threading.Lock()
+
+	def __init__(self, runner):
+		self.runner = runner
+		self.__lock = threading.Lock()
+		self.launches = []
+		"""The completed `JavaLaunchTiming` objects. """
+		self.listeners = []
+		"""Functions that are called with each `JavaLaunchTiming` as it is completed. """
+		self.pending = set() # background launches that have not completed yet
+
+	@staticmethod
+	def getInstance(runner):
+		"""
+		Get the instance for this runner, creating it if needed.
+		"""
+		with JavaLaunchTimings.__instancesLock:
+			timings = getattr(runner, '_pysysjava_launchTimings', None)
+			if timings is None:
+				timings = runner._pysysjava_launchTimings = JavaLaunchTimings(runner)
+				runner.addCleanupFunction(timings.writeReport)
+			return timings
+
+	def addListener(self, listener):
+		"""
+		Add a function to be called with each `JavaLaunchTiming` as it is completed. It is also called immediately for
+		any launches that have already completed.
+		"""
+		with self.__lock:
+			self.listeners.append(listener)
+			launches = list(self.launches)
+		for timing in launches: listener(timing)
+
+	def waitForPending(self):
+		"""
+		Wait (briefly) for background launches whose process has been stopped to be completed.
+		"""
+		for timing in list(self.pending): timing.waitForCompletion(timeout=JavaLaunchTiming.MAX_POLL_INTERVAL_SECS*5)
+
+	def add(self, timing):
+		"""
+		Add a completed launch, and write the JSON file for the test that started it.
+		"""
+		with self.__lock:
+			self.launches.append(timing)
+			self.pending.discard(timing)
+			ownerLaunches = [t.toJSON() for t in self.launches if t.owner is timing.owner]
+			if hasattr(timing.owner, 'descriptor') and os.path.isdir(toLongPathSafe(timing.owner.output)):
+				with open(toLongPathSafe(os.path.join(timing.owner.output, 'java-launch-timings.json')), 'w', encoding='utf-8') as f:
+					json.dump(ownerLaunches, f, indent='\t')
+			listeners = list(self.listeners)
+		for listener in listeners: listener(timing)
+
+	def writeReport(self):
+		"""
+		Log the slowest launches, and write the timings for all launches to the runner output directory.
+		"""
+		self.waitForPending()
+		with self.__lock:
+			launches = sorted(self.launches, key=lambda t: t.startTime)
+		if not launches: return
+		path = os.path.join(mkdir(self.runner.output), 'java-launch-timings.json')
+		with open(toLongPathSafe(path), 'w', encoding='utf-8') as f:
+			json.dump([t.toJSON() for t in launches], f, indent='\t')
+
+		def formatSecs(secs): return '-' if secs is None else '%0.2f'%secs
+		log.info('Slowest %d of %d Java launches (total/JVM startup/first output secs, peak RSS MB):',
+			min(self.SLOWEST_LAUNCHES_TO_LOG, len(launches)), len(launches))
+		for t in sorted(launches, key=lambda t: -t.durationSecs)[:self.SLOWEST_LAUNCHES_TO_LOG]:
+			log.info('   %6s %6s %6s %6s  %s [%s]', formatSecs(t.durationSecs), formatSecs(t.jvmStartupSecs.get('Create VM')),
+				formatSecs(t.getSpanSecs('firstOutput')), '-' if t.peakRSSMB is None else '%d'%t.peakRSSMB, t.displayName, t.ownerId)
+		log.info('Java launch timings written to: %s', path)
@@ -0,0 +1,267 @@
+"""
+Writer that captures Java Flight Recorder (JFR) profiling data from the Java processes started by PySys tests, and
+summarizes the hot methods, garbage collection pauses and allocation rate of each process.
+
+"""
+
+__all__ = [
+	"JavaProfilingWriter",
+	"summarizeJFRPrintJSON",
+]
+
+import os
+import re
+import json
+import logging
+import datetime
+import threading
+import collections
+
+from pysys.constants import *
+from pysys.writer.api import BaseResultsWriter
+from pysys.utils.fileutils import toLongPathSafe
+
+log = logging.getLogger('pysys.pysysjava.profiling')
+
+JFR_SUMMARY_EVENTS = ['jdk.ExecutionSample', 'jdk.GarbageCollection', 'jdk.ObjectAllocationSample',
+	'jdk.ObjectAllocationInNewTLAB', 'jdk.ObjectAllocationOutsideTLAB']
+"""The JFR event types read from each recording to produce the summary. """
+
+_ISO_DURATION_REGEX = re.compile(r'^(-)?PT(?:([0-9]+)H)?(?:([0-9]+)M)?(?:([0-9.]+)S)?$')
+_ISO_TIMESTAMP_REGEX = re.compile(r'^([0-9]{4}-[0-9]{2}-[0-9]{2}T[0-9]{2}:[0-9]{2}:[0-9]{2})([.][0-9]+)?(Z|[+-][0-9]{2}:?[0-9]{2})?$')
+
+def _parseDurationSecs(value):
+	# jfr print --json writes durations in ISO-8601 format such as "PT0.0123S"
+	if isinstance(value, (int, float)): return float(value)
+	m = _ISO_DURATION_REGEX.match(value or '')
+	if not m: return 0.0
+	secs = int(m.group(2) or 0)*3600+int(m.group(3) or 0)*60+float(m.group(4) or 0)
+	return -secs if m.group(1) else secs
+
+def _parseTimestamp(value):
+	# avoids datetime.fromisoformat which (before Python 3.11) does not accept nanoseconds or a "Z" suffix
+	m = _ISO_TIMESTAMP_REGEX.match(value or '')
+	if not m: return None
+	t = datetime.datetime.strptime(m.group(1), '%Y-%m-%dT%H:%M:%S').replace(tzinfo=datetime.timezone.utc).timestamp()
+	t += float(m.group(2) or 0)
+	offset = m.group(3)
+	if offset and offset != 'Z':
+		offset = offset.replace(':', '')
+		t -= (1 if offset[0] == '+' else -1)*(int(offset[1:3])*3600+int(offset[3:5])*60)
+	return t
+
+def _getFrameName(frame):
+	method = frame.get('method') or {}
+	return '%s.%s'%(((method.get('type') or {}).get('name') or '?').replace('/', '.'), method.get('name') or '?')
+
+def summarizeJFRPrintJSON(data, hotMethods=10):
+	"""
+	Create a summary of a Java Flight Recording, from the output of ``jfr print --json``.
+
+	:param dict data: The parsed JSON. Only the event types in `JFR_SUMMARY_EVENTS` are used.
+	:param int hotMethods: The number of hot methods to include.
+	:return dict: A dictionary with keys ``durationSecs`` (the time between the first and last event),
+		``executionSamples``, ``hotMethods`` (a list of dicts with keys ``method``, ``samples`` and ``percent``,
+		based on the top stack frame of each execution sample), ``gcCount``, ``gcTotalPauseSecs``,
+		``gcLongestPauseSecs``, ``allocatedMB`` and ``allocationRateMBPerSec`` (None if no allocation events were
+		recorded).
+	"""
+	samples = collections.Counter()
+	gcCount, gcTotalPauseSecs, gcLongestPauseSecs = 0, 0.0, 0.0
+	allocatedBytes, allocationEvents = 0, 0
+	firstTime = lastTime = None
+	for event in (data.get('recording') or {}).get('events') or []:
+		eventType, values = event.get('type'), event.get('values') or {}
+		t = _parseTimestamp(values.get('startTime'))
+		if t is not None:
+			firstTime = t if firstTime is None else min(firstTime, t)
+			lastTime = t if lastTime is None else max(lastTime, t)
+
+		if eventType == 'jdk.ExecutionSample':
+			frames = (values.get('stackTrace') or {}).get('frames') or []
+			if frames: samples[_getFrameName(frames[0])] += 1
+		elif eventType == 'jdk.GarbageCollection':
+			gcCount += 1
+			gcTotalPauseSecs += _parseDurationSecs(values.get('sumOfPauses'))
+			gcLongestPauseSecs = max(gcLongestPauseSecs, _parseDurationSecs(values.get('longestPause')))
+		elif eventType == 'jdk.ObjectAllocationSample':
+			allocationEvents += 1
+			allocatedBytes += values.get('weight') or 0
+		elif eventType == 'jdk.ObjectAllocationInNewTLAB':
+			allocationEvents += 1
+			allocatedBytes += values.get('tlabSize') or 0
+		elif eventType == 'jdk.ObjectAllocationOutsideTLAB':
+			allocationEvents += 1
+			allocatedBytes += values.get('allocationSize') or 0
+
+	durationSecs = (lastTime-firstTime) if firstTime is not None else 0.0
+	totalSamples = sum(samples.values())
+	return {
+		'durationSecs': durationSecs,
+		'executionSamples': totalSamples,
+		'hotMethods': [{'method': method, 'samples': count, 'percent': 100.0*count/totalSamples}
+			for method, count in sorted(samples.items(), key=lambda x: (-x[1], x[0]))[:hotMethods]],
+		'gcCount': gcCount,
+		'gcTotalPauseSecs': gcTotalPauseSecs,
+		'gcLongestPauseSecs': gcLongestPauseSecs,
+		'allocatedMB': allocatedBytes/1024.0/1024.0 if allocationEvents else None,
+		'allocationRateMBPerSec': allocatedBytes/1024.0/1024.0/durationSecs if allocationEvents and durationSecs > 0 else None,
+	}
+
+class JavaProfilingWriter(BaseResultsWriter):
+	"""Writer that adds Java Flight Recorder (JFR) profiling to the Java processes started by each test, and writes
+	a summary of each recording to the test output directory.
+
+	Requires a JDK that includes JFR and the ``jfr`` command line tool (such as Java 11+).
+
+	To enable this, add the writer to your pysysproject.xml with the alias ``javaProfilingWriter`` and run with
+	``-XjavaProfile=jfr`` (or set the ``profiler`` property)::
+
+		<writer classname="pysysjava.profiling.JavaProfilingWriter" alias="javaProfilingWriter">
+			<property name="jfrSettings" value="profile"/>
+		</writer>
+
+	When enabled, the `getProfilingJVMArgs` method is used by `pysysjava.javaplugin.JavaPlugin.startJava` to add
+	``-XX:StartFlightRecording`` to each Java process, which writes a ``<stdouterr>.jfr`` file to the test output
+	directory when the process exits. Profiling can be disabled for individual processes by passing
+	``disableProfiling=True`` to ``startJava``, or for a test or directory by setting ``self.disableJavaProfiling``
+	or adding the ``disableJavaProfiling`` group to the ``pysystest.xml``.
+
+	During test cleanup (after the test's own cleanup functions have executed), any profiled background processes
+	that are still running are stopped so that their recordings are written, and then each recording is converted
+	using ``jfr print`` and summarized into ``java-profiling-summary.json`` in the test output directory (see
+	`summarizeJFRPrintJSON` for the contents). A one-line summary of each process is also logged. The ``.jfr`` files
+	can be opened with JDK Mission Control for more detailed analysis.
+
+	The following properties can be set in the project configuration for this writer:
+	"""
+
+	profiler = ''
+	"""
+	The profiler to use, which can also be set with ``-XjavaProfile=``. Currently the only supported value is ``jfr``.
+	The default empty value disables profiling.
+	"""
+
+	jfrSettings = 'profile'
+	"""
+	The JFR settings to record with, which is the name of a settings file in the JDK's ``lib/jfr`` directory such as
+	``default`` (low overhead) or ``profile`` (more detail including allocation events), or the path of a ``.jfc``
+	file. Can be overridden for a run with ``-XjavaProfileSettings=``.
+	"""
+
+	jfrOptions = ''
+	"""
+	A comma-separated string of additional ``-XX:StartFlightRecording`` options, for example ``maxsize=100m``.
+	"""
+
+	hotMethods = 10
+	"""
+	The number of hot methods to include in the summary of each recording.
+	"""
+
+	def isEnabled(self, record=False, **kwargs):
+		self.profiler = self.runner.getXArg('javaProfile', self.profiler)
+		if not self.profiler: return False
+		if self.profiler != 'jfr': raise Exception('Unsupported JavaProfilingWriter profiler value: "%s"'%self.profiler)
+		return True
+
+	def setup(self, **kwargs):
+		self.jfrSettings = self.runner.getXArg('javaProfileSettings', self.jfrSettings)
+		self.hotMethods = int(self.hotMethods)
+		self.jfrExecutable = os.path.normpath(self.runner.project.javaHome+'/bin/jfr'+('.exe' if IS_WINDOWS else ''))
+		if not os.path.exists(self.jfrExecutable):
+			log.warning('Java profiling summaries will not be generated as the jfr tool does not exist: %s', self.jfrExecutable)
+		self.__lock = threading.Lock()
+		self.recordings = 0
+		log.info('Java profiling is enabled using JFR with settings=%s', self.jfrSettings)
+
+	def isProfilingDisabled(self, owner):
+		"""
+		Returns True if profiling has been disabled for the specified owner, by setting ``disableJavaProfiling`` or
+		using the ``disableJavaProfiling`` group.
+		"""
+		return getattr(owner, 'disableJavaProfiling', False) or (
+			'disableJavaProfiling' in getattr(getattr(owner, 'descriptor', None), 'groups', []))
+
+	def getProfilingJVMArgs(self, owner, stdouterr=None):
+		"""
+		Get the JVM arguments needed to profile a new Java process, or empty if profiling is not enabled for this
+		owner. Only processes owned by tests are profiled.
+
+		This is called by `pysysjava.javaplugin.JavaPlugin.startJava` (and any custom methods that start JVMs)
+		to add profiling.
+
+		:param pysys.basetest.BaseTest owner: The BaseTest owner of the process that is to be started.
+		:param str stdouterr: The name of the stdouterr for the process being profiled (or None if not available), used
+			to name the recording file.
+		"""
+		if getattr(owner, 'descriptor', None) is None or self.isProfilingDisabled(owner): return []
+
+		# pick a unique name for the recording
+		name = os.path.basename(stdouterr[0] if isinstance(stdouterr, tuple) else stdouterr) if stdouterr else 'java'
+		if name.endswith('.out'): name = name[:-4]
+		recordings = getattr(owner, '__JavaProfilingWriter.recordings', None)
+		if recordings is None:
+			recordings = []
+			setattr(owner, '__JavaProfilingWriter.recordings', recordings)
+			# registered when the first process is started, so it runs after any cleanup functions added later
+			owner.addCleanupFunction(lambda: self.summarizeRecordings(owner, recordings))
+		path, n = os.path.join(owner.output, name+'.jfr'), 1
+		while path in recordings: n, path = n+1, os.path.join(owner.output, '%s.%d.jfr'%(name, n))
+		recordings.append(path)
+
+		options = 'settings=%s,filename=%s,dumponexit=true'%(self.jfrSettings, path)
+		if self.jfrOptions: options += ','+self.jfrOptions
+		return ['-XX:StartFlightRecording=%s'%options]
+
+	def summarizeRecordings(self, owner, recordings):
+		"""
+		Summarize the JFR recordings of the specified test, writing ``java-profiling-summary.json`` to its output
+		directory. This is called automatically during test cleanup.
+
+		:param pysys.basetest.BaseTest owner: The test.
+		:param list[str] recordings: The paths of the ``.jfr`` files.
+		"""
+		if any(not os.path.exists(toLongPathSafe(p)) for p in recordings):
+			# the recordings of background processes are only written when they exit
+			for process in list(owner.processList):
+				if process.running() and os.path.basename(process.command).split('.')[0] == 'java':
+					owner.log.debug('Stopping %s so that its Java profiling data is written', process)
+					process.stop()
+
+		if not os.path.exists(self.jfrExecutable): return
+		summaries = []
+		for path in recordings:
+			if not os.path.exists(toLongPathSafe(path)):
+				owner.log.info('No Java profiling data was written to %s', os.path.basename(path))
+				continue
+			name = os.path.basename(path)[:-4]
+			process = owner.startProcess(self.jfrExecutable, ['print', '--json', '--stack-depth', '1',
+					'--events', ','.join(JFR_SUMMARY_EVENTS), path],
+				stdouterr=owner.allocateUniqueStdOutErr(name+'.jfrprint'), displayName='jfr print %s'%name,
+				abortOnError=False, ignoreExitStatus=True, quiet=True)
+			try:
+				if process.exitStatus != 0: raise Exception(owner.grepOrNone(process.stderr, '.+') or 'jfr exit status %s'%process.exitStatus)
+				with open(toLongPathSafe(process.stdout), 'r', encoding='utf-8') as f:
+					summary = summarizeJFRPrintJSON(json.load(f), hotMethods=self.hotMethods)
+			except Exception as ex:
+				owner.log.warning('Failed to summarize Java profiling data from %s: %s', os.path.basename(path), ex)
+				continue
+			for p in [process.stdout, process.stderr]: os.remove(toLongPathSafe(p)) # can be very large
+			summary = dict(recording=os.path.basename(path), **summary)
+			summaries.append(summary)
+
+			hottest = summary['hotMethods'][0] if summary['hotMethods'] else None
+			owner.log.info('Java profile of %s: hottest method %s; %d GC pauses totalling %0.3f secs; allocation rate %s',
+				name, '%s (%0.0f%% of samples)'%(hottest['method'], hottest['percent']) if hottest else 'unknown',
+				summary['gcCount'], summary['gcTotalPauseSecs'], 'unknown' if summary['allocationRateMBPerSec'] is None
+					else '%0.1f MB/s'%summary['allocationRateMBPerSec'])
+
+		if summaries:
+			with open(toLongPathSafe(os.path.join(owner.output, 'java-profiling-summary.json')), 'w', encoding='utf-8') as f:
+				json.dump(summaries, f, indent='\t')
+			with self.__lock:
+				self.recordings += len(summaries)
+
+	def cleanup(self, **kwargs):
+		if self.recordings: log.info('Java profiling summaries were written for %d processes', self.recordings)
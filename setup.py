@@ -73,11 +73,12 @@ setup(
 	python_requires=">=3.7, <4",
 
 	install_requires=[
-		"PySys >= 1.6.1"
+		"PySys >= 2.0"
 	],
 	
 	packages=setuptools.find_packages(),
 	include_package_data=True,
+	package_data={'pysysjava': ['java/pysysjava/internal/*.java', 'java/META-INF/services/*']},
 
 )
 	
\ No newline at end of file
@@ -0,0 +1,51 @@
+import zipfile
+
+import pysys
+from pysys.constants import *
+from pysys.basetest import BaseTest
+
+from pysysjava.appcds import AppCDSArchiveCache
+
+class PySysTest(BaseTest):
+	def execute(self):
+		if not AppCDSArchiveCache.isSupported(self.project.javaHome): 
+			self.skipTest('Dynamic AppCDS archives require Java 13+')
+
+		self.java.appCDSCacheDir = self.output+'/cds'
+		self.java.compile(output='javaclasses')
+		self.createJar('hello.jar')
+		for i in range(3):
+			self.java.startJava('myorg.HelloWorld', ["Hi there %d!"%i], stdouterr='java-hello%d'%i, classpath='hello.jar')
+
+		# changing the contents of a classpath jar should result in a new archive
+		self.createJar('hello.jar', extraEntry='extra.txt')
+		self.java.startJava('myorg.HelloWorld', ["Hi there changed!"], stdouterr='java-hello-changed', classpath='hello.jar')
+
+		# as should different JVM arguments
+		self.java.startJava('myorg.HelloWorld', ["Hi there serial!"], stdouterr='java-hello-serial', classpath='hello.jar',
+			jvmArgs=self.java.defaultJVMArgs+['-XX:+UseSerialGC'])
+
+		# classes in directories cannot be archived
+		self.java.startJava('myorg.HelloWorld', ["Hi there dir!"], stdouterr='java-hello-dir', classpath='javaclasses')
+
+	def createJar(self, jar, extraEntry=None):
+		with zipfile.ZipFile(self.output+'/'+jar, 'w') as z:
+			z.write(self.output+'/javaclasses/myorg/HelloWorld.class', 'myorg/HelloWorld.class')
+			if extraEntry: z.writestr(extraEntry, 'Extra')
+
+	def validate(self):
+		self.assertThat('len(archives) == 3', archives=[f for f in os.listdir(self.output+'/cds') if f.endswith('.jsa')])
+		self.assertLineCount('run.log', 'using AppCDS archive', condition='==2')
+		self.assertGrep('run.log', 'AppCDS archive was not created', contains=False)
+		self.assertThatGrep('run.log', 'AppCDS archives will not be used for Java processes with this directory on the classpath.*: (.*)', 
+			'os.path.basename(value) == expected', expected='javaclasses')
+		self.assertGrep('java-hello-dir.out', 'ArchiveClassesAtExit|SharedArchiveFile', contains=False)
+		# if the process did not write the archive (e.g. it failed) the key must not stay pending, or be retried
+		cache, key = AppCDSArchiveCache(self.output+'/cds-unit'), 'a'*64
+		self.assertThat('creating', creating=cache.getJVMArgs(key)[1])
+		self.assertThat('not created', created=cache.archiveCreated(key, None))
+		self.assertThat('retryArgs == ([], False)', retryArgs=cache.getJVMArgs(key))
+
+		self.assertGrep('java-hello2.out', "Hello world - 'Hi there 2!'")
+		self.assertGrep('java-hello-changed.out', "Hello world - 'Hi there changed!'")
+		self.assertGrep('java-hello-dir.out', "Hello world - 'Hi there dir!'")
@@ -0,0 +1,15 @@
+import pysys
+from pysys.constants import *
+from pysys.basetest import BaseTest
+
+class PySysTest(BaseTest):
+	def execute(self):
+		self.java.compile(output='javaclasses')
+		self.java.startJava('myorg.HelloWorld', ['Hi there!'], stdouterr='java-hello', classpath='javaclasses')
+
+		server = self.java.startJava('myorg.MyServer', [], stdouterr='my_server', classpath='javaclasses', background=True)
+		self.waitForGrep('my_server.out', 'Server started')
+		self.wait(0.5)
+
+	def validate(self):
+		self.addOutcome(PASSED)
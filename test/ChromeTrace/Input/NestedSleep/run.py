@@ -0,0 +1,10 @@
+import pysys
+from pysys.constants import *
+from pysys.basetest import BaseTest
+
+class PySysTest(BaseTest):
+	def execute(self):
+		self.wait(1.0)
+
+	def validate(self):
+		self.addOutcome(PASSED)
@@ -0,0 +1,43 @@
+import json
+import glob
+
+import pysys
+from pysys.constants import *
+from pysys.basetest import BaseTest
+
+class PySysTest(BaseTest):
+	def execute(self):
+		self.copy(self.input, self.output+'/testroot')
+		self.pysys.runPySys(['run', '--threads=2'], stdouterr='pysys-run', workingDir=self.output+'/testroot', background=False)
+
+	def validate(self):
+		self.assertGrep('pysys-run.out', 'THERE WERE NO FAILURES')
+		self.assertThatGrep('pysys-run.out', 'Java trace written to: .*(java-trace.json)', expected='java-trace.json')
+
+		with open(glob.glob(self.output+'/testroot/__pysys_runner*/java-trace.json')[0], 'r', encoding='utf-8') as f:
+			events = json.load(f)['traceEvents']
+		threads = {e['tid']: e['args']['name'] for e in events if e['name'] == 'thread_name'}
+		self.assertThat('threads == expected', threads=sorted(threads.values()), expected=['PySysWorker-01', 'PySysWorker-02'])
+
+		tests = {e['name']: e for e in events if e.get('cat') == 'test'}
+		self.assertThat('tests == expected', tests=sorted(tests), expected=['NestedJava', 'NestedSleep'])
+		self.assertThat('testsOnDifferentThreads', testsOnDifferentThreads=tests['NestedJava']['tid'] != tests['NestedSleep']['tid'])
+		self.assertThat('sleepDurationMicros >= 1000000', sleepDurationMicros=tests['NestedSleep']['dur'])
+
+		# launches are on the same track as the test that started them
+		launches = [(e['ph'], e['cat'], e['name']) for e in events if e.get('cat') in ['java', 'javac']]
+		self.assertThat('launches == expected', launches=launches, expected=[
+			('X', 'javac', 'javac<Input => javaclasses>'),
+			('X', 'java', 'java java-hello'),
+			('X', 'java', 'java my_server'),
+			('b', 'java', 'java my_server'),
+			('e', 'java', 'java my_server'),
+		])
+		self.assertThat('launchThreads == expected', launchThreads={threads[e['tid']] for e in events if e.get('cat') in ['java', 'javac', 'launch']},
+			expected={threads[tests['NestedJava']['tid']]})
+		hello = next(e for e in events if e['name'] == 'java java-hello')
+		self.assertThat('helloArgs == expected', helloArgs=(hello['args']['testId'], hello['args']['exitStatus']), expected=('NestedJava', 0))
+		helloSpans = [e['name'] for e in events if e.get('cat') == 'launch' and hello['ts'] <= e['ts'] <= hello['ts']+hello['dur']]
+		self.assertThat('set(expected) <= set(helloSpans)', helloSpans=helloSpans, expected=['classpath', 'spawn', 'firstOutput', 'run'])
+		self.assertThat('serverRunMicros >= 500000', serverRunMicros=
+			next(e['ts'] for e in events if e['ph'] == 'e')-next(e['ts'] for e in events if e['ph'] == 'b'))
@@ -0,0 +1,37 @@
+import pysys
+from pysys.constants import *
+from pysys.basetest import BaseTest
+
+class PySysTest(BaseTest):
+	def execute(self):
+		self.java.compileCacheDir = self.output+'/cache'
+
+		self.java.compile(output='javaclasses1') # miss
+		self.java.compile(output='javaclasses2') # hit
+		self.java.compile(output='javaclasses3', arguments=['-g', '-nowarn']) # miss due to different args
+
+		# changing the source contents should result in a miss
+		self.copy(self.input, self.output+'/changed-src')
+		self.write_text(self.output+'/changed-src/myorg/Extra.java', 'package myorg; class Extra {}')
+		self.java.compile(self.output+'/changed-src', output='javaclasses4') # miss
+
+		self.java.startJava('myorg.HelloWorld', ["Hi there!"], stdouterr='java-hello', classpath='javaclasses2')
+
+		# relative classpath entries are resolved against the output dir, so changing their contents results in a miss
+		self.java.compile(output='javaclasses-cp1', classpath='javaclasses1') # miss
+		self.java.compile(output='javaclasses-cp2', classpath='javaclasses1') # hit
+		self.write_text(self.output+'/javaclasses1/myorg/Extra.class', 'changed')
+		self.java.compile(output='javaclasses-cp3', classpath='javaclasses1') # miss
+
+		# a tiny cache size will cause all entries to be evicted when the next one is added
+		self.java.compileCacheMaxSizeMB = 0.0
+		self.java.compile(output='javaclasses5', arguments=['-g:none']) # miss
+		self.java.compile(output='javaclasses6') # miss, since it was evicted
+
+	def validate(self):
+		self.assertThat('cacheResults == expected', cacheResults=self.getExprFromFile('run.log',
+			'Java compilation cache (hit|miss) for', returnAll=True), expected=[
+				'miss', 'hit', 'miss', 'miss', 'miss', 'hit', 'miss', 'miss', 'miss'])
+		self.assertGrep('java-hello.out', "Hello world - 'Hi there!'")
+		for i in range(1, 7):
+			self.assertPathExists('javaclasses%d/myorg/HelloWorld.class'%i)
@@ -0,0 +1,62 @@
+import stat
+import threading
+
+import pysys
+from pysys.constants import *
+
+from pysysjava.compilecache import JavaCompileCache
+
+class BlockingCompileCache(JavaCompileCache):
+	"""Pauses while materializing, so we can check what happens when an entry is evicted while it's being copied. """
+	def __init__(self, *args, **kwargs):
+		super().__init__(*args, **kwargs)
+		self.copying, self.resume = threading.Event(), threading.Event()
+	
+	def _JavaCompileCache__materialize(self, entry, output, stderr):
+		self.copying.set()
+		self.resume.wait(60)
+		return super()._JavaCompileCache__materialize(entry, output, stderr)
+
+class PySysTest(pysys.basetest.BaseTest):
+	def execute(self):
+		self.write_text(self.mkdir(self.output+'/javaclasses/myorg')+'/MyClass.class', 'original')
+		self.write_text('javac.err', '')
+		
+		# by default classes are copied, so modifying them doesn't affect the cache
+		cache = JavaCompileCache(self.output+'/cache', maxSizeMB=10)
+		cache.store('aa01', self.output+'/javaclasses', self.output+'/javac.err')
+		cache.materialize('aa01', self.output+'/copied', self.output+'/copied.err')
+		self.copiedMode = os.stat(self.output+'/copied/myorg/MyClass.class').st_mode
+		self.write_text('copied/myorg/MyClass.class', 'modified')
+		cache.materialize('aa01', self.output+'/copied2', self.output+'/copied2.err')
+
+		# hard linked classes are read-only
+		linkingCache = JavaCompileCache(self.output+'/cache', maxSizeMB=10, useHardLinks=True)
+		linkingCache.materialize('aa01', self.output+'/linked', self.output+'/linked.err')
+		self.linkedMode = os.stat(self.output+'/linked/myorg/MyClass.class').st_mode
+
+		# an entry that's being copied is not evicted, but is once the copy has finished
+		blockingCache = BlockingCompileCache(self.output+'/cache', maxSizeMB=10)
+		materialized = []
+		t = threading.Thread(target=lambda: materialized.append(
+			blockingCache.materialize('aa01', self.output+'/blocked', self.output+'/blocked.err')))
+		t.start()
+		blockingCache.copying.wait(60)
+		blockingCache.maxSizeBytes = 0
+		blockingCache.evict()
+		self.existsWhilePinned = os.path.exists(self.output+'/cache/aa/aa01')
+		blockingCache.resume.set()
+		t.join()
+		self.materialized = materialized
+		blockingCache.evict()
+		self.existsAfterEviction = os.path.exists(self.output+'/cache/aa/aa01')
+
+	def validate(self):
+		self.assertThat('copiedMode & writeMode != 0', copiedMode=self.copiedMode, writeMode=stat.S_IWUSR)
+		self.assertThat('cachedClass == expected', cachedClass__eval="open(self.output+'/copied2/myorg/MyClass.class').read()", expected='original')
+		self.assertThat('linkedMode & writeMode == 0', linkedMode=self.linkedMode, writeMode=stat.S_IWUSR|stat.S_IWGRP|stat.S_IWOTH)
+
+		self.assertThat('existsWhilePinned', existsWhilePinned=self.existsWhilePinned)
+		self.assertThat('materialized == [True]', materialized=self.materialized)
+		self.assertThat('blockedClass == expected', blockedClass__eval="open(self.output+'/blocked/myorg/MyClass.class').read()", expected='original')
+		self.assertThat('not existsAfterEviction', existsAfterEviction=self.existsAfterEviction)
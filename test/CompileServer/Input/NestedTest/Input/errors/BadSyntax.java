@@ -0,0 +1,7 @@
+public class BadSyntax
+{
+	public static void main(String[] args)
+	{
+		org.nonexistent.Foo x = null;
+	}
+}
@@ -0,0 +1,9 @@
+package myorg;
+
+public class HelloWorld
+{
+	public static void main(String[] args)
+	{
+		System.out.println("Hello world - '"+args[0]+"'");
+	}
+}
\ No newline at end of file
@@ -0,0 +1,31 @@
+import pysys
+from pysys.constants import *
+from pysys.basetest import BaseTest
+
+class PySysTest(BaseTest):
+	def execute(self):
+		server = self.runner.javaCompileServer
+		self.assertThat('serverAvailable == expected', serverAvailable=server.isAvailable(), 
+			expected=self.runner.getXArg('javaCompileServer', True))
+
+		self.java.compile('myorg', output='javaclasses')
+		self.java.startJava('myorg.HelloWorld', ["Hi there!"], stdouterr='java-hello', classpath='javaclasses')
+		if not server.isAvailable(): return
+
+		try:
+			self.java.compile('errors', output='errors')
+		except pysys.exceptions.AbortExecution as ex:
+			self.addOutcome(PASSED, override=True)
+			self.assertThat('expected in compilationErrorMessage', expected='BadSyntax.java', compilationErrorMessage=str(ex))
+		else:
+			self.addOutcome(FAILED, 'Expected failure due to compilation error')
+
+		# if the server dies we should fall back to executing javac directly
+		server.process.stop()
+		self.java.compile('myorg', output='javaclasses-fallback')
+		self.assertThat('not serverAvailable', serverAvailable=server.isAvailable())
+
+	def validate(self):
+		self.assertGrep('java-hello.out', "Hello world - 'Hi there!'")
+		if self.runner.getXArg('javaCompileServer', True):
+			self.assertPathExists('javaclasses-fallback/myorg/HelloWorld.class')
@@ -0,0 +1,23 @@
+import pysys
+from pysys.constants import *
+
+class PySysTest(pysys.basetest.BaseTest):
+	def execute(self):
+		self.copy(self.input, self.output+'/testroot')
+		self.pysys.runPySys(['run', '-o', self.output+'/myoutdir'], 
+			stdouterr='pysys', workingDir=self.output+'/testroot', background=False)
+		self.pysys.runPySys(['run', '-o', self.output+'/disabled', '-XjavaCompileServer=false'], 
+			stdouterr='pysys-disabled', workingDir=self.output+'/testroot', background=False)
+
+	def validate(self):
+		self.assertGrep('pysys.out', 'Started java compile-server with process id')
+		self.assertGrep('pysys.out', 'Failed to start Java compile server', contains=False)
+		self.assertGrep('myoutdir/NestedTest/run.log', 'Executed javac<myorg => javaclasses>, exit status 0')
+		self.assertGrep('myoutdir/NestedTest/run.log', 'Executed javac<errors => errors>, exit status 1')
+
+		# diagnostics are written to the usual javac stderr file
+		self.assertGrep('myoutdir/NestedTest/javac.errors.err', 'org.nonexistent')
+
+		self.assertGrep('pysys-disabled.out', 'Java compile server is disabled for this run')
+		self.assertGrep('pysys-disabled.out', 'Started java compile-server with process id', contains=False)
+		self.assertGrep('disabled/NestedTest/run.log', 'Executed javac<myorg => javaclasses>, exit status 0')
@@ -19,6 +19,7 @@ class PySysTest(pysys.basetest.BaseTest):
 		self.assertPathExists(htmldir+'/jacoco-merged-java-coverage.exec')
 		self.assertPathExists(htmldir+'/java-coverage.xml')
 		self.assertPathExists(htmldir+'/JavaCoverage.zip')
+		self.assertThat('coverageFiles == []', coverageFiles=[f for f in os.listdir(self.output+'/'+htmldir) if f.endswith('.javacoverage')])
 
 		# Check we passed the agent params including the space characters correctly
 		self.assertGrep(htmldir+'/index.html', 'My amazing report')
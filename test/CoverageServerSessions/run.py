@@ -0,0 +1,76 @@
+import socket
+import threading
+import time
+
+import pysys
+from pysys.constants import *
+
+from pysysjava import jacocoexec
+from pysysjava.coverage import _CoverageServer
+
+class FakeAgent(object):
+	"""Connects to the server like a JaCoCo agent with output=tcpclient, optionally without ever responding. """
+	def __init__(self, port, sessionId, respond=True):
+		self.store = jacocoexec.ExecutionDataStore()
+		self.store.sessions.append(jacocoexec.SessionInfo(sessionId, 1000, 2000))
+		self.store.classes[123] = jacocoexec.ExecutionData(123, 'myorg/'+sessionId.split('.')[0], 8, b'\x03')
+		self.respond = respond
+		self.commandsReceived = 0
+		self.firstCommand = threading.Event()
+		self.sock = socket.create_connection(('127.0.0.1', port))
+		self.thread = threading.Thread(target=self.run, daemon=True)
+		self.thread.start()
+
+	def run(self):
+		try:
+			with self.sock.makefile('rb') as stream:
+				assert stream.read(5) == jacocoexec.getHeader()
+				while True:
+					block = jacocoexec.readBlock(stream)
+					if block is None: return
+					self.commandsReceived += 1
+					self.firstCommand.set()
+					if self.respond: self.sock.sendall(self.store.toBytes()[5:]+bytes([jacocoexec.BLOCK_CMD_OK]))
+		except OSError:
+			pass
+
+	def close(self):
+		self.sock.shutdown(socket.SHUT_RDWR)
+		self.sock.close()
+		self.thread.join()
+
+class PySysTest(pysys.basetest.BaseTest):
+	def execute(self):
+		server = _CoverageServer(self.output+'/coverage')
+		server.dumpTimeoutSecs = 20.0
+		
+		for s in ['TestA.myjava', 'TestA.myjava', 'TestB.myjava']: server.expectSession(s)
+		agents = [FakeAgent(server.port, 'TestA.myjava'), FakeAgent(server.port, 'TestA.myjava'), 
+			FakeAgent(server.port, 'TestB.myjava', respond=False)]
+		
+		for a in agents: a.firstCommand.wait(10)
+		
+		# should not wait for TestB's unresponsive agent, or ask it for data
+		startTime = time.monotonic()
+		server.requestDumps('TestA')
+		self.requestDumpsSecs = time.monotonic()-startTime
+		self.commandsReceived = [a.commandsReceived for a in agents]
+
+		agents[0].close()
+		agents[2].close()
+		server.shutdown() # closes the connection from the remaining agent
+		agents[1].close()
+		self.sessions = server.sessions
+
+	def validate(self):
+		self.assertThat('requestDumpsSecs < dumpTimeoutSecs', requestDumpsSecs=self.requestDumpsSecs, dumpTimeoutSecs=20.0)
+		self.assertThat('commandsReceived == expected', commandsReceived=self.commandsReceived, expected=[2, 2, 1])
+		self.assertThat('sessions == 2', sessions=self.sessions)
+		
+		files = sorted(os.listdir(self.output+'/coverage'))
+		self.assertThat('files == expected', files=files, expected=[
+			'jacoco-tcpserver-TestA.myjava.1.javacoverage', 'jacoco-tcpserver-TestA.myjava.javacoverage'])
+		for f in files:
+			store = jacocoexec.ExecutionDataStore().load(self.output+'/coverage/'+f)
+			self.assertThat('sessions == expected', sessions=[s.id for s in store.sessions], expected=['TestA.myjava'])
+			self.assertThat('classes == expected', classes=[c.name for c in store.classes.values()], expected=['myorg/TestA'])
@@ -0,0 +1,12 @@
+import pysys
+from pysys.constants import *
+
+class PySysTest(pysys.basetest.BaseTest):
+	def execute(self):
+		self.java.startJava('myorg.MainClass', [], stdouterr='myjava1', classpath=self.project.testRootDir+'/../classpath*')
+		server = self.java.startJava('myorg.MyServer', [], stdouterr='myserver', classpath=self.project.testRootDir+'/../classpath*', 
+			background=True)
+		self.waitForGrep('myserver.out', 'Server started', process=server)
+
+	def validate(self):
+		self.addOutcome(PASSED)
@@ -0,0 +1,38 @@
+import pysys
+from pysys.constants import *
+
+from pysysjava.coverageimpact import CoverageTestIndex
+
+class PySysTest(pysys.basetest.BaseTest):
+	def execute(self):
+		self.java.compile('src1', 'classpath1')
+		self.java.compile('src2', 'classpath2', classpath=self.output+'/classpath1')
+	
+		self.copy(self.input, self.output+'/testroot')
+
+		self.pysys.runPySys(['run', '-o', self.output+'/myoutdir', '-XcodeCoverage'], 
+			stdouterr='pysys', workingDir=self.output+'/testroot', background=False)
+
+	def validate(self):
+		htmldir = 'myoutdir/__coverage_java.myoutdir'
+
+		self.assertPathExists(htmldir+'/jacoco-merged-java-coverage.exec')
+		self.assertPathExists(htmldir+'/java-coverage.xml')
+		self.assertThatGrep('pysys.out', 'Java coverage server received coverage data from ([0-9]+) Java processes', expected='2')
+
+		# Check both sessions were received, including the one that was killed during cleanup
+		self.assertGrep(htmldir+'/jacoco-sessions.html', 'NestedTest.myjava1')
+		self.assertGrep(htmldir+'/jacoco-sessions.html', 'NestedTest.myserver')
+
+		# Check the per-test coverage index includes data received over TCP
+		self.assertThat('coveredClasses == expected', coveredClasses=sorted(CoverageTestIndex.load(
+			self.output+'/'+htmldir+'/java-coverage-test-index.json').getCoveredClasses('NestedTest')), 
+			expected=['myorg/DepClass', 'myorg/MainClass', 'myorg/MyServer'])
+		self.assertPathExists(htmldir+'/myorg/MyServer.java.html')
+		self.assertGrep(htmldir+'/myorg/MyServer.java.html', 'Server started')
+
+		# No coverage files should be written to the test output dir in this mode
+		self.assertThat('coverageFiles == []', coverageFiles=[f for f in os.listdir(self.output+'/myoutdir/NestedTest') 
+			if f.endswith('.javacoverage')])
+		
+		self.logFileContents('pysys.out', tail=True)
@@ -0,0 +1,9 @@
+import pysys
+from pysys.constants import *
+
+class PySysTest(pysys.basetest.BaseTest):
+	def execute(self):
+		pass
+
+	def validate(self):
+		self.addOutcome(PASSED)
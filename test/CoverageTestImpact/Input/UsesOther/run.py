@@ -0,0 +1,9 @@
+import pysys
+from pysys.constants import *
+
+class PySysTest(pysys.basetest.BaseTest):
+	def execute(self):
+		self.java.startJava('myorg.OtherClass', [], stdouterr='myjava', classpath=self.project.testRootDir+'/../classes')
+
+	def validate(self):
+		self.addOutcome(PASSED)
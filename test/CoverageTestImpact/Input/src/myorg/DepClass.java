@@ -0,0 +1,11 @@
+package myorg;
+
+public class DepClass
+{
+	public static String getValue() { return "Hello"; }
+	
+	public static String unused()
+	{
+		return "Bar";
+	}
+}
\ No newline at end of file
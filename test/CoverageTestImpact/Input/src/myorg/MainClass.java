@@ -0,0 +1,15 @@
+package myorg;
+
+public class MainClass
+{
+	public static void main(String[] args)
+	{
+		System.out.println(DepClass.getValue()+" World");
+	}
+	
+	
+	public String unusedMainMethod()
+	{
+		return "Bar";
+	}
+}
\ No newline at end of file
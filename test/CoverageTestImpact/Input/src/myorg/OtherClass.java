@@ -0,0 +1,14 @@
+package myorg;
+
+public class OtherClass
+{
+	public static void main(String[] args)
+	{
+		System.out.println(new Inner().toString());
+	}
+	
+	static class Inner
+	{
+		public String toString() { return "Other"; }
+	}
+}
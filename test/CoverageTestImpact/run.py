@@ -0,0 +1,53 @@
+import json
+
+import pysys
+from pysys.constants import *
+
+from pysysjava.coverageimpact import CoverageTestIndex
+
+class PySysTest(pysys.basetest.BaseTest):
+	def execute(self):
+		self.java.compile(self.input+'/src', 'classes')
+		self.copy(self.input, self.output+'/testroot')
+
+		# a full run with coverage, which generates the index
+		self.pysys.runPySys(['run', '-o', self.output+'/fulloutdir', '-XcodeCoverage'], 
+			stdouterr='pysys-full', workingDir=self.output+'/testroot', background=False)
+
+		# a run with only the tests affected by the changed files
+		self.write_text('changed-files.txt', '\n'.join([
+			'README.md', 
+			'src/myorg/NewClass.java',
+			'src\\myorg\\MainClass.java', 
+		]))
+		self.pysys.runPySys(['run', '-o', self.output+'/impactoutdir', '-XjavaChangedFiles=@'+self.output+'/changed-files.txt'], 
+			stdouterr='pysys-impact', workingDir=self.output+'/testroot', background=False)
+
+		self.pysys.runPySys(['run', '-o', self.output+'/classfileoutdir', '-XjavaChangedFiles=target/classes/myorg/OtherClass.class'], 
+			stdouterr='pysys-classfile', workingDir=self.output+'/testroot', background=False)
+
+	def validate(self):
+		indexFile = self.output+'/fulloutdir/__coverage_java.fulloutdir/java-coverage-test-index.json'
+		index = CoverageTestIndex.load(indexFile)
+		self.assertThat('testIds == expected', testIds=index.getTestIds(), expected=['UsesMain', 'UsesOther'])
+		self.assertThat('coveredClasses == expected', coveredClasses=sorted(index.getCoveredClasses('UsesMain')), 
+			expected=['myorg/DepClass', 'myorg/MainClass'])
+		with open(indexFile, 'r', encoding='utf-8') as f:
+			self.assertThat('len(classNames) == 3', classNames=json.load(f)['classes'])
+
+		self.assertThat('executedTests == expected', executedTests=sorted(os.listdir(self.output+'/impactoutdir')), 
+			expected=['NoJava', 'UsesMain'])
+		self.assertGrep('pysys-impact.out', 'Java test impact selection is executing 2 of 3 tests, based on 3 changed files [(]1 changed classes[)]; 1 of the selected tests are not in the coverage index')
+		self.assertGrep('pysys-impact.out', '   src/myorg/NewClass.java')
+
+		self.assertThat('executedTests == expected', executedTests=sorted(os.listdir(self.output+'/classfileoutdir')), 
+			expected=['NoJava', 'UsesOther'])
+
+		# check the index round-trips including nested classes
+		index.addCoverage('Extra', ['myorg/OtherClass$Inner', 'myorg/DepClass'])
+		index.save(self.output+'/resaved-index.json')
+		index = CoverageTestIndex.load(self.output+'/resaved-index.json')
+		self.assertThat('coveredClasses == expected', coveredClasses=sorted(index.getCoveredClasses('Extra')), 
+			expected=['myorg/DepClass', 'myorg/OtherClass$Inner'])
+		self.assertThat('matched == expected', matched=index.getClassesForChangedFiles(['x/myorg/OtherClass.java', 'MyOtherClass.java']), 
+			expected=({'myorg/OtherClass', 'myorg/OtherClass$Inner'}, ['MyOtherClass.java']))
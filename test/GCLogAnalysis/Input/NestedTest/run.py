@@ -0,0 +1,14 @@
+import pysys
+from pysys.constants import *
+from pysys.basetest import BaseTest
+
+class PySysTest(BaseTest):
+	def execute(self):
+		self.java.compile(output='javaclasses')
+		self.hello = self.java.startJava('myorg.HelloWorld', ['Hi there!'], stdouterr='java-hello', classpath='javaclasses')
+
+		self.java.startJava('myorg.MyServer', [], stdouterr='my_server', classpath='javaclasses', background=True)
+		self.waitForGrep('my_server.out', 'Server started')
+
+	def validate(self):
+		self.assertThat('pauseCount > 0', pauseCount=self.java.getGCLogSummary(self.hello)['pauseCount'])
@@ -0,0 +1,63 @@
+import json
+
+import pysys
+from pysys.constants import *
+from pysys.basetest import BaseTest
+
+from pysysjava.gclog import GCLogParser
+
+class PySysTest(BaseTest):
+	def execute(self):
+		self.copy(self.input, self.output+'/testroot')
+		self.pysys.runPySys(['run', '-XjavaGCLog=true', '-XjavaGCMaxPauseP99Ms=100', '--outdir', 'gclog'], stdouterr='pysys-run', 
+			workingDir=self.output+'/testroot', background=False)
+		self.pysys.runPySys(['run', '-XjavaGCLog=true', '-XjavaGCMaxPauseP99Ms=5', '--outdir', 'threshold'], stdouterr='pysys-run-threshold', 
+			workingDir=self.output+'/testroot', background=False, expectedExitStatus='!=0')
+
+	def validate(self):
+		self.assertGrep('pysys-run.out', 'THERE WERE NO FAILURES')
+		testOutput = self.output+'/testroot/NestedTest/Output/gclog'
+		with open(testOutput+'/java-gc-summary.json', 'r', encoding='utf-8') as f:
+			summaries = json.load(f)
+		self.assertThat('gcLogs == expected', gcLogs=[s['gcLog'] for s in summaries], expected=['java-hello.gc.log', 'my_server.gc.log'])
+		self.assertThat('pauseCount > 0', pauseCount=summaries[1]['pauseCount'])
+		self.assertThatGrep(testOutput+'/run.log', 'GC summary for (java-hello): [0-9]+ pauses', expected='java-hello')
+
+		self.assertThatGrep('pysys-run-threshold.out', 'Assert that {p99PauseMs <= gcMaxPauseP99Ms} with p99PauseMs=.* gcMaxPauseP99Ms=(.*) [.][.][.] failed', 
+			expected='5.0')
+
+		# G1
+		self.assertThat('summary == expected', summary=self.parse('''
+[0.008s][info][gc] Using G1
+[0.500s][info][gc,start    ] GC(0) Pause Young (Normal) (G1 Evacuation Pause)
+[0.500s][info][gc,phases   ] GC(0)   Pre Evacuate Collection Set: 0.1ms
+[0.500s][info][gc,heap     ] GC(0) Eden regions: 6->0(8)
+[0.500s][info][gc          ] GC(0) Pause Young (Normal) (G1 Evacuation Pause) 24M->4M(256M) 2.000ms
+[1.000s][info][gc          ] GC(1) Pause Young (Normal) (G1 Evacuation Pause) 30M->6M(256M) 4.000ms
+[1.500s][info][gc          ] GC(2) Pause Young (Concurrent Start) (G1 Humongous Allocation) 1G->8M(2G) 6.000ms
+[1.600s][info][gc          ] GC(3) Concurrent Mark Cycle 20.123ms
+[2.000s][info][gc          ] GC(4) Pause Full (System.gc()) 10240K->10M(64M) 8.000ms
+[2.500s][info][gc,heap,exit] Heap
+'''), expected={
+			'pauseCount': 4, 'totalPauseSecs': 0.02, 'maxPauseMs': 8.0, 'pausePercentilesMs': {'p50': 4.0, 'p90': 8.0, 'p99': 8.0}, 
+			'heapAfterGC': [[0.5, 4.0], [1.0, 6.0], [1.5, 8.0], [2.0, 10.0]], 'heapAfterGCSlopeMBPerSec': 4.0, 
+			'allocatedMB': 24.0+26.0+1018.0+2.0, 'allocationRateMBPerSec': 1070.0/2.0, 'uptimeSecs': 2.0,
+		})
+
+		# ZGC logs its pauses with the gc,phases tag
+		summary = self.parse('''
+[0.100s][info][gc,phases   ] GC(0) Pause Mark Start 0.011ms
+[0.150s][info][gc,phases   ] GC(0) Pause Mark End 0.020ms
+[0.200s][info][gc,phases   ] GC(0) Pause Relocate Start 0.009ms
+[0.200s][info][gc          ] GC(0) Garbage Collection (Warmup) 14M(0%)->8M(0%)
+''')
+		self.assertThat('zgc == expected', zgc=(summary['pauseCount'], summary['maxPauseMs'], summary['heapAfterGC']), expected=(3, 0.020, [[0.2, 8.0]]))
+
+		summary = self.parse('')
+		self.assertThat('empty == expected', empty=(summary['pauseCount'], summary['pausePercentilesMs']['p99'], summary['allocationRateMBPerSec']), 
+			expected=(0, None, None))
+
+	def parse(self, log):
+		parser = GCLogParser()
+		for line in log.strip().split('\n'): parser.addLine(line)
+		return parser.getSummary()
@@ -0,0 +1,9 @@
+package myutils;
+
+/** 
+A utility class that doesn't have any tests. 
+*/
+public class Utils {
+
+}
+
@@ -0,0 +1,13 @@
+package myorg.mytest3;
+
+import static org.junit.jupiter.api.Assertions.assertEquals;
+
+import org.junit.jupiter.api.*;
+
+class TestSuite3 {
+
+	@Test
+	void shouldFail3() throws Exception {
+		assertEquals("Hello world", "Hello funky world");
+	}
+}
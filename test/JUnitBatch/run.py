@@ -0,0 +1,62 @@
+import json
+
+import pysys
+import xml.etree.ElementTree as ET
+from pysys.constants import *
+
+class PySysTest(pysys.basetest.BaseTest):
+	def execute(self):
+		self.copy(self.input, self.output+'/testroot')
+
+		self.pysys.runPySys(['print', '--json'], stdouterr='pysys-print', workingDir=self.output+'/testroot', background=False)
+
+		self.pysys.runPySys(['run', '-j0', '--outdir', 'myoutputdir'], stdouterr='pysys-run', workingDir=self.output+'/testroot', 
+			expectedExitStatus='!=0', background=False) # since one of the tests fails
+
+		# re-running a single class should execute just that class
+		self.pysys.runPySys(['run', '--outdir', 'myoutputdir-rerun', 'MyJUnitTests_mytest2.TestSuite2'], stdouterr='pysys-rerun', 
+			workingDir=self.output+'/testroot', background=False)
+
+	def validate(self):
+		def getTestcases(name, outdir='myoutputdir'): return self.getExprFromFile('testroot/NestedTest/Output/'+name+'/'+outdir+'/run.log', 'INFO +-- ([^:]+)', returnAll=True)
+		
+		# the first test of each batch should be scheduled ahead of all the other tests
+		with open(self.output+'/pysys-print.out', 'r', encoding='utf-8') as f:
+			descriptors = json.load(f)
+		batches = {}
+		for d in descriptors: batches.setdefault(d['userData']['junitBatch'], []).append(d['executionOrderHint'][0])
+		self.assertThat('batchSizes == expected', batchSizes=sorted(len(hints) for hints in batches.values()), expected=[1, 2])
+		leaderHints = [min(hints) for hints in batches.values()]
+		self.assertThat('leaderHints[0] == leaderHints[1]', leaderHints=leaderHints)
+		self.assertThat('otherHints == [leaderHint+1.0]', leaderHint=leaderHints[0], 
+			otherHints=[h for hints in batches.values() for h in sorted(hints)[1:]])
+
+		# 3 classes with a batch size of 2 should result in 2 JUnit processes, but per-class outcomes
+		self.assertThatGrep('pysys-run.out', 'JUnit batch mode executed ([0-9]+ test classes using [0-9]+) JUnit processes', 
+			expected='3 test classes using 2')
+		self.assertThat('testcases == expected', testcases__eval="getTestcases('myorg.mytest1.TestSuite1')", expected=[
+			'myorg.mytest1.TestSuite1 shouldBeSkipped()', 
+			'myorg.mytest1.TestSuite1 shouldPass()'])
+		self.assertThat('testcases == expected', testcases__eval="getTestcases('myorg.mytest2.TestSuite2')", expected=[
+			'myorg.mytest2.TestSuite2 shouldPass2()', 
+			'myorg.mytest2.TestSuite2$NestedClass shouldPassNested()'])
+		self.assertThat('testcases == expected', testcases__eval="getTestcases('myorg.mytest3.TestSuite3')", expected=[
+			'myorg.mytest3.TestSuite3 shouldFail3()'])
+		# each test's output dir should contain the reports for only its own testcases, and the batch's JUnit output
+		for name in ['myorg.mytest1.TestSuite1', 'myorg.mytest2.TestSuite2', 'myorg.mytest3.TestSuite3']:
+			outdir = self.output+'/testroot/NestedTest/Output/'+name+'/myoutputdir'
+			self.assertPathExists(outdir+'/junit.out')
+			reports = [f for f in os.listdir(outdir+'/junit-reports') if f.endswith('.xml')]
+			self.assertThat('len(reports) >= 1', reports=reports)
+			for f in reports:
+				self.assertThat('all(c == name or c.startswith(name+"$") for c in classnames)', name=name, 
+					classnames=[t.get('classname') for t in ET.parse(outdir+'/junit-reports/'+f).getroot().findall('testcase')])
+
+		self.assertGrep('pysys-run.out', 'FAILED: +MyJUnitTests_mytest3.TestSuite3')
+		self.assertGrep('pysys-run.out', 'FAILED: +MyJUnitTests_mytest[12]', contains=False)
+
+		self.assertThatGrep('pysys-rerun.out', 'JUnit batch mode executed ([0-9]+ test classes using [0-9]+) JUnit processes', 
+			expected='1 test classes using 1')
+		self.assertThat('testcases == expected', testcases__eval="getTestcases('myorg.mytest2.TestSuite2', 'myoutputdir-rerun')", expected=[
+			'myorg.mytest2.TestSuite2 shouldPass2()', 
+			'myorg.mytest2.TestSuite2$NestedClass shouldPassNested()'])
@@ -0,0 +1,59 @@
+import json, time
+
+import pysys
+from pysys.constants import *
+
+from pysysjava.javaplugin import walkDirTreeContents
+from pysysjava.junitdescriptorcache import JavaSourceTreeCache
+
+class PySysTest(pysys.basetest.BaseTest):
+	def execute(self):
+		self.copy(self.input, self.output+'/testroot')
+		
+		# loading the descriptors with a cold cache, then with the listing reused from the cache
+		for name in ['cold', 'warm']:
+			self.pysys.runPySys(['print', '--json'], stdouterr='pysys-print-'+name, workingDir=self.output+'/testroot', 
+				background=False)
+
+	def validate(self):
+		for name in ['cold', 'warm']:
+			with open(self.output+'/pysys-print-%s.out'%name, 'r', encoding='utf-8') as f:
+				self.assertThat('testIds == expected', testIds=[t['id'] for t in json.load(f)], expected=[
+					'myorg.mytest1.TestSuite1', 'myorg.mytest2.TestSuite2'], name=name)
+		self.assertThat('len(cacheFiles) == 1', cacheFiles=os.listdir(self.output+'/descriptor-cache'))
+
+		self.checkSourceTreeCache()
+
+	def checkSourceTreeCache(self):
+		tree = self.output+'/tree'
+		for d in ['a/b', 'a/c', 'd', '.svn']: self.mkdir(tree+'/'+d)
+		for f in ['a/b/TestB.java', 'a/TestA.java', 'a/c/Other.txt', 'd/TestD.java', '.svn/TestIgnored.java', 'TestRoot.java']: 
+			self.write_text(tree+'/'+f, 'x')
+		dirconfig = self.write_text('pysysdirconfig.xml', '<pysysdirconfig/>')
+		
+		oldTime = time.time()-100
+		def setOldModTime(dir): # since directories modified very recently are always rescanned
+			os.utime(dir, (oldTime, oldTime))
+		for dirpath, subdirs, files in os.walk(tree): setOldModTime(dirpath)
+		
+		def expected(): return [os.path.relpath(e.path, tree).replace(os.sep, '/') 
+			for e in walkDirTreeContents(tree, dirIgnores=OSWALK_IGNORES, fileSuffixes='.java') if e.is_file()]
+		cache = JavaSourceTreeCache(self.output+'/source-tree-cache')
+		key = JavaSourceTreeCache.getKey(tree, dirconfig)
+		
+		self.assertThat('cold == expected', cold=cache.listJavaFiles(tree, key, OSWALK_IGNORES), expected=expected())
+		self.assertThat('warm == expected', warm=cache.listJavaFiles(tree, key, OSWALK_IGNORES), expected=expected())
+		
+		# if the directory modification time is unchanged the cached listing is used (which proves it is not rescanned)
+		self.write_text(tree+'/a/b/TestNew.java', 'x')
+		setOldModTime(tree+'/a/b')
+		self.assertThat('"a/b/TestNew.java" not in cached', cached=cache.listJavaFiles(tree, key, OSWALK_IGNORES))
+
+		# a changed directory is rescanned
+		os.utime(tree+'/a/b', None)
+		self.assertThat('rescanned == expected', rescanned=cache.listJavaFiles(tree, key, OSWALK_IGNORES), expected=expected())
+		self.assertThat('"a/b/TestNew.java" in rescanned', rescanned=expected())
+		
+		# the key includes the directory configuration
+		self.assertThat('key != newKey', key=key, newKey=JavaSourceTreeCache.getKey(tree, self.write_text('pysysdirconfig.xml', 
+			'<pysysdirconfig><id-prefix>x</id-prefix></pysysdirconfig>')))
@@ -0,0 +1,10 @@
+package myorg;
+
+import org.junit.jupiter.api.Test;
+
+class AlphaTest {
+
+	@Test
+	void shouldPass() {
+	}
+}
@@ -0,0 +1,10 @@
+package myorg;
+
+import org.junit.jupiter.api.Test;
+
+class CharlieTest {
+
+	@Test
+	void shouldPass() {
+	}
+}
@@ -0,0 +1,10 @@
+package myorg;
+
+import org.junit.jupiter.api.Test;
+
+class EchoTest {
+
+	@Test
+	void shouldPass() {
+	}
+}
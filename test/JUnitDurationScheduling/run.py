@@ -0,0 +1,38 @@
+import json
+
+import pysys
+from pysys.constants import *
+
+class PySysTest(pysys.basetest.BaseTest):
+	def execute(self):
+		self.copy(self.input, self.output+'/testroot')
+
+		self.pysys.runPySys(['print', '--json'], stdouterr='pysys-print', workingDir=self.output+'/testroot', background=False)
+
+		# each shard is executed from a separate copy, as it would be on separate CI nodes
+		for shard in ['1/2', '2/2']:
+			self.copy(self.input, self.output+'/testroot-shard'+shard[0])
+			self.pysys.runPySys(['run', '-XjunitShard='+shard], stdouterr='pysys-run-shard'+shard[0], 
+				workingDir=self.output+'/testroot-shard'+shard[0], background=False)
+
+	def validate(self):
+		with open(self.output+'/pysys-print.out', 'r', encoding='utf-8') as f:
+			hints = {t['id']: t['executionOrderHint'][0] for t in json.load(f)}
+		self.assertThat('testIds == expected', testIds=sorted(hints, key=lambda t: hints[t]), expected=[
+			'AlphaTest', 'BravoTest', 'EchoTest', 'CharlieTest', 'DeltaTest']) # EchoTest gets the mean duration of 55 secs
+		self.assertThat('hint == expected', hint=hints['AlphaTest'], expected=-1.0)
+
+		# balanced by duration (longest processing time first) rather than by number of tests
+		self.assertThatGrep('pysys-run-shard1.out', 'JUnit sharding is executing (.*)', 
+			expected='2 of 5 tests in shard 1/2 (150.0 of 275.0 expected secs); 1 of the tests are not in the duration history')
+		self.assertThatGrep('pysys-run-shard2.out', 'JUnit sharding is executing (.*)', 
+			expected='3 of 5 tests in shard 2/2 (125.0 of 275.0 expected secs); 1 of the tests are not in the duration history')
+		self.assertThat('executed == expected', executed=self.getExprFromFile('pysys-run-shard1.out', r'Id: +(\S+)', returnAll=True), 
+			expected=['AlphaTest', 'CharlieTest'])
+		
+		# the history is updated with the durations reported by JUnit
+		with open(self.output+'/testroot-shard1/junit-durations.json', 'r', encoding='utf-8') as f:
+			durations = json.load(f)['durations']
+		self.assertThat('recordedTests == expected', recordedTests=sorted(t for t, secs in durations.items() if secs < 10), 
+			expected=['AlphaTest', 'CharlieTest'])
+		self.assertThat('deletedTest == 55.0', deletedTest=durations['DeletedTest'])
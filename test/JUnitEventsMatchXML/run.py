@@ -0,0 +1,60 @@
+import json
+from xml.sax.saxutils import escape
+
+import pysys
+from pysys.constants import *
+
+from pysysjava.junitxml import JUnitXMLParser
+from pysysjava.junitevents import JUnitEventStreamReader
+
+class PySysTest(pysys.basetest.BaseTest):
+	def execute(self):
+		# the same failures as both a JUnit XML report and a stream of events from the listener; the classname contains 
+		# a regex metacharacter to check it's escaped when finding the line number
+		classname = 'myorg.pkg.My$Test'
+		failures = [
+			('testFailure()', True, 'org.opentest4j.AssertionFailedError', 'expected: <1> but was: <2>'),
+			('testError()', False, 'java.lang.IllegalStateException', 'Something bad happened'),
+			('testErrorNoMessage()', False, 'java.lang.NullPointerException', ''),
+			('testFailureNoMessage()', True, 'java.lang.AssertionError', ''),
+		]
+		def getTrace(throwableType, message): return ((throwableType+': '+message).rstrip(': ')+'\n'
+			+'\tat org.junit.jupiter.api.AssertionUtils.fail(AssertionUtils.java:55)\n'
+			+'\tat myorg.pkg.Helper.help(Helper.java:12)\n'
+			+'\tat myorg.pkg.My$Test.test(My$Test.java:42)\n'
+			+'\tat java.base/jdk.internal.reflect.NativeMethodAccessorImpl.invoke0(Native Method)\n'
+			+'\t... 25 more\n')
+
+		with open(self.output+'/TEST-failures.xml', 'w', encoding='utf-8') as f:
+			f.write('<?xml version="1.0" encoding="UTF-8"?>\n<testsuite name="JUnit Jupiter" tests="%d" skipped="0" failures="2" errors="%d" time="1" timestamp="2020-01-02T03:04:05" hostname="h">\n'%(len(failures), len(failures)-2))
+			for name, isAssertion, throwableType, message in failures:
+				tag = 'failure' if isAssertion else 'error'
+				f.write('<testcase name="%s" classname="%s" time="0.01"><%s %stype="%s">%s</%s></testcase>\n'%(name, classname, tag, 
+					'message=%s '%json.dumps(escape(message)) if message else '', throwableType, escape(getTrace(throwableType, message)), tag))
+			f.write('</testsuite>\n')
+
+		with open(self.output+'/junit-events.ndjson', 'w', encoding='utf-8') as f:
+			for i, (name, isAssertion, throwableType, message) in enumerate(failures):
+				f.write(json.dumps({'event': 'finished', 'id': str(i), 'classname': classname, 'name': name, 'durationSecs': 0.01, 
+					'status': 'FAILED', 'isAssertion': isAssertion, 'throwableType': throwableType, 'message': message, 
+					'stackTrace': getTrace(throwableType, message).replace('\n', '\r\n')})+'\n')
+
+		_, self.xmlResults = JUnitXMLParser(self.output+'/TEST-failures.xml').parse()
+		self.eventResults = sorted(JUnitEventStreamReader(self.output+'/junit-events.ndjson').readTestcases(), 
+			key=lambda t: (t['classname'], t['name']))
+
+	def validate(self):
+		self.assertThat('len(xmlResults) == len(eventResults) == expected', xmlResults=self.xmlResults, eventResults=self.eventResults, expected=4)
+		for x, e in zip(self.xmlResults, self.eventResults):
+			self.assertThat('eventResult == xmlResult', eventResult=e, xmlResult=x)
+			self.assertThat('testFileLine == 42', testFileLine=e.get('testFileLine'))
+		
+		t = {t['name']: t for t in self.eventResults}
+		self.assertThat('comparison == expected', comparison=(t['testFailure()']['comparisonExpected'], t['testFailure()']['comparisonActual']), expected=('1', '2'))
+		self.assertThat('outcomeReason == expected', outcomeReason=t['testError()']['outcomeReason'], expected='java.lang.IllegalStateException: Something bad happened')
+		
+		# failures without a message use the first line of the stack trace as the reason
+		for x in [self.xmlResults, self.eventResults]:
+			x = {t['name']: t for t in x}
+			self.assertThat('outcomeReason == expected', outcomeReason=x['testFailureNoMessage()']['outcomeReason'], expected='java.lang.AssertionError')
+			self.assertThat('outcomeReason == expected', outcomeReason=x['testErrorNoMessage()']['outcomeReason'], expected='java.lang.NullPointerException')
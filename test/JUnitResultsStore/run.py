@@ -0,0 +1,78 @@
+import os
+import time
+
+import pysys
+from pysys.constants import *
+
+from pysysjava.junitresults import JUnitResultsStore
+
+class PySysTest(pysys.basetest.BaseTest):
+	runs = 2000
+	testcasesPerRun = 500
+
+	maxQuerySecs = 0.05
+
+	def execute(self):
+		# populate the store using the writer
+		self.copy(self.input, self.output+'/testroot')
+		for buildNumber in ['build1', 'build2']:
+			self.pysys.runPySys(['run', '--record'], stdouterr='pysys-run-'+buildNumber, workingDir=self.output+'/testroot',
+				environs={'BUILD_NUMBER': buildNumber}, background=False)
+		self.writerStore = JUnitResultsStore(self.output+'/testroot/junit-results-store')
+
+		# a large synthetic store with 1 million rows
+		store = JUnitResultsStore(self.output+'/store')
+		for run in range(self.runs):
+			testcases = [('MyTests_Class%03d'%(i//10), 'myorg.Class%03d'%(i//10), 'test%d()'%i, 'passed', '', 0.001*(i%100))
+				for i in range(self.testcasesPerRun-3)]
+			testcases.append(('MyTests_Slow', 'myorg.Slow', 'slowTest()', 'passed', '', 100.0+run%10))
+			testcases.append(('MyTests_Flaky', 'myorg.Flaky', 'flakyTest()', 'failure' if run%2 else 'passed',
+				'org.opentest4j.AssertionFailedError' if run%2 else '', 0.5))
+			testcases.append(('MyTests_Flaky', 'myorg.Flaky', 'alwaysFails()', 'error', 'java.lang.NullPointerException', 0.5))
+			store.addRun('build%d'%run, testcases, startTime=1600000000.0+run)
+
+		startTime = time.perf_counter()
+		store.getRuns()
+		self.summarySecs = time.perf_counter()-startTime
+		self.log.info('Summary of %d rows created in %0.1f secs', self.runs*self.testcasesPerRun, self.summarySecs)
+
+		# queries on a new instance, which reads the saved summary
+		store = JUnitResultsStore(self.output+'/store')
+		startTime = time.perf_counter()
+		self.slowest = store.getSlowestTests(3, by='max')
+		self.flakiest = store.getFlakiestTests(3)
+		self.trend = store.getClassDurationTrend('myorg.Slow')
+		self.querySecs = time.perf_counter()-startTime
+		self.runIds = [r[0] for r in store.getRuns()]
+
+		# subsequent queries use the in-memory summary
+		startTime = time.perf_counter()
+		for i in range(10): store.getSlowestTests(10)
+		self.cachedQuerySecs = (time.perf_counter()-startTime)/10
+		self.reportPerformanceResult(self.cachedQuerySecs, 'JUnit results store slowest tests query over 1 million rows', 's',
+			resultDetails=[('rows', self.runs*self.testcasesPerRun)])
+
+		# deleting a segment causes the summary to be rebuilt
+		os.remove(store.getSegmentPaths()[0])
+		self.runsAfterDelete = len(JUnitResultsStore(self.output+'/store').getRuns())
+
+	def validate(self):
+		self.assertThat('runs == expected', runs=[r[0] for r in self.writerStore.getRuns()], expected=['build1', 'build2'])
+		self.assertThat('testcases == expected', testcases=[(t['runId'], t['testId'], t['classname'], t['outcome']) for t in self.writerStore.iterTestcases()], expected=[
+			('build1', 'AlphaTest', 'myorg.AlphaTest', 'passed'),
+			('build1', 'AlphaTest', 'myorg.AlphaTest', 'passed'),
+			('build2', 'AlphaTest', 'myorg.AlphaTest', 'passed'),
+			('build2', 'AlphaTest', 'myorg.AlphaTest', 'passed'),
+			])
+		self.assertThatGrep('pysys-run-build1.out', 'JUnit results for ([0-9]+) testcases written', expected='2')
+
+		self.assertThat('runIds == expected', runIds=self.runIds[:3], expected=['build0', 'build1', 'build2'])
+		self.assertThat('slowest == expected', slowest=self.slowest, expected=[
+			('myorg.Slow', 'slowTest()', 109.0), ('myorg.Flaky', 'alwaysFails()', 0.5), ('myorg.Flaky', 'flakyTest()', 0.5)])
+		self.assertThat('flakiest == expected', flakiest=self.flakiest, expected=[('myorg.Flaky', 'flakyTest()', 1.0, self.runs//2, self.runs)])
+		self.assertThat('trend == expected', trend=self.trend[:3], expected=[('build0', 100.0), ('build1', 101.0), ('build2', 102.0)])
+		self.assertThat('trendLength == expected', trendLength=len(self.trend), expected=self.runs)
+		self.assertThat('runsAfterDelete == expected', runsAfterDelete=self.runsAfterDelete, expected=self.runs-1)
+
+		self.assertThat('querySecs < maxQuerySecs', querySecs=self.querySecs, maxQuerySecs=self.maxQuerySecs*10)
+		self.assertThat('cachedQuerySecs < maxQuerySecs', cachedQuerySecs=self.cachedQuerySecs, maxQuerySecs=self.maxQuerySecs)
@@ -0,0 +1,27 @@
+import pysys
+from pysys.constants import *
+
+class PySysTest(pysys.basetest.BaseTest):
+	def execute(self):
+		self.copy(self.input, self.output+'/testroot')
+		self.pysys.runPySys(['run', '-j0', '--outdir', 'myoutputdir'], stdouterr='pysys-run', workingDir=self.output+'/testroot', 
+			background=False)
+
+	def validate(self):
+		def getTestcases(name): return self.getExprFromFile('testroot/NestedTest/Output/'+name+'/run.log', 'INFO +-- ([^:]+)', returnAll=True)
+		self.assertThat('testcases == expected', testcases__eval="getTestcases('myorg.mytest1.TestSuite1/myoutputdir~MyMode')", expected=[
+			'myorg.mytest1.TestSuite1 shouldBeSkipped()', 
+			'myorg.mytest1.TestSuite1 shouldPass()'])
+		self.assertThat('testcases == expected', testcases__eval="getTestcases('myorg.mytest2.TestSuite2/myoutputdir~MyMode')", expected=[
+			'myorg.mytest2.TestSuite2 shouldPass2()', 
+			'myorg.mytest2.TestSuite2$NestedClass shouldPassNested()'])
+
+		# Test classes should only be compiled once even though there are multiple descriptors, and not into each 
+		# test's output directory
+		self.assertThatGrep('pysys-run.out', 'Compilation of JUnit test classes was shared by ([0-9]+ tests, requiring [0-9]+) compilation', 
+			expected='2 tests, requiring 1')
+		reused = 0
+		for name in ['myorg.mytest1.TestSuite1', 'myorg.mytest2.TestSuite2']:
+			self.assertPathExists('testroot/NestedTest/Output/'+name+'/myoutputdir~MyMode/javaclasses', exists=False)
+			reused += len(self.grepAll('testroot/NestedTest/Output/'+name+'/myoutputdir~MyMode/run.log', 'Using test classes compiled by'))
+		self.assertThat('reused == 1', reused=reused)
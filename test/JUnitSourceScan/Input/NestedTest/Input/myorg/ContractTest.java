@@ -0,0 +1,9 @@
+package myorg;
+
+import org.junit.jupiter.api.*;
+
+interface ContractTest {
+	@Test
+	default void shouldPassContract() {
+	}
+}
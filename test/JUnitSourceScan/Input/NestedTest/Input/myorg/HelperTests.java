@@ -0,0 +1,8 @@
+package myorg;
+
+/** 
+ * A helper class with a test-like name, but no @Test methods. 
+ */
+public class HelperTests {
+	public static String getValue() { return "x"; }
+}
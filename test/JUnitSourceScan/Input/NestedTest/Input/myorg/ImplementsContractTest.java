@@ -0,0 +1,4 @@
+package myorg;
+
+class ImplementsContractTest implements java.io.Serializable, ContractTest {
+}
@@ -0,0 +1,6 @@
+package myorg;
+
+import myorg.base.AbstractBaseTest;
+
+public class InheritedTest extends AbstractBaseTest<String> {
+}
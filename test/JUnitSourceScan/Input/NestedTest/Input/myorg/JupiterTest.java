@@ -0,0 +1,9 @@
+package myorg;
+
+import org.junit.jupiter.api.*;
+
+public class JupiterTest {
+	@Test
+	void shouldPass() {
+	}
+}
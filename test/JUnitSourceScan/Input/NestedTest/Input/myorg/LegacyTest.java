@@ -0,0 +1,6 @@
+package myorg;
+
+public class LegacyTest extends junit.framework.TestCase {
+	public void testSomething() {
+	}
+}
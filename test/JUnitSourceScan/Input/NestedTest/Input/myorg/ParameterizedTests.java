@@ -0,0 +1,11 @@
+package myorg;
+
+import org.junit.jupiter.params.ParameterizedTest;
+import org.junit.jupiter.params.provider.ValueSource;
+
+class ParameterizedTests {
+	@ParameterizedTest
+	@ValueSource(ints = {1, 2})
+	void shouldPass(int x) {
+	}
+}
@@ -0,0 +1,9 @@
+package myorg.base;
+
+import org.junit.jupiter.api.*;
+
+public abstract class AbstractBaseTest<T extends Comparable<T>> {
+	@Test
+	void shouldPassInherited() {
+	}
+}
@@ -0,0 +1,26 @@
+import json
+
+import pysys
+from pysys.constants import *
+
+class PySysTest(pysys.basetest.BaseTest):
+	def execute(self):
+		self.copy(self.input, self.output+'/testroot')
+		
+		# the second run uses the cached scan results
+		for name in ['cold', 'warm']:
+			self.pysys.runPySys(['print', '--json'], stdouterr='pysys-print-'+name, workingDir=self.output+'/testroot', 
+				background=False)
+
+	def validate(self):
+		for name in ['cold', 'warm']:
+			with open(self.output+'/pysys-print-%s.out'%name, 'r', encoding='utf-8') as f:
+				self.assertThat('testIds == expected', testIds=sorted(t['id'] for t in json.load(f)), expected=[
+					'myorg.ImplementsContractTest', # inherits tests from an interface
+					'myorg.InheritedTest', # inherits tests from an abstract class
+					'myorg.JupiterTest', 
+					'myorg.LegacyTest', # superclass is not in the Input dir so might contain tests
+					'myorg.ParameterizedTests', 
+				], name=name)
+		self.assertThat('len(scanCacheFiles) == 1', scanCacheFiles=[f for f in os.listdir(self.output+'/descriptor-cache') 
+			if f.startswith('junit-source-scan-')])
@@ -0,0 +1,20 @@
+package myorg.streaming;
+
+import static org.junit.jupiter.api.Assertions.assertEquals;
+
+import org.junit.jupiter.api.*;
+
+@TestMethodOrder(MethodOrderer.Alphanumeric.class)
+class FailTests {
+
+	@Test
+	void testOne() throws Exception {
+		System.out.println("hello from testOne()");
+	}
+
+	@Test
+	void testTwo() throws Exception {
+		System.out.println("hello from testTwo()");
+		assertEquals(1, 2);
+	}
+}
@@ -0,0 +1,18 @@
+package myorg.streaming;
+
+import org.junit.jupiter.api.*;
+
+@TestMethodOrder(MethodOrderer.Alphanumeric.class)
+class HangTests {
+
+	@Test
+	void testOne() throws Exception {
+		System.out.println("hello from testOne()");
+	}
+
+	@Test
+	void testTwo() throws Exception {
+		System.out.println("hello from testTwo()");
+		Thread.sleep(10*60*1000);
+	}
+}
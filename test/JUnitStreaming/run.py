@@ -0,0 +1,31 @@
+import pysys
+from pysys.constants import *
+
+class PySysTest(pysys.basetest.BaseTest):
+	def execute(self):
+		self.copy(self.input, self.output+'/testroot')
+
+		self.pysys.runPySys(['run', '-j0', '--outdir', 'myoutputdir'], stdouterr='pysys-run', workingDir=self.output+'/testroot', 
+			expectedExitStatus='!=0', background=False) # since the tests fail
+
+	def validate(self):
+		def getTestcases(name): return self.getExprFromFile('testroot/'+name+'/Output/myoutputdir/run.log', 'INFO +-- (.+) [(]', returnAll=True)
+
+		self.assertThat('testcases == expected', testcases__eval="getTestcases('StreamingTest')", expected=[
+			'myorg.streaming.FailTests testOne(): passed', 
+			'myorg.streaming.FailTests testTwo(): failure'])
+		self.assertGrep('testroot/StreamingTest/Output/myoutputdir/run.log', 'Testcase stdout from testTwo[(][)]: ')
+		self.assertGrep('testroot/StreamingTest/Output/myoutputdir/run.log', 'Summary of all testcase outcomes for StreamingTest: 1 PASSED, 1 FAILED')
+		self.assertGrep('pysys-run.out', 'FAILED: +StreamingTest')
+		self.assertPathExists('testroot/StreamingTest/Output/myoutputdir/junit-events.ndjson')
+		
+		# unless junitShareCompiledClasses is enabled, each test compiles into its own output dir
+		self.assertPathExists('testroot/StreamingTest/Output/myoutputdir/javaclasses/myorg/streaming')
+		self.assertGrep('pysys-run.out', 'Compilation of JUnit test classes was shared', contains=False)
+		
+		# testcases that completed before the timeout still get outcomes
+		self.assertThat('testcases == expected', testcases__eval="getTestcases('TimeoutTest')", expected=[
+			'myorg.streaming.HangTests testOne(): passed', 
+			'myorg.streaming.HangTests testTwo(): error'])
+		self.assertGrep('pysys-run.out', 'TIMED OUT: +TimeoutTest')
+		self.assertGrep('testroot/TimeoutTest/Output/myoutputdir/run.log', 'Testcase was still executing when the JUnit process timed out')
@@ -0,0 +1,37 @@
+package myorg;
+
+import static org.junit.jupiter.api.Assertions.assertEquals;
+import static org.junit.jupiter.api.Assertions.assertTrue;
+
+import org.junit.jupiter.api.Test;
+import org.junit.jupiter.api.RepeatedTest;
+import org.junit.jupiter.api.RepetitionInfo;
+import org.junit.jupiter.params.ParameterizedTest;
+import org.junit.jupiter.params.provider.ValueSource;
+
+class MethodsTest {
+
+	@Test
+	void shouldPass() {
+	}
+
+	@Test
+	void shouldFail() {
+		assertEquals("Hello world", "Hello funky world");
+	}
+
+	@ParameterizedTest
+	@ValueSource(ints = {1, 2, 3})
+	void shouldAcceptValues(int value) {
+		assertTrue(value > 0);
+	}
+
+	@RepeatedTest(2)
+	void shouldRepeat(RepetitionInfo info) {
+		assertTrue(info.getCurrentRepetition() > 0);
+	}
+	
+	// not a test
+	void helper() {
+	}
+}
@@ -0,0 +1,17 @@
+package myorg;
+
+import org.junit.jupiter.api.*;
+
+class NestedClassesTest {
+
+	@Test
+	void shouldPassOuter() {
+	}
+
+	@Nested
+	class NestedClass {
+		@Test
+		void shouldPassNested() {
+		}
+	}
+}
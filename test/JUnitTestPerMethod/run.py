@@ -0,0 +1,59 @@
+import json
+
+import pysys
+from pysys.constants import *
+
+class PySysTest(pysys.basetest.BaseTest):
+	def execute(self):
+		self.copy(self.input, self.output+'/testroot')
+
+		self.pysys.runPySys(['print', '--json'], stdouterr='pysys-print', workingDir=self.output+'/testroot', background=False)
+
+		self.pysys.runPySys(['run', '-j0', '--outdir', 'myoutputdir'], stdouterr='pysys-run', workingDir=self.output+'/testroot', 
+			expectedExitStatus='!=0', background=False) # since one of the methods fails
+
+		# re-running a single method should execute just that method
+		self.pysys.runPySys(['run', '--outdir', 'myoutputdir-rerun', 'MyJUnitTests_MethodsTest.shouldRepeat'], stdouterr='pysys-rerun', 
+			workingDir=self.output+'/testroot', background=False)
+
+	def validate(self):
+		def getTestcases(name, outdir='myoutputdir'): return self.getExprFromFile('testroot/NestedTest/Output/'+name+'/'+outdir+'/run.log', 'INFO +-- ([^:]+)', returnAll=True)
+		
+		with open(self.output+'/pysys-print.out', 'r', encoding='utf-8') as f:
+			descriptors = {t['id']: t for t in json.load(f)}
+		self.assertThat('testIds == expected', testIds=sorted(descriptors), expected=[
+			'MyJUnitTests_MethodsTest.shouldAcceptValues',
+			'MyJUnitTests_MethodsTest.shouldFail',
+			'MyJUnitTests_MethodsTest.shouldPass',
+			'MyJUnitTests_MethodsTest.shouldRepeat',
+			'MyJUnitTests_NestedClassesTest', # nested test classes can't be selected by method
+		])
+		self.assertThat('selectionArgs == expected', selectionArgs=descriptors['MyJUnitTests_MethodsTest.shouldRepeat']['userData']['junitSelectionArgs'], 
+			expected='--select-method myorg.MethodsTest#shouldRepeat(org.junit.jupiter.api.RepetitionInfo)')
+
+		# the first method of each class should be scheduled ahead of the others, which wait for it to execute the class
+		hints = sorted((d['executionOrderHint'][0], id) for id, d in descriptors.items() if id.startswith('MyJUnitTests_MethodsTest.'))
+		self.assertThat('otherHints == [leaderHint+1.0]*3', leaderHint=hints[0][0], otherHints=[h for h, id in hints[1:]])
+		self.assertThat('nestedClassHint == leaderHint+1.0', leaderHint=hints[0][0], 
+			nestedClassHint=descriptors['MyJUnitTests_NestedClassesTest']['executionOrderHint'][0])
+
+		# the 4 methods from the same class should be executed by a single JUnit process, but with per-method outcomes
+		self.assertThatGrep('pysys-run.out', 'JUnit batch mode executed ([0-9]+ test methods using [0-9]+) JUnit processes', 
+			expected='4 test methods using 1')
+		self.assertThat('testcases == expected', testcases__eval="getTestcases('myorg.MethodsTest.shouldPass')", expected=[
+			'myorg.MethodsTest shouldPass()'])
+		self.assertThat('testcases == expected', testcases__eval="getTestcases('myorg.MethodsTest.shouldAcceptValues')", expected=[
+			'myorg.MethodsTest shouldAcceptValues(int)[1]', 
+			'myorg.MethodsTest shouldAcceptValues(int)[2]', 
+			'myorg.MethodsTest shouldAcceptValues(int)[3]'])
+		self.assertThat('testcases == expected', testcases__eval="getTestcases('myorg.NestedClassesTest')", expected=[
+			'myorg.NestedClassesTest shouldPassOuter()', 
+			'myorg.NestedClassesTest$NestedClass shouldPassNested()'])
+		self.assertGrep('pysys-run.out', 'FAILED: +MyJUnitTests_MethodsTest.shouldFail')
+		self.assertGrep('pysys-run.out', 'FAILED: +MyJUnitTests_MethodsTest.should(Pass|Accept|Repeat)', contains=False)
+
+		self.assertThatGrep('pysys-rerun.out', 'JUnit batch mode executed ([0-9]+ test methods using [0-9]+) JUnit processes', 
+			expected='1 test methods using 1')
+		self.assertThat('testcases == expected', testcases__eval="getTestcases('myorg.MethodsTest.shouldRepeat', 'myoutputdir-rerun')", expected=[
+			'myorg.MethodsTest shouldRepeat(RepetitionInfo)[1]', 
+			'myorg.MethodsTest shouldRepeat(RepetitionInfo)[2]'])
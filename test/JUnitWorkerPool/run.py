@@ -0,0 +1,23 @@
+import pysys
+from pysys.constants import *
+
+class PySysTest(pysys.basetest.BaseTest):
+	def execute(self):
+		self.copy(self.input, self.output+'/testroot')
+		# run each test twice so that the worker has to be recycled
+		self.pysys.runPySys(['run', '-j1', '--cycle', '2', '--outdir', 'myoutputdir'], stdouterr='pysys-run', workingDir=self.output+'/testroot', 
+			background=False)
+
+	def validate(self):
+		def getTestcases(name): return self.getExprFromFile('testroot/NestedTest/Output/'+name+'/run.log', 'INFO +-- ([^:]+)', returnAll=True)
+		self.assertThat('testcases == expected', testcases__eval="getTestcases('myorg.mytest1.TestSuite1/myoutputdir~MyMode/cycle2')", expected=[
+			'myorg.mytest1.TestSuite1 shouldBeSkipped()', 
+			'myorg.mytest1.TestSuite1 shouldPass()'])
+		self.assertThat('testcases == expected', testcases__eval="getTestcases('myorg.mytest2.TestSuite2/myoutputdir~MyMode/cycle2')", expected=[
+			'myorg.mytest2.TestSuite2 shouldPass2()', 
+			'myorg.mytest2.TestSuite2$NestedClass shouldPassNested()'])
+		self.assertPathExists('testroot/NestedTest/Output/myorg.mytest2.TestSuite2/myoutputdir~MyMode/cycle2/junit-reports/TEST-junit-jupiter.xml')
+		
+		# 4 tests with maxRunsPerWorker=2 should require 2 worker JVMs
+		self.assertThatGrep('pysys-run.out', 'JUnit worker pool executed ([0-9]+ tests using [0-9]+) worker JVMs', 
+			expected='4 tests using 2')
@@ -0,0 +1,71 @@
+import concurrent.futures
+import multiprocessing
+import time
+
+import pysys
+from pysys.constants import *
+
+from pysysjava.junitxml import parseJUnitXMLFiles
+
+class PySysTest(pysys.basetest.BaseTest):
+	fileCounts = [4, 16, 64, 256]
+	testcasesPerFile = 20
+	processes = 2
+
+	def execute(self):
+		# generate lots of Ant-style per-class report files
+		self.mkdir('reports')
+		for i in range(max(self.fileCounts)):
+			with open(self.output+'/reports/TEST-myorg.Class%03d.xml'%i, 'w', encoding='utf-8') as f:
+				f.write('<?xml version="1.0" encoding="UTF-8"?>\n<testsuite name="myorg.Class%03d" tests="%d" skipped="0" failures="1" errors="0" time="1.5" timestamp="2020-01-02T03:04:05" hostname="h">\n'%(i, self.testcasesPerFile))
+				for j in range(self.testcasesPerFile):
+					f.write('<testcase name="test%02d" classname="myorg.Class%03d" time="0.01">\n'%(j, i))
+					if j == 0: f.write('<failure message="expected:&lt;1&gt; but was:&lt;2&gt;" type="junit.framework.AssertionFailedError">%s</failure>\n'%(
+						'junit.framework.AssertionFailedError: expected:&lt;1&gt; but was:&lt;2&gt;\n'+'\tat myorg.Class%03d.test%02d(Class%03d.java:%d)\n'%(i, j, i, j+10)*20))
+					f.write('</testcase>\n')
+				f.write('<system-out><![CDATA[%s]]></system-out>\n</testsuite>\n'%('Output line\n'*100))
+		allPaths = sorted(self.output+'/reports/'+f for f in os.listdir(self.output+'/reports'))
+
+		startTime = time.monotonic()
+		executor = concurrent.futures.ProcessPoolExecutor(self.processes, mp_context=multiprocessing.get_context('spawn'))
+		try:
+			parseJUnitXMLFiles(allPaths[:self.processes], processes=self.processes, minFilesForParallel=0, executor=executor) # warm up
+			self.reportPerformanceResult(time.monotonic()-startTime, 'JUnit XML parser process pool startup time', 's', 
+				resultDetails={'processes':self.processes})
+
+			self.timings = {}
+			for count in self.fileCounts:
+				paths = allPaths[:count]
+				startTime = time.monotonic()
+				serial = parseJUnitXMLFiles(paths, processes=1)
+				serialSecs = time.monotonic()-startTime
+				
+				startTime = time.monotonic()
+				parallel = parseJUnitXMLFiles(paths, processes=self.processes, minFilesForParallel=0, executor=executor)
+				parallelSecs = time.monotonic()-startTime
+				
+				self.assertThat('parallelMatchesSerial', parallelMatchesSerial=parallel == serial, count=count)
+				self.timings[count] = (serialSecs, parallelSecs)
+				for mode, secs in [('serial', serialSecs), ('parallel', parallelSecs)]:
+					self.reportPerformanceResult(count*self.testcasesPerFile/secs, 'JUnit XML parser %s throughput with %d files'%(mode, count), 
+						'/s', resultDetails={'processes':self.processes if mode == 'parallel' else 1})
+		finally:
+			executor.shutdown()
+
+		# check the default behaviour without an executor (which starts its own pool for large numbers of files)
+		self.defaultResults = parseJUnitXMLFiles(reversed(allPaths))
+		self.serialResults = parseJUnitXMLFiles(allPaths, processes=1)
+		
+	def validate(self):
+		self.log.info('Files    Serial   Parallel(%d)', self.processes)
+		for count, (serialSecs, parallelSecs) in sorted(self.timings.items()):
+			self.log.info('%5d  %7.3fs  %7.3fs', count, serialSecs, parallelSecs)
+		crossover = min([count for count, (serialSecs, parallelSecs) in self.timings.items() if parallelSecs < serialSecs], default=None)
+		self.log.info('Crossover point where parallel parsing is faster: %s (on a machine with %d CPUs)', 
+			'%d files'%crossover if crossover else 'not reached', os.cpu_count())
+
+		self.assertThat('defaultMatchesSerial', defaultMatchesSerial=self.defaultResults == self.serialResults)
+		self.assertThat('pathsSorted', pathsSorted__eval='[p for p, suite, tests in self.defaultResults] == sorted(p for p, suite, tests in self.defaultResults)')
+		self.assertThat('testcases == expected', testcases=sum(len(tests) for p, suite, tests in self.defaultResults), 
+			expected=max(self.fileCounts)*self.testcasesPerFile)
+		self.assertThat('testFileLine == expected', testFileLine=self.defaultResults[0][2][0].get('testFileLine'), expected=10)
@@ -0,0 +1,13 @@
+# Parses the specified JUnit XML file in a fresh process (so no other test can use the regex caches at the same time), 
+# and writes the cache statistics to a JSON file
+import sys
+import json
+
+from pysysjava import junitxml
+
+junitxml.JUnitXMLParser(sys.argv[1]).parse()
+with open(sys.argv[2], 'w', encoding='utf-8') as f:
+	json.dump({
+		'lineRegexCache': junitxml._getTestFileLineRegex.cache_info()._asdict(), 
+		'multilineCache': junitxml._compileMultiline.cache_info()._asdict(),
+	}, f)
@@ -0,0 +1,74 @@
+import re
+import sys
+import time
+
+import pysys
+import pysys.utils.fileutils
+from pysys.constants import *
+
+from pysysjava.junitxml import JUnitXMLParser
+
+class PySysTest(pysys.basetest.BaseTest):
+	testcases = 5000
+	classes = 500
+	repeats = 5
+
+	def execute(self):
+		# a report where every testcase has failed with a long stack trace, including application frames
+		with open(self.output+'/TEST-failures.xml', 'w', encoding='utf-8') as f:
+			f.write('<?xml version="1.0" encoding="UTF-8"?>\n<testsuite name="JUnit Jupiter" tests="%d" skipped="0" failures="%d" errors="0" time="1" timestamp="2020-01-02T03:04:05" hostname="h">\n'%(self.testcases, self.testcases))
+			for i in range(self.testcases):
+				classIndex = i*self.classes//self.testcases # each class's testcases are together, as in a real report
+				classname = 'myorg.pkg.Class%04d'%classIndex
+				trace = ('org.opentest4j.AssertionFailedError: expected: &lt;1&gt; but was: &lt;2&gt;\n'
+					+'\tat org.junit.jupiter.api.AssertionUtils.fail(AssertionUtils.java:55)\n'*8
+					+'\tat myorg.other.Helper.help(Helper.java:12)\n'*30
+					+'\tat %s.test%d(Class%04d.java:%d)\n'%(classname, i, classIndex, i%100+1)
+					+'\tat java.base/jdk.internal.reflect.NativeMethodAccessorImpl.invoke0(Native Method)\n'*30
+					+'\t... 25 more\n')
+				f.write('<testcase name="test%d()" classname="%s" time="0.01"><failure message="expected: &lt;1&gt; but was: &lt;2&gt;" type="org.opentest4j.AssertionFailedError">%s</failure>'%(i, classname, trace))
+				f.write('<system-out><![CDATA[unique-id: [engine:junit-jupiter]/[class:%s]/[method:test%d()]\ndisplay-name: test%d()\n]]></system-out></testcase>\n'%(classname, i, i))
+			f.write('</testsuite>\n')
+
+		def timeIt(function):
+			best = None
+			for i in range(self.repeats):
+				startTime = time.perf_counter()
+				result = function()
+				best = min(best or 1e9, time.perf_counter()-startTime)
+			return best, result
+		
+		# the regex caches are shared by all tests in this process, so check how they're used in a separate process
+		self.startPython([self.input+'/parsecaches.py', self.output+'/TEST-failures.xml', self.output+'/caches.json'], 
+			environs=self.createEnvirons(command=sys.executable, overrides={'PYTHONPATH': os.pathsep.join(sys.path)}), 
+			stdouterr='parsecaches')
+		
+		self.parseSecs, (self.suite, self.results) = timeIt(lambda: JUnitXMLParser(self.output+'/TEST-failures.xml').parse())
+		
+		# timings are recorded for tracking over time rather than asserted, since they depend on the machine and load
+		self.reportPerformanceResult(self.testcases/self.parseSecs, 'JUnit XML parser throughput for testcases with stack traces', '/s')
+
+	def validate(self):
+		self.assertThat('results == expected', results=len(self.results), expected=self.testcases)
+		t = self.results[0]
+		self.assertThat('testFileLine == expected', testFileLine=t['testFileLine'], expected=1)
+		self.assertThat('comparison == expected', comparison=(t['comparisonExpected'], t['comparisonActual']), expected=('1', '2'))
+		self.assertThat('displayName == expected', displayName=t['displayName'], expected='test0()')
+		self.assertThat('outcomeDetailsLines == expected', outcomeDetailsLines=len(t['outcomeDetails'].split('\n')), expected=32)
+		
+		# the line number regex is compiled once per class (not per testcase), and the exclude lines regex just once
+		caches = pysys.utils.fileutils.loadJSON(self.output+'/caches.json')
+		self.assertThat('(lineRegexCache["hits"], lineRegexCache["misses"]) == (testcases-classes, classes)', 
+			lineRegexCache=caches['lineRegexCache'], testcases=self.testcases, classes=self.classes)
+		self.assertThat('(multilineCache["hits"], multilineCache["misses"]) == (testcases-1, 1)', 
+			multilineCache=caches['multilineCache'], testcases=self.testcases)
+		
+		# the fast path gives the same results as straightforward uncompiled per-line matching
+		mismatches = []
+		for t in self.results:
+			details = re.sub(JUnitXMLParser.outcomeDetailsExcludeLinesRegex, '', t['outcomeDetailsFull'], flags=re.MULTILINE).strip()
+			classnameUnqualified = t['classname'].split('.')[-1].split('$')[0]
+			line = next((int(m.group(1)) for m in (re.match(r'[ \t]+at .*[(]%s[^:]*:([0-9]+)'%re.escape(classnameUnqualified), l) 
+				for l in details.split('\n')) if m is not None), None)
+			if (details, line) != (t['outcomeDetails'], t.get('testFileLine')): mismatches.append(t['classname']+'.'+t['name'])
+		self.assertThat('mismatches == []', mismatches=mismatches)
@@ -0,0 +1,21 @@
+# Streams the testcases from the specified JUnit XML file in a fresh process (so that allocations by other tests do not 
+# affect the measurement), and writes the testcases and peak memory usage to a JSON file
+import sys
+import json
+import tracemalloc
+
+from pysysjava.junitxml import JUnitXMLParser
+
+path, outputFile, spillDir = sys.argv[1:]
+streamed = []
+tracemalloc.start()
+parser = JUnitXMLParser(path)
+parser.maxOutputLength = 100
+parser.outputSpillDir = spillDir
+for t in parser.iterTestcases():
+	streamed.append(t)
+peakMemory = tracemalloc.get_traced_memory()[1]
+tracemalloc.stop()
+
+with open(outputFile, 'w', encoding='utf-8') as f:
+	json.dump({'peakMemory': peakMemory, 'suite': parser.suite, 'testcases': streamed}, f)
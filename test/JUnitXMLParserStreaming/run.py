@@ -0,0 +1,55 @@
+import sys
+
+import pysys
+import pysys.utils.fileutils
+from pysys.constants import *
+
+from pysysjava.junitxml import JUnitXMLParser
+
+class PySysTest(pysys.basetest.BaseTest):
+	testcases = 2000
+	outputLength = 10000
+
+	def execute(self):
+		# generate a large report with verbose output from every testcase
+		with open(self.output+'/TEST-large.xml', 'w', encoding='utf-8') as f:
+			f.write('<?xml version="1.0" encoding="UTF-8"?>\n<testsuite name="JUnit Jupiter" tests="%d" skipped="0" failures="1" errors="0" time="12.5" timestamp="2020-01-02T03:04:05" hostname="h">\n'%self.testcases)
+			for i in range(self.testcases):
+				f.write('<testcase name="test%05d()" classname="myorg.LargeTest" time="0.01">\n'%(self.testcases-i))
+				if i == 0: f.write('<failure message="Bad test" type="java.lang.AssertionError">%s</failure>\n'%('\tat myorg.LargeTest.test(LargeTest.java:10)\n'*1000))
+				f.write('<system-out><![CDATA[%s]]></system-out>\n'%(('Line of output from testcase %d\n'%i)*(self.outputLength//30)))
+				f.write('</testcase>\n')
+			f.write('</testsuite>\n')
+		
+		# measure memory in a separate process, since tracemalloc would include allocations by other tests in this one
+		self.startPython([self.input+'/streamparse.py', self.output+'/TEST-large.xml', self.output+'/streamed.json', self.output+'/spill'], 
+			environs=self.createEnvirons(command=sys.executable, overrides={'PYTHONPATH': os.pathsep.join(sys.path)}), 
+			stdouterr='streamparse')
+		streamed = pysys.utils.fileutils.loadJSON(self.output+'/streamed.json')
+		self.streamed, self.streamedSuite, self.peakMemory = streamed['testcases'], streamed['suite'], streamed['peakMemory']
+
+		self.parsedSuite, self.parsed = JUnitXMLParser(self.output+'/TEST-large.xml').parse()
+
+	def validate(self):
+		fileSize = os.path.getsize(self.output+'/TEST-large.xml')
+		self.assertThat('peakMemory < fileSize/4', peakMemory=self.peakMemory, fileSize=fileSize)
+
+		self.assertThat('streamed == expected', streamed=len(self.streamed), expected=self.testcases)
+		self.assertThat('firstTestcase == expected', firstTestcase=self.streamed[0]['name'], expected='test%05d()'%self.testcases) # file order
+		self.assertThat('suiteTests == expected', suiteTests=self.streamedSuite['tests'], expected=self.testcases)
+
+		# truncation and spilling
+		t = self.streamed[0]
+		self.assertThat('stdout.startswith(expected)', stdout=t['stdout'][:50], expected='Line of output from testcase 0\n')
+		self.assertThat('stdout.endswith(expected)', stdout=t['stdout'][-50:], expected='... (truncated %d characters)'%(len(self.parsed[-1]['stdout'])-100))
+		with open(t['stdoutFile'], 'r', encoding='utf-8') as f:
+			self.assertThat('spilledStdout == expected', spilledStdout__eval='f.read() == self.parsed[-1]["stdout"]', expected=True)
+		self.assertThat('outcomeDetailsFullFile is not None', outcomeDetailsFullFile=t.get('outcomeDetailsFullFile'))
+		self.assertThat('outcomeDetailsFile is None', outcomeDetailsFile=t.get('outcomeDetailsFile'))
+		self.assertThat('testFileLine == 10', testFileLine=t['testFileLine'])
+
+		# parse() is the same but sorted, and without truncation by default
+		self.assertThat('sortedNames == expected', sortedNames__eval='[t["name"] for t in self.parsed] == sorted(t["name"] for t in self.streamed)', expected=True)
+		self.assertThat('stdoutLength == expected', stdoutLength=len(self.parsed[-1]['stdout']), expected=(self.outputLength//30)*31-1)
+		self.assertThat('spilledKeys == []', spilledKeys=[k for t in self.parsed for k in t if k.endswith('File')])
+		self.assertThat('parsedSuite == streamedSuite', parsedSuite=self.parsedSuite, streamedSuite=self.streamedSuite)
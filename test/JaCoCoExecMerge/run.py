@@ -0,0 +1,59 @@
+import pysys
+from pysys.constants import *
+
+from pysysjava import jacocoexec
+from pysysjava.jacocoexec import ExecutionDataStore, ExecutionData, SessionInfo
+
+class PySysTest(pysys.basetest.BaseTest):
+	def execute(self):
+		def createFile(name, sessionId, probes):
+			store = ExecutionDataStore()
+			store.sessions.append(SessionInfo(sessionId, 1000, 2000+len(name)))
+			for classId, (className, classProbes) in probes.items():
+				packed = bytearray((len(classProbes)+7)//8)
+				for i, p in enumerate(classProbes): 
+					if p: packed[i//8] |= 1 << (i%8)
+				store.classes[classId] = ExecutionData(classId, className, len(classProbes), bytes(packed))
+			store.save(self.output+'/'+name)
+
+		createFile('a.exec', 'TestA.java1', {
+			1: ('myorg/ClassA', [True, False, False]), 
+			-2: ('myorg/ClassB', [False]*200),
+		})
+		createFile('b.exec', 'TestB.java1', {
+			1: ('myorg/ClassA', [False, False, True]), 
+			-2: ('myorg/ClassB', [i%2==0 for i in range(200)]), # needs a multi-byte probe count
+			3: ('myorg/ClassC', [True]),
+		})
+		createFile('incompatible.exec', 'TestC.java1', {1: ('myorg/ClassA', [True, False])})
+		
+		merged = jacocoexec.mergeExecutionDataFiles([self.output+'/a.exec', self.output+'/b.exec'], self.output+'/merged.exec')
+		self.log.info('Merged: %s', merged.classes)
+		
+		self.mergeError = None
+		try:
+			jacocoexec.mergeExecutionDataFiles([self.output+'/a.exec', self.output+'/incompatible.exec'], self.output+'/bad.exec')
+		except ValueError as ex:
+			self.mergeError = str(ex)
+
+	def validate(self):
+		store = ExecutionDataStore().load(self.output+'/merged.exec')
+		self.assertThat('sessions == expected', sessions=[s.id for s in store.sessions], expected=['TestA.java1', 'TestB.java1'])
+		self.assertThat('classes == expected', classes=sorted((c.name, c.getExecutedProbeCount(), c.probeCount) for c in store.classes.values()), 
+			expected=[('myorg/ClassA', 2, 3), ('myorg/ClassB', 100, 200), ('myorg/ClassC', 1, 1)])
+		self.assertThat('probes == expected', probes=store.classes[1].probes, expected=[True, False, True])
+		
+		# the low-level stream reader must agree
+		with open(self.output+'/merged.exec', 'rb') as f:
+			blocks = []
+			while True:
+				block = jacocoexec.readBlock(f)
+				if block is None: break
+				blocks.append((block[0], block[2]))
+		self.assertThat('blocks == expected', blocks=blocks, expected=[
+			(jacocoexec.BLOCK_HEADER, None), 
+			(jacocoexec.BLOCK_SESSIONINFO, 'TestA.java1'), (jacocoexec.BLOCK_SESSIONINFO, 'TestB.java1'), 
+			(jacocoexec.BLOCK_EXECUTIONDATA, 'myorg/ClassA'), (jacocoexec.BLOCK_EXECUTIONDATA, 'myorg/ClassB'), (jacocoexec.BLOCK_EXECUTIONDATA, 'myorg/ClassC'), 
+		])
+		
+		self.assertThat('mergeError.startswith(expected)', mergeError=self.mergeError, expected='Incompatible execution data for class myorg/ClassA')
@@ -0,0 +1,13 @@
+import pysys
+from pysys.constants import *
+from pysys.basetest import BaseTest
+
+class PySysTest(BaseTest):
+	def execute(self):
+		server = self.java.startJava('myorg.MyServer', [], stdouterr='my_server', classpath=self.project.testRootDir+'/../javaclasses', background=True)
+		self.waitForGrep('my_server.out', 'Server started')
+		self.wait(1.0)
+		server.stop()
+
+	def validate(self):
+		self.addOutcome(PASSED)
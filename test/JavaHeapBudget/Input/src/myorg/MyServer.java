@@ -0,0 +1,11 @@
+package myorg;
+
+public class MyServer
+{
+	public static void main(String[] args) throws Exception
+	{
+		System.out.println("Server started: Hello");
+		// never terminates cleanly, so will be killed during test cleanup
+		Thread.sleep(10*60*1000);
+	}
+}
@@ -0,0 +1,22 @@
+import pysys
+from pysys.constants import *
+from pysys.basetest import BaseTest
+
+from pysysjava.heapbudget import parseJVMHeapArgs
+
+class PySysTest(BaseTest):
+	def execute(self):
+		self.java.compile('src', 'javaclasses')
+		self.copy(self.input, self.output+'/testroot')
+		self.pysys.runPySys(['run', '--threads=3'], stdouterr='pysys-run', workingDir=self.output+'/testroot', background=False)
+
+	def validate(self):
+		self.assertThat('heap == expected', heap=parseJVMHeapArgs(['-Xms64m', '-Xmx2g', '-Dfoo=bar']), expected=(2048.0, 64.0))
+		self.assertThat('heap == expected', heap=parseJVMHeapArgs(['-XX:MaxHeapSize=1048576', '-Xmx512K']), expected=(0.5, None))
+		self.assertThat('heap == expected', heap=parseJVMHeapArgs(['-Xmx1g', '-Xmx256m']), expected=(256.0, None))
+
+		self.assertGrep('pysys-run.out', 'THERE WERE NO FAILURES')
+		# only one of the 512MB servers (plus overhead) can run at a time within a 1000MB budget
+		self.assertThatGrep('pysys-run.out', 'Java heap budget of (.*), for a total', 
+			expected='1000 MB had a peak usage of 576 MB; 2 of 3 Java processes waited for memory')
+		self.assertLineCount('pysys-run.out', 'Waiting to start java my_server until 576 MB of the Java heap budget is available', condition='==2')
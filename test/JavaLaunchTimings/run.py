@@ -0,0 +1,38 @@
+import json
+import glob
+
+import pysys
+from pysys.constants import *
+from pysys.basetest import BaseTest
+
+class PySysTest(BaseTest):
+	def execute(self):
+		self.copy(self.input, self.output+'/testroot')
+		self.pysys.runPySys(['run', '-XjavaLaunchTimings=true'], stdouterr='pysys-run', workingDir=self.output+'/testroot', background=False)
+
+	def validate(self):
+		self.assertGrep('pysys-run.out', 'THERE WERE NO FAILURES')
+
+		# the background server is still running when the test is cleaned up, so it completes last
+		with open(glob.glob(self.output+'/testroot/NestedTest/Output/*/java-launch-timings.json')[0], 'r', encoding='utf-8') as f:
+			launches = json.load(f)
+		self.assertThat('launches == expected', launches=[(t['kind'], t['displayName'], t['testId']) for t in launches], expected=[
+			('javac', 'javac<Input => javaclasses>', 'NestedTest'),
+			('java', 'java java-hello', 'NestedTest'),
+			('java', 'java my_server', 'NestedTest'),
+		])
+		javac, hello, server = launches
+		self.assertThat('spans == expected', spans=[s['name'] for s in hello['spans']], expected=['classpath', 'argsFile', 'spawn', 'firstOutput', 'run'])
+		self.assertThat('exitStatus == expected', exitStatus=hello['exitStatus'], expected=0)
+		self.assertThat('peakRSSMB > 0', peakRSSMB=hello['peakRSSMB'])
+		self.assertThat('createVMSecs > 0', createVMSecs=hello['jvmStartupSecs'].get('Create VM', 0))
+		self.assertThat('createVMSecs > 0', createVMSecs=javac['jvmStartupSecs'].get('Create VM', 0))
+		self.assertThat('durationSecs >= runSecs > 0', durationSecs=hello['durationSecs'], runSecs=hello['spans'][-1]['durationSecs'])
+		self.assertThat('serverRunSecs >= 0.5', serverRunSecs=server['spans'][-1]['durationSecs'])
+		self.assertThat('serverExitStatus != 0', serverExitStatus=server['exitStatus']) # killed during cleanup
+
+		# run-level report
+		with open(glob.glob(self.output+'/testroot/__pysys_runner*/java-launch-timings.json')[0], 'r', encoding='utf-8') as f:
+			self.assertThat('runLaunches == expected', runLaunches=len(json.load(f)), expected=3)
+		self.assertThatGrep('pysys-run.out', 'Slowest (.*) Java launches', expected='3 of 3')
+		self.assertThatGrep('pysys-run.out', '  [0-9.]+ .* (java my_server .*)', expected='java my_server [NestedTest]')
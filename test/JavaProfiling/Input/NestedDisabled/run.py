@@ -0,0 +1,11 @@
+import pysys
+from pysys.constants import *
+from pysys.basetest import BaseTest
+
+class PySysTest(BaseTest):
+	def execute(self):
+		self.java.compile(output='javaclasses')
+		self.java.startJava('myorg.HelloWorld', ['Hi there!'], stdouterr='java-hello', classpath='javaclasses')
+
+	def validate(self):
+		self.addOutcome(PASSED)
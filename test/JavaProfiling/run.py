@@ -0,0 +1,63 @@
+import os
+import json
+import glob
+
+import pysys
+from pysys.constants import *
+from pysys.basetest import BaseTest
+
+from pysysjava.profiling import summarizeJFRPrintJSON
+
+class PySysTest(BaseTest):
+	def execute(self):
+		self.copy(self.input, self.output+'/testroot')
+		self.pysys.runPySys(['run', '-XjavaProfile=jfr', '--outdir', 'profiled'], stdouterr='pysys-run', 
+			workingDir=self.output+'/testroot', background=False)
+		self.pysys.runPySys(['run', '--outdir', 'unprofiled'], stdouterr='pysys-run-unprofiled', 
+			workingDir=self.output+'/testroot', background=False)
+
+	def validate(self):
+		self.assertGrep('pysys-run.out', 'THERE WERE NO FAILURES')
+		self.assertGrep('pysys-run-unprofiled.out', 'THERE WERE NO FAILURES')
+
+		testroot = self.output+'/testroot'
+		self.assertThat('recordings == expected', recordings=sorted(os.path.relpath(p, testroot).replace(os.sep, '/') 
+			for p in glob.glob(testroot+'/*/Output/*/*.jfr')), expected=[
+				'NestedTest/Output/profiled/java-hello.jfr',
+				'NestedTest/Output/profiled/my_server.jfr',
+			])
+
+		with open(testroot+'/NestedTest/Output/profiled/java-profiling-summary.json', 'r', encoding='utf-8') as f:
+			summaries = json.load(f)
+		self.assertThat('recordings == expected', recordings=[s['recording'] for s in summaries], expected=['java-hello.jfr', 'my_server.jfr'])
+		self.assertThat('executionSamples > 0', executionSamples=summaries[0]['executionSamples'])
+		self.assertThat('hotMethods', hotMethods=summaries[0]['hotMethods'])
+		self.assertThatGrep(testroot+'/NestedTest/Output/profiled/run.log', 'Java profile of (java-hello): hottest method .*', expected='java-hello')
+		self.assertThatGrep('pysys-run.out', 'Java profiling summaries were written for ([0-9]+) processes', expected='2')
+		self.assertPathExists(testroot+'/NestedTest/Output/profiled/java-hello.jfrprint.out', exists=False)
+
+		# summary calculation
+		def sample(time, cls, method): return {'type': 'jdk.ExecutionSample', 'values': {'startTime': time, 
+			'stackTrace': {'truncated': True, 'frames': [{'method': {'type': {'name': cls}, 'name': method}}]}}}
+		summary = summarizeJFRPrintJSON({'recording': {'events': [
+			sample('2021-03-01T12:00:00.500000000+01:00', 'myorg/Foo', 'bar'),
+			sample('2021-03-01T12:00:01.5+01:00', 'myorg/Foo', 'bar'),
+			sample('2021-03-01T12:00:02+01:00', 'java.lang.String', 'hashCode'),
+			sample('2021-03-01T12:00:03+01:00', 'myorg/Foo', 'baz'),
+			{'type': 'jdk.GarbageCollection', 'values': {'startTime': '2021-03-01T11:00:01Z', 'sumOfPauses': 'PT0.0125S', 'longestPause': 'PT0.0125S'}},
+			{'type': 'jdk.GarbageCollection', 'values': {'startTime': '2021-03-01T11:00:02Z', 'sumOfPauses': 'PT1M0.5S', 'longestPause': 'PT0.3S'}},
+			{'type': 'jdk.ObjectAllocationSample', 'values': {'startTime': '2021-03-01T11:00:02.5Z', 'weight': 5*1024*1024}},
+			{'type': 'jdk.ObjectAllocationOutsideTLAB', 'values': {'startTime': '2021-03-01T11:00:03Z', 'allocationSize': 2*1024*1024}},
+			{'type': 'jdk.ObjectAllocationInNewTLAB', 'values': {'startTime': '2021-03-01T11:00:03.5Z', 'tlabSize': 3*1024*1024}},
+			]}}, hotMethods=2)
+		self.assertThat('hotMethods == expected', hotMethods=summary['hotMethods'], expected=[
+			{'method': 'myorg.Foo.bar', 'samples': 2, 'percent': 50.0}, 
+			{'method': 'java.lang.String.hashCode', 'samples': 1, 'percent': 25.0},
+			])
+		self.assertThat('gc == expected', gc=(summary['gcCount'], summary['gcTotalPauseSecs'], summary['gcLongestPauseSecs']), 
+			expected=(2, 60.5125, 0.3))
+		self.assertThat('allocation == expected', allocation=(summary['durationSecs'], summary['allocatedMB'], summary['allocationRateMBPerSec']), 
+			expected=(3.0, 10.0, 10.0/3.0))
+		self.assertThat('emptySummary == expected', emptySummary=summarizeJFRPrintJSON({}), expected={
+			'durationSecs': 0.0, 'executionSamples': 0, 'hotMethods': [], 'gcCount': 0, 'gcTotalPauseSecs': 0.0, 
+			'gcLongestPauseSecs': 0.0, 'allocatedMB': None, 'allocationRateMBPerSec': None})
@@ -0,0 +1,67 @@
+import threading
+import time
+
+import pysys
+from pysys.constants import *
+
+from pysysjava._sharedtasks import SharedTaskCoordinator, SharedTaskFailedException, SharedTaskTimedOutException
+
+class PySysTest(pysys.basetest.BaseTest):
+	def execute(self):
+		coordinator = SharedTaskCoordinator()
+		self.results = {}
+		
+		def startLeader(key, function):
+			# executes the task in another thread, returning once it has started
+			started = threading.Event()
+			def run():
+				try:
+					coordinator.runOnce(key, lambda: [started.set(), function()], owner='leader-'+key)
+				except Exception:
+					pass
+			thread = threading.Thread(target=run, name='leader-'+key, daemon=True)
+			thread.start()
+			started.wait(TIMEOUTS['WaitForSignal'])
+			return thread
+		
+		def runMember(key, timeout):
+			startTime = time.monotonic()
+			try:
+				result = 'executedBy=%s'%coordinator.runOnce(key, lambda: None, owner='member', timeout=timeout)
+			except SharedTaskFailedException as ex:
+				result = '%s: %s (owner=%s)'%(type(ex).__name__, ex, ex.owner)
+			self.results[key] = result
+			self.log.info('%s -> %s after %0.1f secs', key, result, time.monotonic()-startTime)
+
+		# the member waits for a leader that completes within the timeout
+		startLeader('completes', lambda: time.sleep(1.0))
+		runMember('completes', timeout=TIMEOUTS['WaitForSignal'])
+		
+		# the member gives up waiting for a leader that hangs
+		hang = threading.Event()
+		self.addCleanupFunction(hang.set)
+		startLeader('hangs', lambda: hang.wait(TIMEOUTS['WaitForSignal']))
+		runMember('hangs', timeout=1.0)
+
+		def fail(): raise Exception('Simulated failure')
+		startLeader('fails', fail).join()
+		runMember('fails', timeout=TIMEOUTS['WaitForSignal'])
+
+		# simulate a leader whose thread went away without completing the task
+		deadThread = threading.Thread(target=lambda: None)
+		deadThread.start()
+		deadThread.join()
+		coordinator._SharedTaskCoordinator__tasks['dies'] = {'owner':'leader-dies', 'done':threading.Event(), 'error':None, 'thread':deadThread}
+		runMember('dies', timeout=TIMEOUTS['WaitForSignal'])
+		
+		self.reuses = coordinator.reuses
+
+	def validate(self):
+		self.assertThat('result == expected', result=self.results['completes'], expected='executedBy=leader-completes')
+		self.assertThat('result == expected', result=self.results['hangs'], 
+			expected='SharedTaskTimedOutException: Task did not complete within 1 secs (owner=leader-hangs)')
+		self.assertThat('result == expected', result=self.results['fails'], 
+			expected='SharedTaskFailedException: Simulated failure (owner=leader-fails)')
+		self.assertThat('result == expected', result=self.results['dies'], 
+			expected='SharedTaskFailedException: Thread terminated before completing the task (owner=leader-dies)')
+		self.assertThat('reuses == 1', reuses=self.reuses)
@@ -0,0 +1,43 @@
+import pysys
+from pysys.constants import *
+
+from pysysjava.javaplugin import walkDirTree, walkDirTreeContents
+
+class PySysTest(pysys.basetest.BaseTest):
+	def execute(self):
+		tree = self.output+'/tree'
+		for i in range(500):
+			# a mixture of deep and wide directories
+			self.write_text(self.mkdir(tree+'/d%d/sub%d/deep%d'%(i%7, i%11, i%3))+'/File%d.%s'%(i, ['java', 'txt', 'class'][i%3]), 'x')
+		self.write_text(self.mkdir(tree+'/.svn')+'/Ignored.java', 'x')
+		self.write_text(self.mkdir(tree+'/dir.java')+'/Nested.java', 'x')
+
+	def validate(self):
+		tree = self.output+'/tree'
+		def walk(**kwargs): 
+			return [(os.path.relpath(dirpath, tree), [e.name for e in contents]) 
+				for dirpath, contents in walkDirTree(tree, dirIgnores=OSWALK_IGNORES, **kwargs)]
+
+		serial = walk()
+		self.assertThat('dirs == 1+7+7*11+7*11*3+1', dirs=len(serial))
+		self.assertThat('lastDir == "."', lastDir=serial[-1][0])
+		self.assertThat('firstDir == expected', firstDir=serial[0], expected=('d0/sub0/deep0', ['File0.java', 'File231.java', 'File462.java']))
+		self.assertThat('".svn" not in rootContents', rootContents=serial[-1][1])
+
+		# compare using a boolean to avoid logging the (large) results
+		for threads in [0, 2, 8]:
+			self.assertThat('threadedMatchesSerial', threadedMatchesSerial=walk(threads=threads) == serial, threads=threads)
+
+		self.assertThat('filteredMatchesSerial', filteredMatchesSerial=walk(fileSuffixes='.java', threads=4) == [
+			(dirpath, [name for name in contents if name.endswith('.java') or os.path.isdir(tree+'/'+dirpath+'/'+name)])
+				for dirpath, contents in serial])
+		self.assertThat('javaFiles == 167+1', javaFiles=len([e for e in walkDirTreeContents(tree, 
+			dirIgnores=OSWALK_IGNORES, fileSuffixes=['.java'], threads=0) if e.is_file()]))
+
+		# errors are reported in the same way as for single-threaded walks
+		try:
+			list(walkDirTree(self.output+'/does-not-exist', threads=4))
+			error = None
+		except Exception as ex:
+			error = ex
+		self.assertThat('isinstance(error, FileNotFoundError)', error=error)